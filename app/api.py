@@ -1,20 +1,44 @@
 """Optional FastAPI REST API for Python MCP Chat."""
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app import crud, schemas
+from typing import Literal, Optional
+from fastapi import FastAPI, Depends, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import SessionLocal, get_async_db, start_periodic_optimize
+from app import crud, crud_async, metrics, profiling, schemas
+from app.cache import read_cache
+from app.config import BATCH_MAX_ITEMS, EXPORT_BATCH_SIZE, EVENT_HEARTBEAT, WRITE_BEHIND
+from app.events import bus, Subscription
+from app.serialization import dumps, ndjson
+from app.write_queue import writer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start periodic SQLite maintenance (no-op if already running).
+
+    On shutdown, commit the writes still queued for group commit.
+    """
+    start_periodic_optimize()
+    yield
+    await asyncio.to_thread(writer.close)
 
 
 api = FastAPI(
     title="Python MCP Chat API",
     description="REST API for Python MCP Chat",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
+api.add_middleware(metrics.HTTPMetricsMiddleware)
+if profiling.ENABLED:
+    api.add_middleware(profiling.RequestNameMiddleware)
 
 
 @api.get("/")
-def root():
+async def root():
     """Root endpoint."""
     return {
         "name": "Python MCP Chat API",
@@ -23,134 +47,463 @@ def root():
     }
 
 
+def _paginate(response: Response, messages: list[dict], limit: int) -> list[dict]:
+    """Expose the next page cursor through the X-Next-Cursor header."""
+    cursor = crud.next_cursor(messages, limit)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    return messages
+
+
+def _watermark(response: Response, watermark: dict) -> None:
+    """Expose the watermark through X-Watermark-Message-Id/-Reaction-Seq."""
+    response.headers["X-Watermark-Message-Id"] = str(watermark['message_id'])
+    response.headers["X-Watermark-Reaction-Seq"] = str(watermark['reaction_seq'])
+
+
+def _feed(response: Response, feed: dict) -> list[dict]:
+    """Return a message_feed() page with its cursor and watermark headers."""
+    if feed['next_cursor']:
+        response.headers["X-Next-Cursor"] = feed['next_cursor']
+    _watermark(response, feed['watermark'])
+    return feed['messages']
+
+
 @api.get("/messages", response_model=list[dict])
-def list_messages(limit: int = 50, db: Session = Depends(get_db)):
-    """Get recent messages."""
-    return crud.get_messages(db, limit)
+async def list_messages(
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    since_id: Optional[int] = None,
+    since_ts: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get recent messages (or only those after since_id/since_ts)."""
+    try:
+        feed = await crud_async.message_feed(db, limit, cursor, since_id, since_ts)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _feed(response, feed)
 
 
 @api.post("/messages", response_model=dict)
-def create_message(msg: schemas.SendMessageInput, db: Session = Depends(get_db)):
+async def create_message(msg: schemas.SendMessageInput, db: AsyncSession = Depends(get_async_db)):
     """Send a new message."""
-    msg_id = crud.send_message(db, msg.name, msg.content, msg.channel)
+    if WRITE_BEHIND:
+        msg_id = await writer.send_message(msg.name, msg.content, msg.channel)
+    else:
+        msg_id = await crud_async.send_message(db, msg.name, msg.content, msg.channel)
     return {"id": msg_id, "message": "Message created successfully"}
 
 
+@api.post("/messages/batch", response_model=list[dict])
+async def create_messages_batch(
+    batch: schemas.SendMessagesBatchInput,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Send many messages in one transaction (per-item ids/errors)."""
+    return await crud_async.send_messages_batch(db, batch.messages)
+
+
+@api.get("/messages/date-range", response_model=list[dict])
+async def get_messages_by_date(
+    start_date: datetime,
+    end_date: datetime,
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get messages by date range."""
+    try:
+        messages = await crud_async.get_messages_by_date_range(
+            db, start_date, end_date, limit, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _paginate(response, messages, limit)
+
+
+@api.get("/messages/by-ids", response_model=dict)
+async def get_messages_by_ids(
+    ids: list[int] = Query(..., min_length=1, max_length=BATCH_MAX_ITEMS),
+    include_replies: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get many messages (?ids=1&ids=2...) keyed by id, in one query."""
+    return await crud_async.get_messages_by_ids(db, ids, include_replies)
+
+
 @api.get("/messages/{message_id}", response_model=dict)
-def get_message(message_id: int, db: Session = Depends(get_db)):
+async def get_message(message_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific message."""
-    message = crud.get_message_by_id(db, message_id)
+    message = await crud_async.get_message_by_id(db, message_id)
     if not message:
         raise HTTPException(status_code=404, detail="Message not found")
     return message
 
 
 @api.get("/messages/{message_id}/thread", response_model=dict)
-def get_thread(message_id: int, db: Session = Depends(get_db)):
-    """Get a message thread."""
-    thread = crud.get_message_thread(db, message_id)
+async def get_thread(
+    message_id: int,
+    response: Response,
+    since_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a message thread (or only the replies after since_id)."""
+    watermark = await crud_async.get_watermark(db)
+    thread = await crud_async.get_message_thread(db, message_id, since_id)
     if not thread:
         raise HTTPException(status_code=404, detail="Message not found")
+    _watermark(response, watermark)
     return thread
 
 
+@api.get("/messages/{message_id}/tree", response_model=dict)
+async def get_thread_tree(
+    message_id: int,
+    direction: Literal["descendants", "ancestors"] = "descendants",
+    max_depth: int = Query(default=10, ge=1, le=100),
+    max_nodes: int = Query(default=200, ge=1, le=1000),
+    order: Literal["thread", "depth", "chronological"] = "thread",
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a message's reply tree (or its ancestor chain) in one query."""
+    tree = await crud_async.get_thread_tree(
+        db, message_id, direction, max_depth, max_nodes, order
+    )
+    if not tree:
+        raise HTTPException(status_code=404, detail="Message not found")
+    return tree
+
+
 @api.post("/messages/{message_id}/replies", response_model=dict)
-def create_reply(
+async def create_reply(
     message_id: int, 
     reply: schemas.ReplyToMessageInput,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Reply to a message."""
     try:
-        reply_id = crud.reply_to_message(
-            db, 
-            reply.parent_message_id, 
-            reply.name, 
-            reply.content
-        )
+        if WRITE_BEHIND:
+            reply_id = await writer.reply_to_message(reply.parent_message_id, reply.name, reply.content)
+        else:
+            reply_id = await crud_async.reply_to_message(
+                db, 
+                reply.parent_message_id, 
+                reply.name, 
+                reply.content
+            )
         return {"id": reply_id, "message": "Reply created successfully"}
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
 @api.get("/channels", response_model=list[dict])
-def list_channels(db: Session = Depends(get_db)):
+async def list_channels(db: AsyncSession = Depends(get_async_db)):
     """Get all channels."""
-    return crud.get_channels(db)
+    return await crud_async.get_channels(db)
 
 
 @api.get("/channels/{channel}/messages", response_model=list[dict])
-def get_channel_messages(
+async def get_channel_messages(
     channel: str, 
+    response: Response,
     limit: int = 50, 
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    since_id: Optional[int] = None,
+    since_ts: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get messages from a specific channel."""
-    return crud.get_channel_messages(db, channel, limit)
+    """Get messages from a specific channel (or only those after since_id/since_ts)."""
+    try:
+        feed = await crud_async.message_feed(db, limit, cursor, since_id, since_ts, channel)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _feed(response, feed)
 
 
 @api.post("/messages/{message_id}/reactions", response_model=dict)
-def add_reaction(
+async def add_reaction(
     message_id: int,
     reaction: schemas.AddReactionInput,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Add a reaction to a message."""
     try:
-        crud.add_reaction(db, reaction.message_id, reaction.user_name, reaction.emoji)
+        if WRITE_BEHIND:
+            await writer.add_reaction(reaction.message_id, reaction.user_name, reaction.emoji)
+        else:
+            await crud_async.add_reaction(db, reaction.message_id, reaction.user_name, reaction.emoji)
         return {"message": "Reaction added successfully"}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@api.post("/reactions/batch", response_model=list[dict])
+async def add_reactions_batch(
+    batch: schemas.AddReactionsBatchInput,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Add many reactions in one transaction (per-item ids/errors)."""
+    return await crud_async.add_reactions_batch(db, batch.reactions)
+
+
+@api.get("/reactions/by-ids", response_model=dict)
+async def get_reactions_by_ids(
+    ids: list[int] = Query(..., min_length=1, max_length=BATCH_MAX_ITEMS),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the reactions of many messages (?ids=1&ids=2...) keyed by id, in one query."""
+    return await crud_async.get_reactions_by_ids(db, ids)
+
+
+@api.get("/reactions/changes", response_model=list[dict])
+async def get_reaction_changes(
+    response: Response,
+    since_seq: int = 0,
+    limit: int = 50,
+    channel: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Messages whose reaction counts changed after since_seq."""
+    feed = await crud_async.reaction_feed(db, since_seq, limit, channel)
+    _watermark(response, feed['watermark'])
+    return feed['changes']
+
+
 @api.delete("/messages/{message_id}/reactions", response_model=dict)
-def remove_reaction(
+async def remove_reaction(
     message_id: int,
     reaction: schemas.RemoveReactionInput,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Remove a reaction from a message."""
     try:
-        crud.remove_reaction(db, reaction.message_id, reaction.user_name, reaction.emoji)
+        await crud_async.remove_reaction(db, reaction.message_id, reaction.user_name, reaction.emoji)
         return {"message": "Reaction removed successfully"}
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
+@api.post("/messages/{message_id}/reactions/toggle", response_model=dict)
+async def toggle_reaction(
+    message_id: int,
+    reaction: schemas.ToggleReactionInput,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Add a reaction, or remove it if present."""
+    try:
+        added = await crud_async.toggle_reaction(db, reaction.message_id, reaction.user_name, reaction.emoji)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"added": added, "message": f"Reaction {'added' if added else 'removed'} successfully"}
+
+
 @api.get("/messages/{message_id}/reactions", response_model=dict)
-def get_reactions(message_id: int, db: Session = Depends(get_db)):
+async def get_reactions(message_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get reactions for a message."""
-    return crud.get_message_reactions(db, message_id)
+    return await crud_async.get_message_reactions(db, message_id)
 
 
 @api.get("/users", response_model=list[dict])
-def list_users(
+async def list_users(
     limit: int = 50, 
     sort_by: str = "name",
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get list of users."""
-    return crud.get_users_list(db, limit, sort_by)
+    return await crud_async.get_users_list(db, limit, sort_by)
 
 
 @api.get("/search", response_model=list[dict])
-def search_messages(query: str, limit: int = 50, db: Session = Depends(get_db)):
-    """Search messages."""
-    return crud.search_messages(db, query, limit)
+async def search_messages(
+    query: str,
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    channel: Optional[str] = None,
+    sort: Literal["relevance", "recent"] = "relevance",
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Search messages (full-text, ranked)."""
+    try:
+        messages = await crud_async.search_messages(db, query, limit, cursor, channel, sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _paginate(response, messages, limit)
 
 
 @api.get("/users/{name}/messages", response_model=list[dict])
-def get_user_messages(name: str, limit: int = 50, db: Session = Depends(get_db)):
+async def get_user_messages(
+    name: str,
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
     """Get messages by user."""
-    return crud.get_messages_by_user(db, name, limit)
+    try:
+        messages = await crud_async.get_messages_by_user(db, name, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _paginate(response, messages, limit)
 
 
-@api.get("/messages/date-range", response_model=list[dict])
-def get_messages_by_date(
-    start_date: datetime,
-    end_date: datetime,
-    limit: int = 50,
-    db: Session = Depends(get_db)
+@api.get("/stats/cache", response_model=dict)
+async def cache_stats():
+    """Read cache hit/miss/eviction counters."""
+    return read_cache.stats()
+
+
+@api.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics (text exposition format)."""
+    return PlainTextResponse(
+        metrics.REGISTRY.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@api.get("/stats/slow-queries", response_model=dict)
+async def slow_query_stats():
+    """Slow-query log settings, counters and the latest slow statements."""
+    return {**profiling.stats(), 'recent': profiling.recent()}
+
+
+@api.get("/stats/write-behind", response_model=dict)
+async def write_behind_stats():
+    """Group-commit queue counters (writes, batches, average batch size)."""
+    return {'enabled': WRITE_BEHIND, **writer.stats()}
+
+
+@api.get("/stats/events", response_model=dict)
+async def event_stats():
+    """Event bus publish/delivery/drop counters."""
+    return bus.stats()
+
+
+@api.get("/export/messages")
+def export_messages(
+    channel: Optional[str] = None,
+    user: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    after_id: Optional[int] = None
 ):
-    """Get messages by date range."""
-    return crud.get_messages_by_date_range(db, start_date, end_date, limit)
+    """Stream messages, replies and reactions as NDJSON (oldest first).
+
+    A sync route: each batch is a short read on the threadpool with its own
+    session (no transaction stays open while the client receives it). Resume
+    an interrupted export with ``after_id`` set to the last id received.
+    """
+    db = SessionLocal()
+    batches = crud.export_messages(
+        db, channel, user, start_date, end_date, after_id, EXPORT_BATCH_SIZE
+    )
+    try:
+        first = next(batches, [])
+    except ValueError as e:
+        db.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        db.close()
+        raise
+    
+    def stream():
+        try:
+            yield ndjson(first)
+            for batch in batches:
+                yield ndjson(batch)
+        finally:
+            batches.close()
+            db.close()
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@api.get("/events")
+async def stream_events(channel: Optional[list[str]] = Query(default=None)):
+    """Stream new messages, replies and reactions as Server-Sent Events.
+
+    Repeat ``channel`` to follow several channels; omit it to follow all.
+    """
+    subscription = bus.subscribe(channel)
+    
+    async def stream():
+        try:
+            while True:
+                event = await subscription.get(timeout=EVENT_HEARTBEAT)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                event_id = f"id: {event['seq']}\n" if 'seq' in event else ""
+                yield f"{event_id}event: {event['type']}\ndata: {dumps(event)}\n\n"
+        finally:
+            bus.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _channel_list(command: dict, key: str) -> list[str]:
+    """``command[key]`` as a list of channel names (absent = empty)."""
+    channels = command.get(key)
+    if channels is None:
+        return []
+    if not isinstance(channels, list) or not all(isinstance(c, str) for c in channels):
+        raise ValueError(f"'{key}' must be a list of channel names")
+    return channels
+
+
+async def _receive_commands(websocket: WebSocket, subscription: Subscription) -> None:
+    """Apply {"subscribe": [...]} / {"unsubscribe": [...]} messages from a client."""
+    while True:
+        try:
+            command = await websocket.receive_json()
+        except ValueError:
+            command = None
+        if not isinstance(command, dict):
+            await websocket.send_text(dumps({'type': 'error', 'error': 'Expected a JSON object'}))
+            continue
+        try:
+            subscribe = _channel_list(command, "subscribe")
+            unsubscribe = _channel_list(command, "unsubscribe")
+        except ValueError as e:
+            await websocket.send_text(dumps({'type': 'error', 'error': str(e)}))
+            continue
+        subscription.subscribe(subscribe)
+        subscription.unsubscribe(unsubscribe)
+        channels = sorted(subscription.channels) if subscription.channels is not None else None
+        await websocket.send_text(dumps({'type': 'subscribed', 'channels': channels}))
+
+
+@api.websocket("/ws")
+async def websocket_events(websocket: WebSocket, channel: Optional[list[str]] = Query(default=None)):
+    """Push the same events as /events over a WebSocket.
+
+    Clients can change their channels by sending {"subscribe": [...]} or
+    {"unsubscribe": [...]}.
+    """
+    await websocket.accept()
+    subscription = bus.subscribe(channel)
+    receiver = asyncio.create_task(_receive_commands(websocket, subscription))
+    try:
+        while True:
+            getter = asyncio.create_task(subscription.get())
+            await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver.done():
+                # Client went away (WebSocketDisconnect)
+                getter.cancel()
+                break
+            await websocket.send_text(dumps(getter.result()))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        bus.unsubscribe(subscription)
+        if receiver.done() and not receiver.cancelled():
+            receiver.exception()
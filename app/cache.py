@@ -0,0 +1,146 @@
+"""In-process LRU/TTL cache for hot read queries.
+
+Entries are tagged (e.g. ``feed:channel:python``, ``message:42``) and writes
+in ``app.crud`` invalidate only the tags they touch. Writes made by other
+processes are not seen; READ_CACHE_TTL bounds how stale an entry can get.
+Cached results are shared between callers and must not be mutated.
+"""
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable
+from app.config import READ_CACHE_SIZE, READ_CACHE_TTL
+
+
+class QueryCache:
+    """Bounded, thread-safe LRU cache with per-entry TTL and tag invalidation."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any, frozenset]] = OrderedDict()
+        self._tags: dict[str, set[Hashable]] = {}
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so loads racing a write are not stored
+        self._generation = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def _remove(self, key: Hashable) -> None:
+        """Drop an entry and its tag references (lock held)."""
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        tags: Callable[[Any], Iterable[str]]
+    ) -> Any:
+        """Return the cached value for ``key`` or load, tag and store it."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry[1]
+                self._remove(key)
+                self._stats['expirations'] += 1
+            self._stats['misses'] += 1
+            generation = self._generation
+
+        value = loader()
+        entry_tags = frozenset(tags(value))
+
+        with self._lock:
+            if generation != self._generation:
+                return value
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (now + self.ttl, value, entry_tags)
+            for tag in entry_tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+        return value
+
+    def invalidate(self, *tags: str) -> None:
+        """Drop every entry carrying any of ``tags``."""
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self._stats['invalidations'] += 1
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters and current size."""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0
+            }
+
+
+read_cache = QueryCache(READ_CACHE_SIZE, READ_CACHE_TTL)
+
+
+def cached(tags: Callable[[dict, Any], Iterable[str]]):
+    """Cache a ``crud`` read function in ``read_cache``.
+
+    The key is the function name plus its arguments (bound against the
+    signature, so positional/keyword/default spellings share an entry);
+    the session argument ``db`` is not part of the key. ``tags`` receives
+    the normalized arguments and the result.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(db, *args, **kwargs):
+            # Inside an atomic batch reads may see writes that could still
+            # be rolled back (see database.atomic_session): not cacheable
+            if not read_cache.enabled or 'held_effects' in db.info:
+                return fn(db, *args, **kwargs)
+            bound = signature.bind(db, *args, **kwargs)
+            bound.apply_defaults()
+            params = {k: v for k, v in bound.arguments.items() if k != 'db'}
+            key = (fn.__name__, tuple(params.items()))
+            return read_cache.get_or_load(
+                key,
+                lambda: fn(db, *args, **kwargs),
+                lambda result: tags(params, result)
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def message_tags(messages: list[dict]) -> set[str]:
+    """Per-message tags for a page of messages."""
+    return {f"message:{m['id']}" for m in messages}
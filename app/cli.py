@@ -0,0 +1,155 @@
+"""Maintenance commands for Python MCP Chat.
+
+Usage:
+    python -m app.cli rebuild-counters
+    python -m app.cli rebuild-search-index
+    python -m app.cli rebuild-stats
+    python -m app.cli check-stats
+    python -m app.cli export [--channel C] [--user U] [--start-date D] [--end-date D]
+                             [--after-id N] [--output FILE]
+    python -m app.cli import FILE [--source NAME] [--format ndjson|csv] [--chunk-size N]
+                           [--offline]
+"""
+import argparse
+import json
+import sys
+from datetime import datetime
+from typing import Optional
+from app.database import SessionLocal, engine, init_db
+from app import crud, importer, search
+from app.config import EXPORT_BATCH_SIZE
+from app.serialization import ndjson
+
+
+def rebuild_counters(args: argparse.Namespace) -> None:
+    """Recompute the denormalized message counters."""
+    with SessionLocal() as db:
+        repaired = crud.rebuild_counters(db)
+    print(f"✅ Counters rebuilt: {repaired} messages repaired")
+
+
+def rebuild_search_index(args: argparse.Namespace) -> None:
+    """Rebuild the FTS5 search index from the messages table."""
+    if not search.create_fts(engine):
+        print("❌ Full-text search is not available on this database")
+        return
+    with engine.begin() as conn:
+        search.rebuild_fts(conn)
+    print("✅ Search index rebuilt")
+
+
+def rebuild_stats(args: argparse.Namespace) -> None:
+    """Recompute channel_stats and user_stats from scratch."""
+    with SessionLocal() as db:
+        crud.rebuild_stats(db)
+    print("✅ Channel and user stats rebuilt")
+
+
+def check_stats(args: argparse.Namespace) -> None:
+    """Report channel/user stats that disagree with the messages table."""
+    with SessionLocal() as db:
+        report = crud.check_stats(db)
+    problems = report['channels'] + report['users']
+    if not problems:
+        print("✅ Channel and user stats are consistent")
+        return
+    print(f"❌ {len(problems)} inconsistent entries:\n\n{json.dumps(report, indent=2)}")
+    sys.exit(1)
+
+
+def export(args: argparse.Namespace) -> None:
+    """Stream messages, replies and reactions as NDJSON."""
+    out = open(args.output, "a" if args.after_id else "w", encoding="utf-8") if args.output else sys.stdout
+    count = 0
+    try:
+        with SessionLocal() as db:
+            for batch in crud.export_messages(
+                db,
+                args.channel,
+                args.user,
+                args.start_date,
+                args.end_date,
+                args.after_id,
+                EXPORT_BATCH_SIZE
+            ):
+                out.write(ndjson(batch))
+                count += len(batch)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"✅ Exported {count} messages", file=sys.stderr)
+
+
+def import_archive(args: argparse.Namespace) -> None:
+    """Bulk-import an NDJSON/CSV archive (restartable)."""
+    def progress(report: dict) -> None:
+        print(
+            f"⏳ {report['read']} rows read, {report['imported']} imported "
+            f"({report['rows_per_sec']} rows/s)",
+            file=sys.stderr
+        )
+
+    try:
+        report = importer.import_archive(
+            engine,
+            args.file,
+            source=args.source,
+            fmt=args.format,
+            chunk_size=args.chunk_size,
+            offline=args.offline,
+            progress=progress
+        )
+    except ValueError as e:
+        print(f"❌ {e} (re-run the same command to resume)")
+        sys.exit(1)
+    print(
+        f"✅ Imported {report['imported']} messages and {report['reactions']} reactions "
+        f"in {report['seconds']}s ({report['rows_per_sec']} rows/s)\n\n{json.dumps(report, indent=2)}"
+    )
+    if report['errors']:
+        sys.exit(1)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Python MCP Chat maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser("rebuild-counters", help="recompute reply/reaction counters")
+    cmd.set_defaults(func=rebuild_counters)
+
+    cmd = commands.add_parser("rebuild-search-index", help="rebuild the full-text search index")
+    cmd.set_defaults(func=rebuild_search_index)
+
+    cmd = commands.add_parser("rebuild-stats", help="recompute channel and user stats")
+    cmd.set_defaults(func=rebuild_stats)
+
+    cmd = commands.add_parser("check-stats", help="verify channel and user stats")
+    cmd.set_defaults(func=check_stats)
+
+    cmd = commands.add_parser("export", help="export messages, replies and reactions as NDJSON")
+    cmd.add_argument("--channel", help="only this channel")
+    cmd.add_argument("--user", help="only messages by this user (exact name)")
+    cmd.add_argument("--start-date", type=datetime.fromisoformat, help="ISO date/time (inclusive)")
+    cmd.add_argument("--end-date", type=datetime.fromisoformat, help="ISO date/time (inclusive)")
+    cmd.add_argument("--after-id", type=int, help="resume after this message id")
+    cmd.add_argument("--output", help="file to write (default: stdout; appended to when resuming)")
+    cmd.set_defaults(func=export)
+
+    cmd = commands.add_parser("import", help="bulk-import an NDJSON/CSV archive")
+    cmd.add_argument("file", help="archive in the export format (.ndjson or .csv)")
+    cmd.add_argument("--source", help="archive name used to resume (default: file name)")
+    cmd.add_argument("--format", choices=["ndjson", "csv"], help="default: from the file extension")
+    cmd.add_argument("--chunk-size", type=int, default=5000, help="messages per transaction")
+    cmd.add_argument("--offline", action="store_true", help="drop indexes during the load (server must be stopped)")
+    cmd.set_defaults(func=import_archive)
+
+    args = parser.parse_args(argv)
+    init_db()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,122 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{BASE_DIR}/chat.db")
 
+
+def _to_async_url(url: str) -> str:
+    """Map a sync database URL to its asyncio driver equivalent."""
+    for prefix, async_prefix in (
+        ("sqlite://", "sqlite+aiosqlite://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+    ):
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _to_async_url(DATABASE_URL))
+
 # Allowed emojis for reactions
 ALLOWED_EMOJIS = [
     "👍", "❤️", "😂", "🎉", "🚀", "👏", 
     "🔥", "💯", "👎", "😮", "😢", "😡", 
     "🤔", "💡", "✅", "❌"
 ]
+
+# Tool dispatch configuration
+# Size of the worker pool that runs blocking database work for MCP tool calls
+MCP_WORKER_POOL_SIZE = int(os.getenv("MCP_WORKER_POOL_SIZE", "8"))
+
+# Run MCP tool handlers on the AsyncEngine instead of the worker pool
+MCP_ASYNC_DB = os.getenv("MCP_ASYNC_DB", "0").lower() in ("1", "true", "yes")
+
+
+def _parse_pairs(value: str) -> dict[str, str]:
+    """Parse a "key=value,key=value" string into a dict."""
+    pairs = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        key, _, val = item.partition("=")
+        pairs[key.strip()] = val.strip()
+    return pairs
+
+
+# Per-tool concurrency limits, e.g. "search-messages=2,get-users-list=4".
+# Tools without an explicit limit may use the whole pool.
+MCP_TOOL_CONCURRENCY = {
+    tool: int(limit)
+    for tool, limit in _parse_pairs(os.getenv("MCP_TOOL_CONCURRENCY", "")).items()
+}
+
+# Real-time events: per-subscriber queue size and SSE keep-alive interval (seconds)
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "1000"))
+EVENT_HEARTBEAT = float(os.getenv("EVENT_HEARTBEAT", "15"))
+
+# Seconds over which MCP resource update notifications are coalesced
+RESOURCE_NOTIFY_INTERVAL = float(os.getenv("RESOURCE_NOTIFY_INTERVAL", "0.5"))
+
+# Messages per batch (one short read transaction each) for NDJSON exports
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Output format of MCP tool results: "text" (indented JSON), "compact" or "structured"
+MCP_OUTPUT_FORMAT = os.getenv("MCP_OUTPUT_FORMAT", "text").lower()
+
+# Per-tool output format overrides, e.g. "get-messages=compact,search-messages=structured"
+MCP_TOOL_OUTPUT_FORMAT = {
+    tool: fmt.lower()
+    for tool, fmt in _parse_pairs(os.getenv("MCP_TOOL_OUTPUT_FORMAT", "")).items()
+}
+
+# SQLite connection profiles (PRAGMAs applied to every new connection)
+SQLITE_PROFILES = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",          # readers don't block the writer
+        "busy_timeout": 5000,           # ms to wait on a locked database
+        "synchronous": "NORMAL",        # safe with WAL, one fsync per checkpoint
+        "cache_size": -64000,           # 64 MiB page cache (negative = KiB)
+        "mmap_size": 268435456,         # 256 MiB memory-mapped I/O
+        "temp_store": "MEMORY",
+    },
+}
+# Opt-in: "production" switches the database file to WAL, which persists and
+# needs the -wal/-shm files next to it (not on network filesystems)
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "default")
+
+# Individual PRAGMAs can be overridden, e.g. "busy_timeout=10000,cache_size=-128000".
+# Foreign keys are enforced in every profile: reaction writes rely on them
+# instead of checking that the message exists first.
+SQLITE_PRAGMAS = {
+    "foreign_keys": "ON",
+    **SQLITE_PROFILES.get(SQLITE_PROFILE, {}),
+    **_parse_pairs(os.getenv("SQLITE_PRAGMAS", "")),
+}
+
+# Seconds between "PRAGMA optimize" runs (0 disables)
+SQLITE_OPTIMIZE_INTERVAL = int(os.getenv("SQLITE_OPTIMIZE_INTERVAL", "3600"))
+
+# In-process read cache for hot listing tools (0 disables)
+READ_CACHE_SIZE = int(os.getenv("READ_CACHE_SIZE", "1024"))
+READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", "30"))
+
+# Maximum number of items accepted by the batch write tools
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
+# Prometheus-style metrics (GET /metrics, get-metrics tool); "0" disables recording
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+
+# Slow-query log: statements slower than SLOW_QUERY_MS are logged (0 disables).
+# SLOW_QUERY_SAMPLE_RATE times only that fraction of statements (e.g. 0.01 in production).
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "1"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "1").lower() in ("1", "true", "yes")
+SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE", "")  # empty = stderr
+SLOW_QUERY_KEEP = int(os.getenv("SLOW_QUERY_KEEP", "100"))  # entries kept for /stats/slow-queries
+
+# Write-behind group commit for send-message, reply-to-message and add-reaction:
+# a single writer commits queued writes in batches of up to WRITE_BEHIND_MAX_BATCH,
+# waiting at most WRITE_BEHIND_WINDOW_MS after the first write for more to arrive
+# (writes queued while a batch commits always join the next one)
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "0").lower() in ("1", "true", "yes")
+WRITE_BEHIND_WINDOW_MS = float(os.getenv("WRITE_BEHIND_WINDOW_MS", "0"))
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("WRITE_BEHIND_MAX_BATCH", "256"))
@@ -1,90 +1,621 @@
 """CRUD operations for Python MCP Chat."""
-from datetime import datetime
-from typing import Optional
-from sqlalchemy import select, func, or_, and_
-from sqlalchemy.orm import Session
-from app.models import Message, Reaction
+import base64
+import binascii
+import functools
+import json
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+from sqlalchemy import (
+    Float, Integer, String, select, insert, update, delete, bindparam, case, cast, func, literal,
+    or_, and_, text, tuple_
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+from app.models import Message, Reaction, ReactionChange, ChannelStats, UserStats
+from app import schemas, search
+from app.cache import cached, message_tags, read_cache
+from app.events import bus
+
+
+def _encode(values: list) -> str:
+    """Encode a JSON-able position as an opaque, URL-safe cursor."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> list:
+    """Decode a cursor produced by _encode()."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def encode_cursor(created_at: datetime, message_id: int) -> str:
+    """Encode a (created_at, id) position as an opaque cursor."""
+    return _encode([created_at.isoformat(), message_id])
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor()."""
+    try:
+        created_at, message_id = _decode(cursor)
+        return datetime.fromisoformat(created_at), int(message_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def encode_rank_cursor(rank: float, message_id: int) -> str:
+    """Encode a (search rank, id) position as an opaque cursor."""
+    return _encode(["rank", rank, message_id])
+
+
+def decode_rank_cursor(cursor: str) -> tuple[float, int]:
+    """Decode a cursor produced by encode_rank_cursor()."""
+    try:
+        kind, rank, message_id = _decode(cursor)
+        if kind != "rank":
+            raise ValueError
+        return float(rank), int(message_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def next_cursor(messages: list[dict], limit: int) -> Optional[str]:
+    """Cursor for the page after ``messages`` (None when this is the last page)."""
+    if len(messages) < limit:
+        return None
+    last = messages[-1]
+    if 'rank' in last:
+        return encode_rank_cursor(last['rank'], last['id'])
+    return encode_cursor(last['created_at'], last['id'])
+
+
+# Listing statements are built once per shape (filter, cursor or not) and
+# run with bound parameters: a call skips statement construction, coercion
+# and cache key generation, and the compiled SQL is reused for the whole
+# process. The (created_at, id) row-value comparison lets SQLite seek the
+# created_at index instead of skipping rows like OFFSET would.
+MESSAGE_COLUMNS = tuple(Message.__table__.c)
+
+_NEWEST_FIRST = (Message.created_at.desc(), Message.id.desc())
+
+_AFTER_CURSOR = tuple_(Message.created_at, Message.id) < tuple_(
+    bindparam('cursor_created_at', type_=Message.created_at.type),
+    bindparam('cursor_id', type_=Message.id.type)
+)
+
+_LISTING_FILTERS = {
+    'top': (Message.parent_id.is_(None),),
+    'channel': (Message.channel == bindparam('channel'), Message.parent_id.is_(None)),
+    'user': (Message.name.ilike(bindparam('pattern')),),
+    'date_range': (
+        Message.created_at >= bindparam('start_date'),
+        Message.created_at <= bindparam('end_date')
+    ),
+    'search': (
+        or_(Message.content.ilike(bindparam('pattern')), Message.name.ilike(bindparam('pattern'))),
+    ),
+    'search_channel': (
+        or_(Message.content.ilike(bindparam('pattern')), Message.name.ilike(bindparam('pattern'))),
+        Message.channel == bindparam('channel')
+    ),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _listing_statement(shape: str, after_cursor: bool):
+    """Newest-first page of messages matching a filter of _LISTING_FILTERS."""
+    stmt = (
+        select(*MESSAGE_COLUMNS)
+        .where(*_LISTING_FILTERS[shape])
+        .order_by(*_NEWEST_FIRST)
+        .limit(bindparam('limit'))
+    )
+    if after_cursor:
+        stmt = stmt.where(_AFTER_CURSOR)
+    return stmt
+
+
+def _project(result) -> list[dict]:
+    """Project result rows into dicts keyed by column label.
+
+    Rows are plain column tuples (no ORM entities, no per-row mapping
+    views). Timestamps stay ``datetime`` objects; they are encoded once,
+    when the result is serialized (see ``app.serialization``).
+    """
+    # Plain str keys: columns of a CTE are keyed by label objects,
+    # which orjson rejects
+    keys = tuple(str(key) for key in result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def _fetch(db: Session, stmt, params: Optional[dict] = None) -> list[dict]:
+    """Run a Core select on the session's connection and project its rows."""
+    return _project(db.connection().execute(stmt, params))
+
+
+def _message_page(db: Session, limit: int, cursor: Optional[str], shape: str, **params) -> list[dict]:
+    """Fetch one page of messages.
+
+    Reply and reaction counts are read from the denormalized counter
+    columns, so a page is a single index range scan with no joins.
+    """
+    params['limit'] = limit
+    if cursor:
+        params['cursor_created_at'], params['cursor_id'] = decode_cursor(cursor)
+    return _fetch(db, _listing_statement(shape, bool(cursor)), params)
+
+
+def rebuild_counters(db: Session) -> int:
+    """Recompute reply_count, reaction_count and last_reply_at from scratch.
+
+    Only rows whose stored counters drifted are rewritten. Returns the
+    number of repaired messages.
+    """
+    replies = aliased(Message)
+    reply_count = (
+        select(func.count(replies.id))
+        .where(replies.parent_id == Message.id)
+        .scalar_subquery()
+    )
+    reaction_count = (
+        select(func.count(Reaction.id))
+        .where(Reaction.message_id == Message.id)
+        .scalar_subquery()
+    )
+    last_reply_at = (
+        select(func.max(replies.created_at))
+        .where(replies.parent_id == Message.id)
+        .scalar_subquery()
+    )
+    
+    stmt = (
+        update(Message)
+        .where(
+            or_(
+                Message.reply_count != reply_count,
+                Message.reaction_count != reaction_count,
+                Message.last_reply_at.is_distinct_from(last_reply_at)
+            )
+        )
+        .values(
+            reply_count=reply_count,
+            reaction_count=reaction_count,
+            last_reply_at=last_reply_at,
+            updated_at=Message.updated_at
+        )
+        .execution_options(synchronize_session=False)
+    )
+    result = db.execute(stmt)
+    db.commit()
+    read_cache.clear()
+    return result.rowcount
+
+
+def _dialect_insert(db: Session):
+    """INSERT construct with ON CONFLICT support for the session's dialect."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def _record_activity(db: Session, channel: str, name: str, created_at: datetime) -> None:
+    """Count a new message in channel_stats and user_stats (caller commits)."""
+    _record_activities(db, [{'channel': channel, 'name': name, 'created_at': created_at}])
+
+
+def _record_activities(db: Session, messages: list[dict]) -> None:
+    """Count new messages in channel_stats and user_stats (caller commits).
+
+    ``messages`` need 'channel', 'name' and 'created_at'. Counts are summed
+    per channel and per user, and each table gets one executemany upsert.
+    """
+    if not messages:
+        return
+    insert = _dialect_insert(db)
+    for model, key_column in ((ChannelStats, 'channel'), (UserStats, 'name')):
+        totals = {}
+        for m in messages:
+            count, last_activity = totals.get(m[key_column], (0, m['created_at']))
+            totals[m[key_column]] = (count + 1, max(last_activity, m['created_at']))
+        db.execute(_stats_upsert(insert, model, key_column), [
+            {'b_key': key, 'b_count': count, 'b_last_activity': last_activity}
+            for key, (count, last_activity) in totals.items()
+        ])
+
+
+@functools.lru_cache(maxsize=None)
+def _stats_upsert(insert, model, key_column: str):
+    """Upsert adding b_count messages to a stats row (built once per dialect and table)."""
+    table = model.__table__
+    stmt = insert(table).values({
+        key_column: bindparam('b_key'),
+        'message_count': bindparam('b_count'),
+        'last_activity': bindparam('b_last_activity', type_=table.c.last_activity.type)
+    })
+    return stmt.on_conflict_do_update(
+        index_elements=[key_column],
+        set_={
+            'message_count': table.c.message_count + stmt.excluded.message_count,
+            'last_activity': case(
+                (
+                    or_(
+                        table.c.last_activity.is_(None),
+                        stmt.excluded.last_activity > table.c.last_activity
+                    ),
+                    stmt.excluded.last_activity
+                ),
+                else_=table.c.last_activity
+            )
+        }
+    )
+
+
+def _computed_stats(key_column):
+    """Aggregate (key, message_count, last_activity) straight from messages."""
+    return (
+        select(
+            key_column,
+            func.count(Message.id).label('message_count'),
+            func.max(Message.created_at).label('last_activity')
+        )
+        .group_by(key_column)
+    )
+
+
+def rebuild_stats(db: Session) -> None:
+    """Recompute channel_stats and user_stats from the messages table."""
+    db.execute(delete(ChannelStats))
+    db.execute(delete(UserStats))
+    db.execute(
+        insert(ChannelStats).from_select(
+            ['channel', 'message_count', 'last_activity'],
+            _computed_stats(Message.channel)
+        )
+    )
+    db.execute(
+        insert(UserStats).from_select(
+            ['name', 'message_count', 'last_activity'],
+            _computed_stats(Message.name)
+        )
+    )
+    db.commit()
+    read_cache.invalidate("channels", "users")
+
+
+def check_stats(db: Session) -> dict:
+    """Compare channel_stats/user_stats with the messages table.
+
+    Returns the mismatching channels and users (empty lists when consistent).
+    """
+    report = {}
+    for label, model, key_column in (
+        ('channels', ChannelStats, Message.channel),
+        ('users', UserStats, Message.name),
+    ):
+        stored = {
+            row[0]: (row[1], row[2])
+            for row in db.execute(select(*model.__table__.c))
+        }
+        computed = {
+            row[0]: (row[1], row[2])
+            for row in db.execute(_computed_stats(key_column))
+        }
+        report[label] = [
+            {
+                'key': key,
+                'stored': _stats_entry(stored.get(key)),
+                'computed': _stats_entry(computed.get(key))
+            }
+            for key in sorted(stored.keys() | computed.keys())
+            if stored.get(key) != computed.get(key)
+        ]
+    return report
+
+
+def _stats_entry(entry: Optional[tuple]) -> Optional[dict]:
+    """Format a (message_count, last_activity) pair for check_stats()."""
+    if entry is None:
+        return None
+    return {
+        'message_count': entry[0],
+        'last_activity': entry[1].isoformat() if entry[1] else None
+    }
+
+
+def _after_commit(db: Session, effect, *args) -> None:
+    """Run ``effect(*args)`` (cache invalidation, events) for committed writes.
+
+    On a session opened with ``database.atomic_session`` a commit only
+    releases a savepoint, so the effect is held there until the outer
+    transaction commits (and dropped if it rolls back).
+    """
+    held = db.info.get('held_effects')
+    if held is None:
+        effect(*args)
+    else:
+        held.append((effect, args))
+
+
+def _publish_message(event_type: str, message_id: int, message: dict) -> None:
+    """Publish a committed message/reply to the event bus."""
+    bus.publish(event_type, message['channel'], {
+        'id': message_id,
+        'parent_id': message.get('parent_id'),
+        'name': message['name'],
+        'content': message['content'],
+        'channel': message['channel'],
+        'created_at': message['created_at']
+    })
 
 
 def send_message(db: Session, name: str, content: str, channel: str = "general") -> int:
     """Send a new message."""
-    message = Message(name=name, content=content, channel=channel)
+    now = datetime.utcnow()
+    message = Message(name=name, content=content, channel=channel, created_at=now, updated_at=now)
     db.add(message)
+    _record_activity(db, channel, name, now)
     db.commit()
     db.refresh(message)
+    _after_commit(db, _messages_committed, [message.id], [
+        {'name': name, 'content': content, 'channel': channel, 'created_at': now}
+    ])
     return message.id
 
 
-def get_messages(db: Session, limit: int = 50) -> list[dict]:
-    """Get recent messages with reply and reaction counts."""
-    # Subquery for reply count
-    reply_count_subq = (
-        select(func.count(Message.id))
-        .where(Message.parent_id == Message.id)
-        .correlate(Message)
-        .scalar_subquery()
+def send_messages_batch(db: Session, items: list[dict]) -> list[dict]:
+    """Send many messages in one transaction.
+
+    Each item is validated like send-message; invalid items are reported
+    and skipped. Returns ``{'index', 'id'}`` or ``{'index', 'error'}`` per
+    item, in input order.
+    """
+    valid, errors = schemas.validate_batch(schemas.SendMessageInput, items)
+    ids = _insert_messages(db, [item.model_dump() for _, item in valid])
+    return schemas.merge_batch_results(
+        errors,
+        [(index, {'id': msg_id}) for (index, _), msg_id in zip(valid, ids)]
     )
+
+
+def _insert_messages(db: Session, messages: list[dict]) -> list[int]:
+    """Insert validated messages with one executemany and commit.
+
+    Stats are bumped once per channel/user. Returns the new ids in input
+    order.
+    """
+    ids, rows = _stage_messages(db, messages)
+    _record_activities(db, rows)
+    db.commit()
+    _after_commit(db, _messages_committed, ids, rows)
+    return ids
+
+
+def _stage_messages(db: Session, messages: list[dict]) -> tuple[list[int], list[dict]]:
+    """Insert validated messages (caller records activity and commits).
+
+    Returns the new ids in input order and the inserted rows.
+    """
+    if not messages:
+        return [], []
     
-    # Subquery for reaction count
-    reaction_count_subq = (
-        select(func.count(Reaction.id))
-        .where(Reaction.message_id == Message.id)
-        .correlate(Message)
-        .scalar_subquery()
+    now = datetime.utcnow()
+    rows = [
+        {
+            'name': m['name'],
+            'content': m['content'],
+            'channel': m.get('channel') or "general",
+            'created_at': now,
+            'updated_at': now
+        }
+        for m in messages
+    ]
+    ids = db.execute(
+        insert(Message).returning(Message.id, sort_by_parameter_order=True),
+        rows
+    ).scalars().all()
+    return list(ids), rows
+
+
+def _messages_committed(ids: list[int], rows: list[dict]) -> None:
+    """Invalidate the cache and publish events for committed messages."""
+    if not rows:
+        return
+    read_cache.invalidate(
+        "feed:all",
+        "channels",
+        "users",
+        *{f"feed:channel:{row['channel']}" for row in rows}
     )
-    
-    stmt = (
+    for row, msg_id in zip(rows, ids):
+        _publish_message("message", msg_id, row)
+
+
+@cached(lambda params, result: {"feed:all"} | message_tags(result))
+def get_messages(db: Session, limit: int = 50, cursor: Optional[str] = None) -> list[dict]:
+    """Get recent messages with reply and reaction counts."""
+    return _message_page(db, limit, cursor, 'top')
+
+
+def get_watermark(db: Session) -> dict:
+    """Current high-water marks: newest message id and reaction change seq.
+
+    Read before the data it accompanies, so anything committed afterwards
+    is above it.
+    """
+    message_id, reaction_seq = db.execute(
         select(
-            Message,
-            reply_count_subq.label('reply_count'),
-            reaction_count_subq.label('reaction_count')
+            select(func.max(Message.id)).scalar_subquery(),
+            select(func.max(ReactionChange.seq)).scalar_subquery()
         )
-        .where(Message.parent_id.is_(None))
-        .order_by(Message.created_at.desc())
+    ).one()
+    return {'message_id': message_id or 0, 'reaction_seq': reaction_seq or 0}
+
+
+def get_messages_since(
+    db: Session,
+    limit: int = 50,
+    since_id: Optional[int] = None,
+    since_ts: Optional[datetime] = None,
+    channel: Optional[str] = None
+) -> list[dict]:
+    """Top-level messages newer than ``since_id``/``since_ts``, oldest first.
+
+    Both are served as a walk of the primary key from the id bound, which
+    stops after ``limit`` matches: ``since_ts`` is first resolved to the
+    oldest message after it through ix_messages_created_at (ids follow
+    created_at for live writes). Within a channel, the channel index is
+    used instead. Not cached: deltas are cheap and must never be older than
+    the watermark they are returned with.
+    """
+    conditions = []
+    if since_ts is not None:
+        if since_ts.tzinfo is not None:
+            # Timestamps are stored as naive UTC
+            since_ts = since_ts.astimezone(timezone.utc).replace(tzinfo=None)
+        first_id = db.execute(
+            select(Message.id)
+            .where(Message.created_at > since_ts)
+            .order_by(Message.created_at, Message.id)
+            .limit(1)
+        ).scalar()
+        if first_id is None:
+            return []
+        since_id = max(since_id or 0, first_id - 1)
+        conditions.append(Message.created_at > since_ts)
+    if channel is not None:
+        conditions += [Message.channel == channel, Message.parent_id.is_(None)]
+    else:
+        # "+ 0" keeps the planner off the parent_id index, which would read
+        # every top-level message and sort them to find the first few by id
+        conditions.append((Message.parent_id + 0).is_(None))
+    if since_id is not None:
+        conditions.append(Message.id > since_id)
+    stmt = (
+        select(*MESSAGE_COLUMNS)
+        .where(*conditions)
+        .order_by(Message.id)
         .limit(limit)
     )
+    return _fetch(db, stmt)
+
+
+def message_feed(
+    db: Session,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    since_id: Optional[int] = None,
+    since_ts: Optional[datetime] = None,
+    channel: Optional[str] = None
+) -> dict:
+    """A page of top-level messages with its next cursor and watermark.
+
+    Without ``since_id``/``since_ts`` this is the newest-first listing of
+    get_messages()/get_channel_messages(). With them, only newer messages
+    are returned, oldest first. Either way ``watermark['message_id']`` is
+    the ``since_id`` to poll with next: the last delta row when the page is
+    full, otherwise the newest message at query time.
+    """
+    watermark = get_watermark(db)
+    if since_id is None and since_ts is None:
+        if channel is None:
+            messages = get_messages(db, limit, cursor)
+        else:
+            messages = get_channel_messages(db, channel, limit, cursor)
+        # The page may come from the read cache: only vouch for what it shows
+        watermark['message_id'] = max((m['id'] for m in messages), default=0)
+        return {
+            'messages': messages,
+            'next_cursor': next_cursor(messages, limit),
+            'watermark': watermark
+        }
     
-    results = db.execute(stmt).all()
-    
-    messages = []
-    for row in results:
-        msg = row[0]
-        messages.append({
-            'id': msg.id,
-            'name': msg.name,
-            'content': msg.content,
-            'channel': msg.channel,
-            'parent_id': msg.parent_id,
-            'created_at': msg.created_at.isoformat(),
-            'updated_at': msg.updated_at.isoformat(),
-            'reply_count': row[1] or 0,
-            'reaction_count': row[2] or 0
-        })
-    
-    return messages
+    if cursor:
+        raise ValueError("cursor cannot be combined with since_id/since_ts")
+    messages = get_messages_since(db, limit, since_id, since_ts, channel)
+    if len(messages) >= limit:
+        watermark['message_id'] = messages[-1]['id']
+    return {'messages': messages, 'next_cursor': None, 'watermark': watermark}
 
 
 def reply_to_message(db: Session, parent_id: int, name: str, content: str) -> int:
     """Reply to a message (inherits channel from parent)."""
-    # Get parent message
-    parent = db.execute(
-        select(Message).where(Message.id == parent_id)
-    ).scalar_one_or_none()
+    reply, = _stage_replies(db, [(parent_id, name, content)])
+    if isinstance(reply, ValueError):
+        raise reply
+    _record_activities(db, [reply])
+    db.commit()
+    _after_commit(db, _reply_committed, reply)
+    return reply['id']
+
+
+def _stage_replies(db: Session, replies: list[tuple]) -> list:
+    """Insert (parent_id, name, content) replies and bump their parents' counters.
+
+    Replies inherit their parent's channel. The caller records the activity
+    and commits. Returns, per input, the inserted reply (as published to the
+    event bus) or a ValueError if its parent does not exist.
+    """
+    parents = dict(db.execute(
+        select(Message.id, Message.channel).where(Message.id.in_({r[0] for r in replies}))
+    ).tuples().all())
+    
+    now = datetime.utcnow()
+    results = []
+    rows = []
+    for parent_id, name, content in replies:
+        if parent_id not in parents:
+            results.append(ValueError(f"Parent message {parent_id} not found"))
+            continue
+        row = {
+            'parent_id': parent_id,
+            'name': name,
+            'content': content,
+            'channel': parents[parent_id],
+            'created_at': now,
+            'updated_at': now
+        }
+        rows.append(row)
+        results.append(row)
+    if not rows:
+        return results
     
-    if not parent:
-        raise ValueError(f"Parent message {parent_id} not found")
+    ids = db.execute(
+        insert(Message).returning(Message.id, sort_by_parameter_order=True),
+        rows
+    ).scalars().all()
+    for row, reply_id in zip(rows, ids):
+        row['id'] = reply_id
     
-    # Create reply with inherited channel
-    reply = Message(
-        parent_id=parent_id,
-        name=name,
-        content=content,
-        channel=parent.channel
+    # Bump the parents' counters in the same transaction
+    messages = Message.__table__
+    db.execute(
+        update(messages)
+        .where(messages.c.id == bindparam('b_id'))
+        .values(
+            reply_count=messages.c.reply_count + bindparam('b_count'),
+            last_reply_at=bindparam('b_last_reply_at', type_=messages.c.last_reply_at.type),
+            updated_at=messages.c.updated_at  # counters don't count as an edit
+        ),
+        [
+            {'b_id': parent_id, 'b_count': count, 'b_last_reply_at': now}
+            for parent_id, count in Counter(row['parent_id'] for row in rows).items()
+        ]
     )
-    db.add(reply)
-    db.commit()
-    db.refresh(reply)
-    return reply.id
+    return results
+
+
+def _reply_committed(reply: dict) -> None:
+    """Invalidate the cache and publish the event for a committed reply."""
+    # Replies are not in the feeds, but the parent's counters changed
+    read_cache.invalidate(f"message:{reply['parent_id']}", "channels", "users")
+    _publish_message("reply", reply['id'], reply)
 
 
 def get_message_by_id(db: Session, message_id: int) -> Optional[dict]:
@@ -102,13 +633,20 @@ def get_message_by_id(db: Session, message_id: int) -> Optional[dict]:
         'content': msg.content,
         'channel': msg.channel,
         'parent_id': msg.parent_id,
-        'created_at': msg.created_at.isoformat(),
-        'updated_at': msg.updated_at.isoformat()
+        'created_at': msg.created_at,
+        'updated_at': msg.updated_at
     }
 
 
-def get_message_thread(db: Session, message_id: int) -> Optional[dict]:
-    """Get a message thread with parent and replies."""
+def get_message_thread(
+    db: Session,
+    message_id: int,
+    since_id: Optional[int] = None
+) -> Optional[dict]:
+    """Get a message thread with parent and replies.
+
+    With ``since_id`` only replies with a greater id are included.
+    """
     msg = db.execute(
         select(Message).where(Message.id == message_id)
     ).scalar_one_or_none()
@@ -122,6 +660,8 @@ def get_message_thread(db: Session, message_id: int) -> Optional[dict]:
         .where(Message.parent_id == message_id)
         .order_by(Message.created_at.asc())
     )
+    if since_id is not None:
+        replies_stmt = replies_stmt.where(Message.id > since_id)
     replies = db.execute(replies_stmt).scalars().all()
     
     result = {
@@ -130,15 +670,15 @@ def get_message_thread(db: Session, message_id: int) -> Optional[dict]:
         'content': msg.content,
         'channel': msg.channel,
         'parent_id': msg.parent_id,
-        'created_at': msg.created_at.isoformat(),
-        'updated_at': msg.updated_at.isoformat(),
-        'reply_count': len(replies),
+        'created_at': msg.created_at,
+        'updated_at': msg.updated_at,
+        'reply_count': msg.reply_count,
         'replies': [
             {
                 'id': r.id,
                 'name': r.name,
                 'content': r.content,
-                'created_at': r.created_at.isoformat()
+                'created_at': r.created_at
             }
             for r in replies
         ]
@@ -154,132 +694,452 @@ def get_message_thread(db: Session, message_id: int) -> Optional[dict]:
                 'id': parent.id,
                 'name': parent.name,
                 'content': parent.content,
-                'created_at': parent.created_at.isoformat()
+                'created_at': parent.created_at
             }
     
     return result
 
 
+def _thread_path_key(dialect: str, column):
+    """Fixed-width text form of an id, so joined paths sort in thread order."""
+    if dialect == "postgresql":
+        return func.lpad(cast(column, String), 12, '0', type_=String)
+    return func.printf('%012d', column, type_=String)
+
+
+@functools.lru_cache(maxsize=None)
+def _thread_tree_statement(direction: str, dialect: str):
+    """Recursive walk of parent_id from one message, nearest nodes first."""
+    messages = Message.__table__
+    key = _thread_path_key(dialect, messages.c.id)
+    tree = (
+        select(*MESSAGE_COLUMNS, literal(0, Integer).label('depth'), key.label('path'))
+        .where(messages.c.id == bindparam('message_id'))
+        .cte('thread_tree', recursive=True)
+    )
+    if direction == "ancestors":
+        step = messages.c.id == tree.c.parent_id
+    else:
+        step = messages.c.parent_id == tree.c.id
+    recursive = (
+        select(*MESSAGE_COLUMNS, tree.c.depth + 1, tree.c.path + '/' + key)
+        .where(step, tree.c.depth < bindparam('max_depth'))
+    )
+    if dialect == "sqlite":
+        # ORDER BY/LIMIT after the recursive member apply to SQLite's walk
+        # itself: nodes leave its queue nearest first and the walk stops
+        # after :limit rows instead of visiting the whole subtree. Core has
+        # no API for a compound's ORDER BY inside a CTE, hence the suffix.
+        recursive = recursive.suffix_with(text("ORDER BY depth, id LIMIT :limit"))
+    tree = tree.union_all(recursive)
+    return select(tree).order_by(tree.c.depth, tree.c.id).limit(bindparam('limit'))
+
+
+# Sort keys of get_thread_tree() orders
+THREAD_ORDERS = {
+    # Each message followed by its replies (depth first, oldest reply first)
+    'thread': lambda node: node['path'],
+    'depth': lambda node: (node['depth'], node['created_at'], node['id']),
+    'chronological': lambda node: (node['created_at'], node['id']),
+}
+
+
+def get_thread_tree(
+    db: Session,
+    message_id: int,
+    direction: str = "descendants",
+    max_depth: int = 10,
+    max_nodes: int = 200,
+    order: str = "thread"
+) -> Optional[dict]:
+    """A message's subtree (replies of replies...) or its ancestor chain.
+
+    One recursive CTE walks ``parent_id`` down (descendants) or up
+    (ancestors) at most ``max_depth`` levels; every node carries its
+    ``depth`` (distance from ``message_id``) and the denormalized
+    ``reply_count``/``reaction_count``, so the whole tree is one round trip.
+    When there are more than ``max_nodes`` nodes the nearest ones are kept
+    (breadth first; on SQLite the walk itself stops there) and
+    ``truncated`` is set; nodes at ``max_depth`` with a
+    non-zero ``reply_count`` have replies that were not returned.
+
+    Returns None if the message does not exist.
+    """
+    stmt = _thread_tree_statement(direction, db.get_bind().dialect.name)
+    nodes = _fetch(db, stmt, {
+        'message_id': message_id,
+        'max_depth': max_depth,
+        'limit': max_nodes + 1
+    })
+    if not nodes:
+        return None
+
+    truncated = len(nodes) > max_nodes
+    nodes = nodes[:max_nodes]
+    if direction == "ancestors" and order == "thread":
+        # From the root down to the message
+        nodes.reverse()
+    else:
+        nodes.sort(key=THREAD_ORDERS[order])
+    for node in nodes:
+        del node['path']
+    return {
+        'message_id': message_id,
+        'direction': direction,
+        'order': order,
+        'truncated': truncated,
+        'nodes': nodes
+    }
+
+
+def _unique_ids(ids) -> list[int]:
+    """Ids without duplicates, in first-seen order."""
+    return list(dict.fromkeys(ids))
+
+
+@functools.lru_cache(maxsize=None)
+def _by_ids_statement(column: str):
+    """Messages whose ``column`` (id or parent_id) is in a list of ids."""
+    messages = Message.__table__
+    return (
+        select(*MESSAGE_COLUMNS)
+        .where(messages.c[column].in_(bindparam('ids', expanding=True)))
+        .order_by(messages.c.created_at.asc(), messages.c.id.asc())
+    )
+
+
+def get_messages_by_ids(db: Session, message_ids: list[int], include_replies: bool = False) -> dict:
+    """Resolve many messages at once, keyed by id.
+
+    One ``IN`` query for the messages and, with ``include_replies``, one
+    more for the direct replies of all of them (each message then has a
+    ``replies`` list, oldest first, as in ``get_message_thread``). Keys are
+    the ids as strings (JSON object keys); ids that do not exist are listed
+    in ``missing``.
+    """
+    ids = _unique_ids(message_ids)
+    found = {
+        message['id']: message
+        for message in _fetch(db, _by_ids_statement('id'), {'ids': ids})
+    }
+    if include_replies:
+        for message in found.values():
+            message['replies'] = []
+        if found:
+            for reply in _fetch(db, _by_ids_statement('parent_id'), {'ids': list(found)}):
+                found[reply['parent_id']]['replies'].append(reply)
+    return {
+        'messages': {str(message_id): found[message_id] for message_id in ids if message_id in found},
+        'missing': [message_id for message_id in ids if message_id not in found]
+    }
+
+
+@cached(lambda params, result: {"channels"})
 def get_channels(db: Session) -> list[dict]:
     """Get all channels with message count and last activity."""
     stmt = (
         select(
-            Message.channel,
-            func.count(Message.id).label('message_count'),
-            func.max(Message.created_at).label('last_activity')
+            ChannelStats.channel,
+            ChannelStats.message_count,
+            ChannelStats.last_activity
         )
-        .group_by(Message.channel)
-        .order_by(Message.channel)
+        .order_by(ChannelStats.channel)
     )
     
     results = db.execute(stmt).all()
     
-    return [
-        {
-            'channel': row[0],
-            'message_count': row[1],
-            'last_activity': row[2].isoformat() if row[2] else None
-        }
-        for row in results
-    ]
+    return [row._asdict() for row in results]
 
 
-def get_channel_messages(db: Session, channel: str, limit: int = 50) -> list[dict]:
+@cached(lambda params, result: {f"feed:channel:{params['channel']}"} | message_tags(result))
+def get_channel_messages(
+    db: Session,
+    channel: str,
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> list[dict]:
     """Get messages from a specific channel."""
-    # Subquery for reply count
-    reply_count_subq = (
-        select(func.count(Message.id))
-        .where(Message.parent_id == Message.id)
-        .correlate(Message)
-        .scalar_subquery()
-    )
-    
-    # Subquery for reaction count
-    reaction_count_subq = (
-        select(func.count(Reaction.id))
-        .where(Reaction.message_id == Message.id)
-        .correlate(Message)
-        .scalar_subquery()
+    return _message_page(db, limit, cursor, 'channel', channel=channel)
+
+
+def _bump_reaction_count(db: Session, message_id: int, delta: int) -> Optional[str]:
+    """Adjust a message's reaction counter (caller commits).
+
+    Returns the message's channel.
+    """
+    return db.execute(
+        update(Message)
+        .where(Message.id == message_id)
+        .values(
+            reaction_count=Message.reaction_count + delta,
+            updated_at=Message.updated_at  # counters don't count as an edit
+        )
+        .returning(Message.channel)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+
+
+def _record_reaction_changes(db: Session, message_ids) -> None:
+    """Move messages to the end of the changed-reaction feed (caller commits)."""
+    rows = [{'message_id': message_id} for message_id in message_ids]
+    table = ReactionChange.__table__
+    if db.get_bind().dialect.name == "sqlite":
+        # REPLACE deletes the message's old entry and inserts one with a new seq
+        db.execute(insert(table).prefix_with("OR REPLACE"), rows)
+        return
+    db.execute(delete(table).where(table.c.message_id.in_([r['message_id'] for r in rows])))
+    db.execute(insert(table), rows)
+
+
+def _reaction_key(message_id: int, user_name: str, emoji: str):
+    """WHERE clause matching one (message, user, emoji) reaction."""
+    return and_(
+        Reaction.message_id == message_id,
+        Reaction.user_name == user_name,
+        Reaction.emoji == emoji
     )
-    
+
+
+def _insert_reaction(db: Session, message_id: int, user_name: str, emoji: str) -> Optional[int]:
+    """Insert a reaction unless it exists, in one statement (caller commits).
+
+    Relies on the uix_message_user_emoji constraint for duplicates and on
+    the messages foreign key for the message's existence. Returns the new
+    reaction id, or None if the reaction already existed; raises ValueError
+    (with the transaction rolled back) if the message does not exist.
+    """
     stmt = (
-        select(
-            Message,
-            reply_count_subq.label('reply_count'),
-            reaction_count_subq.label('reaction_count')
-        )
-        .where(Message.channel == channel)
-        .where(Message.parent_id.is_(None))
-        .order_by(Message.created_at.desc())
-        .limit(limit)
+        _dialect_insert(db)(Reaction.__table__)
+        .values(message_id=message_id, user_name=user_name, emoji=emoji)
+        .on_conflict_do_nothing(index_elements=['message_id', 'user_name', 'emoji'])
+        .returning(Reaction.__table__.c.id)
     )
-    
-    results = db.execute(stmt).all()
-    
-    messages = []
-    for row in results:
-        msg = row[0]
-        messages.append({
-            'id': msg.id,
-            'name': msg.name,
-            'content': msg.content,
-            'channel': msg.channel,
-            'parent_id': msg.parent_id,
-            'created_at': msg.created_at.isoformat(),
-            'updated_at': msg.updated_at.isoformat(),
-            'reply_count': row[1] or 0,
-            'reaction_count': row[2] or 0
-        })
-    
-    return messages
+    try:
+        return db.execute(stmt).scalar_one_or_none()
+    except IntegrityError:
+        db.rollback()
+        raise ValueError(f"Message {message_id} not found")
+
+
+def _reaction_written(db: Session, message_id: int, delta: int) -> str:
+    """Bump the counter and change feed after a reaction write (caller commits).
+
+    Returns the message's channel. The counter update doubles as the
+    existence check when foreign keys are not enforced.
+    """
+    channel = _bump_reaction_count(db, message_id, delta)
+    if channel is None:
+        db.rollback()
+        raise ValueError(f"Message {message_id} not found")
+    _record_reaction_changes(db, [message_id])
+    return channel
 
 
 def add_reaction(db: Session, message_id: int, user_name: str, emoji: str) -> None:
     """Add a reaction to a message."""
-    # Check if message exists
-    msg = db.execute(
-        select(Message).where(Message.id == message_id)
-    ).scalar_one_or_none()
+    if _insert_reaction(db, message_id, user_name, emoji) is None:
+        db.rollback()
+        raise ValueError(f"Reaction already exists")
+    channel = _reaction_written(db, message_id, 1)
+    db.commit()
+    _after_commit(db, _reaction_committed, "reaction_added", channel, message_id, user_name, emoji)
+
+
+def add_reactions_batch(db: Session, items: list[dict]) -> list[dict]:
+    """Add many reactions in one transaction.
+
+    Each item is validated like add-reaction. Returns ``{'index', 'id'}`` or
+    ``{'index', 'error'}`` per item, in input order.
+    """
+    valid, errors = schemas.validate_batch(schemas.AddReactionInput, items)
+    results = _insert_reactions(db, [item.model_dump() for _, item in valid])
+    return schemas.merge_batch_results(
+        errors,
+        [(index, result) for (index, _), result in zip(valid, results)]
+    )
+
+
+def _insert_reactions(db: Session, reactions: list[dict]) -> list[dict]:
+    """Insert validated reactions with one executemany and commit.
+
+    Missing messages and duplicates (existing or repeated within the batch)
+    are reported per item. Returns one ``{'id': ...}`` or ``{'error': ...}``
+    per input, in order.
+    """
+    results, rows, channels = _stage_reactions(db, reactions)
+    db.commit()
+    _after_commit(db, _reactions_committed, rows, channels)
+    return results
+
+
+def _stage_reactions(db: Session, reactions: list[dict]) -> tuple[list[dict], list[dict], dict]:
+    """Insert validated reactions and bump their counters (caller commits).
+
+    Returns the per-item results of _insert_reactions(), the inserted rows
+    and the channel of each reacted message.
+    """
+    if not reactions:
+        return [], [], {}
+    message_ids = {r['message_id'] for r in reactions}
+    found = dict(db.execute(
+        select(Message.id, Message.channel).where(Message.id.in_(message_ids))
+    ).tuples().all())
+    seen = set(db.execute(
+        select(Reaction.message_id, Reaction.user_name, Reaction.emoji)
+        .where(Reaction.message_id.in_(message_ids))
+    ).tuples())
     
-    if not msg:
-        raise ValueError(f"Message {message_id} not found")
+    results = [None] * len(reactions)
+    rows = []
+    row_indexes = []
+    now = datetime.utcnow()
+    for index, r in enumerate(reactions):
+        key = (r['message_id'], r['user_name'], r['emoji'])
+        if r['message_id'] not in found:
+            results[index] = {'error': f"Message {r['message_id']} not found"}
+        elif key in seen:
+            results[index] = {'error': "Reaction already exists"}
+        else:
+            seen.add(key)
+            rows.append({
+                'message_id': r['message_id'],
+                'user_name': r['user_name'],
+                'emoji': r['emoji'],
+                'created_at': now,
+                'updated_at': now
+            })
+            row_indexes.append(index)
     
-    # Check if reaction already exists
-    existing = db.execute(
-        select(Reaction).where(
-            and_(
-                Reaction.message_id == message_id,
-                Reaction.user_name == user_name,
-                Reaction.emoji == emoji
-            )
+    if rows:
+        ids = db.execute(
+            insert(Reaction).returning(Reaction.id, sort_by_parameter_order=True),
+            rows
+        ).scalars().all()
+        for index, reaction_id in zip(row_indexes, ids):
+            results[index] = {'id': reaction_id}
+        
+        deltas = Counter(row['message_id'] for row in rows)
+        db.execute(
+            update(Message.__table__)
+            .where(Message.__table__.c.id == bindparam('b_id'))
+            .values(
+                reaction_count=Message.__table__.c.reaction_count + bindparam('b_delta'),
+                updated_at=Message.__table__.c.updated_at
+            ),
+            [{'b_id': message_id, 'b_delta': delta} for message_id, delta in deltas.items()]
         )
-    ).scalar_one_or_none()
+        _record_reaction_changes(db, deltas)
+    return results, rows, found
+
+
+def _reaction_committed(event_type: str, channel: str, message_id: int, user_name: str, emoji: str) -> None:
+    """Invalidate the cache and publish the event for a committed reaction change."""
+    read_cache.invalidate(f"message:{message_id}")
+    bus.publish(event_type, channel, {
+        'message_id': message_id, 'user_name': user_name, 'emoji': emoji
+    })
+
+
+def _reactions_committed(rows: list[dict], channels: dict) -> None:
+    """Invalidate the cache and publish events for committed reactions."""
+    if not rows:
+        return
+    read_cache.invalidate(*{f"message:{row['message_id']}" for row in rows})
+    for row in rows:
+        bus.publish("reaction_added", channels[row['message_id']], {
+            'message_id': row['message_id'], 'user_name': row['user_name'], 'emoji': row['emoji']
+        })
+
+
+def apply_writes(db: Session, writes: list[tuple]) -> list:
+    """Apply queued single writes in one transaction (see app.write_queue).
+
+    ``writes`` holds ``(kind, args)`` pairs, ``kind`` being "message"
+    (name, content, channel), "reply" (parent_id, name, content) or
+    "reaction" (message_id, user_name, emoji), with arguments already
+    validated. Messages go in first, then replies, then reactions, so a
+    write may refer to one queued before it. Returns, in input order, the
+    result of the equivalent crud call (message/reply id, None for a
+    reaction) or the ValueError it would have raised. Any other error
+    rolls the whole transaction back and is raised.
+    """
+    results = [None] * len(writes)
+    by_kind = {'message': [], 'reply': [], 'reaction': []}
+    for index, (kind, args) in enumerate(writes):
+        by_kind[kind].append((index, args))
     
-    if existing:
-        raise ValueError(f"Reaction already exists")
+    message_ids, message_rows = _stage_messages(db, [
+        {'name': name, 'content': content, 'channel': channel}
+        for _, (name, content, channel) in by_kind['message']
+    ])
+    for (index, _), msg_id in zip(by_kind['message'], message_ids):
+        results[index] = msg_id
+    
+    replies = []
+    staged = _stage_replies(db, [args for _, args in by_kind['reply']])
+    for (index, _), reply in zip(by_kind['reply'], staged):
+        if isinstance(reply, ValueError):
+            results[index] = reply
+        else:
+            replies.append(reply)
+            results[index] = reply['id']
+    _record_activities(db, message_rows + replies)
+    
+    reaction_results, reaction_rows, channels = _stage_reactions(db, [
+        {'message_id': message_id, 'user_name': user_name, 'emoji': emoji}
+        for _, (message_id, user_name, emoji) in by_kind['reaction']
+    ])
+    for (index, _), result in zip(by_kind['reaction'], reaction_results):
+        results[index] = ValueError(result['error']) if 'error' in result else None
     
-    reaction = Reaction(message_id=message_id, user_name=user_name, emoji=emoji)
-    db.add(reaction)
     db.commit()
+    _after_commit(db, _messages_committed, message_ids, message_rows)
+    for reply in replies:
+        _after_commit(db, _reply_committed, reply)
+    _after_commit(db, _reactions_committed, reaction_rows, channels)
+    return results
 
 
 def remove_reaction(db: Session, message_id: int, user_name: str, emoji: str) -> None:
     """Remove a reaction from a message."""
-    reaction = db.execute(
-        select(Reaction).where(
-            and_(
-                Reaction.message_id == message_id,
-                Reaction.user_name == user_name,
-                Reaction.emoji == emoji
-            )
-        )
-    ).scalar_one_or_none()
-    
-    if not reaction:
+    if _delete_reaction(db, message_id, user_name, emoji) is None:
+        db.rollback()
         raise ValueError(f"Reaction not found")
-    
-    db.delete(reaction)
+    channel = _reaction_written(db, message_id, -1)
+    db.commit()
+    _after_commit(db, _reaction_committed, "reaction_removed", channel, message_id, user_name, emoji)
+
+
+def _delete_reaction(db: Session, message_id: int, user_name: str, emoji: str) -> Optional[int]:
+    """Delete a reaction in one statement (caller commits).
+
+    Returns the deleted reaction's id, or None if there was none.
+    """
+    return db.execute(
+        delete(Reaction.__table__)
+        .where(_reaction_key(message_id, user_name, emoji))
+        .returning(Reaction.__table__.c.id)
+    ).scalar_one_or_none()
+
+
+def toggle_reaction(db: Session, message_id: int, user_name: str, emoji: str) -> bool:
+    """Remove the reaction if it exists, otherwise add it.
+
+    Both happen in one transaction, so concurrent toggles serialize on
+    SQLite's write lock. Returns True if the reaction was added, False if
+    it was removed.
+    """
+    added = _delete_reaction(db, message_id, user_name, emoji) is None
+    if added and _insert_reaction(db, message_id, user_name, emoji) is None:
+        # Inserted by a concurrent transaction in between (not on SQLite,
+        # where the DELETE already took the write lock)
+        db.rollback()
+        raise ValueError("Reaction changed concurrently, try again")
+    channel = _reaction_written(db, message_id, 1 if added else -1)
     db.commit()
+    event_type = "reaction_added" if added else "reaction_removed"
+    _after_commit(db, _reaction_committed, event_type, channel, message_id, user_name, emoji)
+    return added
 
 
 def get_message_reactions(db: Session, message_id: int) -> dict:
@@ -299,7 +1159,7 @@ def get_message_reactions(db: Session, message_id: int) -> dict:
             grouped[reaction.emoji] = []
         grouped[reaction.emoji].append({
             'user_name': reaction.user_name,
-            'created_at': reaction.created_at.isoformat()
+            'created_at': reaction.created_at
         })
     
     return {
@@ -309,199 +1169,342 @@ def get_message_reactions(db: Session, message_id: int) -> dict:
     }
 
 
-def get_users_list(db: Session, limit: int = 50, sort_by: str = "name") -> list[dict]:
-    """Get list of users with message count and last activity."""
+@functools.lru_cache(maxsize=None)
+def _reactions_by_ids_statement():
+    """Messages in a list of ids, outer-joined to their reactions."""
+    messages = Message.__table__
+    reactions = Reaction.__table__
+    return (
+        select(messages.c.id, reactions.c.emoji, reactions.c.user_name, reactions.c.created_at)
+        .select_from(messages.outerjoin(reactions, reactions.c.message_id == messages.c.id))
+        .where(messages.c.id.in_(bindparam('ids', expanding=True)))
+        .order_by(reactions.c.created_at.asc())
+    )
+
+
+def get_reactions_by_ids(db: Session, message_ids: list[int]) -> dict:
+    """Reactions of many messages at once, keyed by id.
+
+    Each entry has the same shape as ``get_message_reactions``. A single
+    query outer-joins the messages to their reactions, so messages without
+    reactions get an empty entry and ids that do not exist are listed in
+    ``missing``.
+    """
+    ids = _unique_ids(message_ids)
+    found = {}
+    rows = db.connection().execute(_reactions_by_ids_statement(), {'ids': ids})
+    for message_id, emoji, user_name, created_at in rows:
+        entry = found.setdefault(message_id, {
+            'message_id': message_id,
+            'reactions': {},
+            'total_count': 0
+        })
+        if emoji is None:
+            continue
+        entry['reactions'].setdefault(emoji, []).append({
+            'user_name': user_name,
+            'created_at': created_at
+        })
+        entry['total_count'] += 1
+    return {
+        'reactions': {str(message_id): found[message_id] for message_id in ids if message_id in found},
+        'missing': [message_id for message_id in ids if message_id not in found]
+    }
+
+
+def reaction_feed(
+    db: Session,
+    since_seq: int = 0,
+    limit: int = 50,
+    channel: Optional[str] = None
+) -> dict:
+    """Messages whose reactions changed after ``since_seq``, in change order.
+
+    Each entry carries the message's current ``reaction_count``; a message
+    that changed several times appears once, at its latest change.
+    ``watermark['reaction_seq']`` is the ``since_seq`` to poll with next.
+    """
+    watermark = get_watermark(db)
     stmt = (
         select(
-            Message.name,
-            func.count(Message.id).label('message_count'),
-            func.max(Message.created_at).label('last_activity')
+            ReactionChange.seq,
+            ReactionChange.message_id,
+            Message.channel,
+            Message.reaction_count
         )
-        .group_by(Message.name)
+        .join(Message, Message.id == ReactionChange.message_id)
+        .where(ReactionChange.seq > since_seq)
+        .order_by(ReactionChange.seq)
+        .limit(limit)
+    )
+    if channel is not None:
+        stmt = stmt.where(Message.channel == channel)
+    changes = [row._asdict() for row in db.execute(stmt)]
+    if len(changes) >= limit:
+        watermark['reaction_seq'] = changes[-1]['seq']
+    return {'changes': changes, 'watermark': watermark}
+
+
+@cached(lambda params, result: {"users"})
+def get_users_list(db: Session, limit: int = 50, sort_by: str = "name") -> list[dict]:
+    """Get list of users with message count and last activity."""
+    stmt = select(
+        UserStats.name,
+        UserStats.message_count,
+        UserStats.last_activity
     )
     
     if sort_by == "name":
-        stmt = stmt.order_by(Message.name)
+        stmt = stmt.order_by(UserStats.name)
     elif sort_by == "messages":
-        stmt = stmt.order_by(func.count(Message.id).desc())
+        stmt = stmt.order_by(UserStats.message_count.desc())
     elif sort_by == "last_activity":
-        stmt = stmt.order_by(func.max(Message.created_at).desc())
+        stmt = stmt.order_by(UserStats.last_activity.desc())
     
     stmt = stmt.limit(limit)
     
     results = db.execute(stmt).all()
     
-    return [
-        {
-            'name': row[0],
-            'message_count': row[1],
-            'last_activity': row[2].isoformat() if row[2] else None
-        }
-        for row in results
-    ]
+    return [row._asdict() for row in results]
 
 
-def search_messages(db: Session, query: str, limit: int = 50) -> list[dict]:
-    """Search messages by content or name (case-insensitive)."""
-    search_pattern = f"%{query}%"
-    
-    # Subquery for reply count
-    reply_count_subq = (
-        select(func.count(Message.id))
-        .where(Message.parent_id == Message.id)
-        .correlate(Message)
-        .scalar_subquery()
-    )
-    
-    # Subquery for reaction count
-    reaction_count_subq = (
-        select(func.count(Reaction.id))
-        .where(Reaction.message_id == Message.id)
-        .correlate(Message)
-        .scalar_subquery()
-    )
+def search_messages(
+    db: Session,
+    query: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    channel: Optional[str] = None,
+    sort: str = "relevance"
+) -> list[dict]:
+    """Search messages by content or name.
+
+    Uses the FTS5 index when available: results carry a bm25 ``rank``
+    (lower is better) and a highlighted ``snippet``, and the query supports
+    ``prefix*`` and ``"phrase"`` terms. Other backends fall back to a
+    case-insensitive LIKE scan ordered by recency.
+    """
+    if search.fts_available(db):
+        return _search_fts(db, query, limit, cursor, channel, sort)
     
-    stmt = (
-        select(
-            Message,
-            reply_count_subq.label('reply_count'),
-            reaction_count_subq.label('reaction_count')
+    pattern = f"%{query}%"
+    if channel:
+        return _message_page(db, limit, cursor, 'search_channel', pattern=pattern, channel=channel)
+    return _message_page(db, limit, cursor, 'search', pattern=pattern)
+
+
+# Above this many matches a recent-first search walks the created_at index
+# (stopping after a page) instead of sorting every match
+RECENT_SEARCH_SORT_MAX = 5000
+
+
+def _fts_match():
+    return search.match_target.op('MATCH')(bindparam('match'))
+
+
+@functools.lru_cache(maxsize=None)
+def _match_count_statement():
+    """Number of matches, counted up to ``threshold``."""
+    fts = search.messages_fts
+    matches = select(fts.c.rowid).where(_fts_match()).limit(bindparam('threshold')).subquery()
+    return select(func.count()).select_from(matches)
+
+
+@functools.lru_cache(maxsize=None)
+def _search_statement(in_channel: bool, sort: str, after_cursor: bool, index_scan: bool = False):
+    """Full-text search page through the messages_fts index (built once per shape).
+
+    The page of matching ids is picked first (``hits``), with the ORDER BY
+    and LIMIT; only then are the page's messages joined and their snippets
+    computed, so ``snippet()`` runs for ``limit`` rows, not for every match.
+
+    Relevance pages come straight from the index (bm25 ``rank``). Recent
+    pages either sort the matches by ``created_at`` or, with
+    ``index_scan``, walk the created_at index newest first and keep the
+    rows in the set of matches, which stops after a page instead of sorting
+    every match (see RECENT_SEARCH_SORT_MAX).
+    """
+    fts = search.messages_fts
+    messages = Message.__table__
+    if sort == "recent":
+        matches = select(fts.c.rowid).where(_fts_match())
+        # id + 0 keeps the planner off the primary key, so it walks an
+        # index in created_at order instead of sorting the matches
+        member = (messages.c.id + 0 if index_scan else messages.c.id).in_(matches)
+        hits = (
+            select(messages.c.id)
+            .where(member)
+            .order_by(*_NEWEST_FIRST)
+            .limit(bindparam('limit'))
         )
-        .where(
-            or_(
-                Message.content.ilike(search_pattern),
-                Message.name.ilike(search_pattern)
-            )
+        if in_channel:
+            hits = hits.where(messages.c.channel == bindparam('channel'))
+        if after_cursor:
+            hits = hits.where(_AFTER_CURSOR)
+    else:
+        hits = (
+            select(fts.c.rowid.label('id'), fts.c.rank.label('rank'))
+            .where(_fts_match())
+            .order_by(fts.c.rank, fts.c.rowid)
+            .limit(bindparam('limit'))
         )
-        .order_by(Message.created_at.desc())
-        .limit(limit)
-    )
-    
-    results = db.execute(stmt).all()
-    
-    messages = []
-    for row in results:
-        msg = row[0]
-        messages.append({
-            'id': msg.id,
-            'name': msg.name,
-            'content': msg.content,
-            'channel': msg.channel,
-            'parent_id': msg.parent_id,
-            'created_at': msg.created_at.isoformat(),
-            'updated_at': msg.updated_at.isoformat(),
-            'reply_count': row[1] or 0,
-            'reaction_count': row[2] or 0
-        })
-    
-    return messages
-
+        hit_id = fts.c.rowid
+        if in_channel:
+            hits = hits.join(messages, messages.c.id == fts.c.rowid).where(
+                messages.c.channel == bindparam('channel')
+            )
+            # Compared after the join, so rank is only computed for the channel's rows
+            hit_id = messages.c.id
+        if after_cursor:
+            hits = hits.where(tuple_(fts.c.rank, hit_id) > tuple_(
+                bindparam('cursor_rank', type_=Float()),
+                bindparam('cursor_id', type_=Message.id.type)
+            ))
+    hits = hits.cte('hits')
 
-def get_messages_by_user(db: Session, name: str, limit: int = 50) -> list[dict]:
-    """Get messages by user (partial match on name)."""
-    search_pattern = f"%{name}%"
-    
-    # Subquery for reply count
-    reply_count_subq = (
-        select(func.count(Message.id))
-        .where(Message.parent_id == Message.id)
-        .correlate(Message)
+    snippet = (
+        select(func.snippet(
+            search.match_target, 1, search.SNIPPET_START, search.SNIPPET_END, '…', 12
+        ))
+        .where(_fts_match(), fts.c.rowid == messages.c.id)
         .scalar_subquery()
     )
-    
-    # Subquery for reaction count
-    reaction_count_subq = (
-        select(func.count(Reaction.id))
-        .where(Reaction.message_id == Message.id)
-        .correlate(Message)
-        .scalar_subquery()
-    )
-    
-    stmt = (
-        select(
-            Message,
-            reply_count_subq.label('reply_count'),
-            reaction_count_subq.label('reaction_count')
-        )
-        .where(Message.name.ilike(search_pattern))
-        .order_by(Message.created_at.desc())
-        .limit(limit)
+    columns = list(MESSAGE_COLUMNS)
+    if sort == "recent":
+        order = _NEWEST_FIRST
+    else:
+        columns.append(hits.c.rank)
+        order = (hits.c.rank, hits.c.id)
+    return (
+        select(*columns, snippet.label('snippet'))
+        .select_from(hits.join(messages, messages.c.id == hits.c.id))
+        .order_by(*order)
     )
+
+
+def _search_fts(
+    db: Session,
+    query: str,
+    limit: int,
+    cursor: Optional[str],
+    channel: Optional[str],
+    sort: str
+) -> list[dict]:
+    """Full-text search through the messages_fts index."""
+    match = search.build_match_query(query)
+    if not match:
+        return []
     
-    results = db.execute(stmt).all()
-    
-    messages = []
-    for row in results:
-        msg = row[0]
-        messages.append({
-            'id': msg.id,
-            'name': msg.name,
-            'content': msg.content,
-            'channel': msg.channel,
-            'parent_id': msg.parent_id,
-            'created_at': msg.created_at.isoformat(),
-            'updated_at': msg.updated_at.isoformat(),
-            'reply_count': row[1] or 0,
-            'reaction_count': row[2] or 0
-        })
-    
-    return messages
+    params = {'match': match, 'limit': limit}
+    if channel:
+        params['channel'] = channel
+    index_scan = False
+    if sort == "recent":
+        if cursor:
+            params['cursor_created_at'], params['cursor_id'] = decode_cursor(cursor)
+        # Cheap (bounded) count: sorting a few matches beats walking the index
+        index_scan = db.connection().execute(
+            _match_count_statement(),
+            {'match': match, 'threshold': RECENT_SEARCH_SORT_MAX}
+        ).scalar() >= RECENT_SEARCH_SORT_MAX
+    elif cursor:
+        params['cursor_rank'], params['cursor_id'] = decode_rank_cursor(cursor)
+    return _fetch(db, _search_statement(bool(channel), sort, bool(cursor), index_scan), params)
+
+
+def get_messages_by_user(
+    db: Session,
+    name: str,
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> list[dict]:
+    """Get messages by user (partial match on name)."""
+    return _message_page(db, limit, cursor, 'user', pattern=f"%{name}%")
 
 
 def get_messages_by_date_range(
     db: Session, 
     start_date: datetime, 
     end_date: datetime, 
-    limit: int = 50
+    limit: int = 50,
+    cursor: Optional[str] = None
 ) -> list[dict]:
     """Get messages within a date range."""
-    # Subquery for reply count
-    reply_count_subq = (
-        select(func.count(Message.id))
-        .where(Message.parent_id == Message.id)
-        .correlate(Message)
-        .scalar_subquery()
-    )
-    
-    # Subquery for reaction count
-    reaction_count_subq = (
-        select(func.count(Reaction.id))
-        .where(Reaction.message_id == Message.id)
-        .correlate(Message)
-        .scalar_subquery()
-    )
+    return _message_page(db, limit, cursor, 'date_range', start_date=start_date, end_date=end_date)
+
+
+EXPORT_COLUMNS = (
+    Message.id,
+    Message.parent_id,
+    Message.name,
+    Message.content,
+    Message.channel,
+    Message.created_at,
+    Message.updated_at,
+)
+
+
+def export_messages(
+    db: Session,
+    channel: Optional[str] = None,
+    name: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    after_id: Optional[int] = None,
+    batch_size: int = 1000
+) -> Iterator[list[dict]]:
+    """Stream messages (and replies) with their reactions, oldest first.
+
+    Yields batches of at most ``batch_size`` messages, each carrying a
+    ``reactions`` list. Every batch is one keyset page on (created_at, id)
+    plus one IN query for its reactions, read in its own short transaction
+    that ends before the batch is yielded: memory use does not depend on
+    the size of the export, and writers are not blocked while the consumer
+    handles a batch (a long read would hold SQLite's shared lock under the
+    rollback journal). ``after_id`` resumes an interrupted export after the
+    last message id received.
+    """
+    stmt = select(*EXPORT_COLUMNS).order_by(Message.created_at, Message.id).limit(batch_size)
+    if channel:
+        stmt = stmt.where(Message.channel == channel)
+    if name:
+        stmt = stmt.where(Message.name == name)
+    if start_date:
+        stmt = stmt.where(Message.created_at >= start_date)
+    if end_date:
+        stmt = stmt.where(Message.created_at <= end_date)
+    after = None
+    if after_id is not None:
+        created_at = db.execute(
+            select(Message.created_at).where(Message.id == after_id)
+        ).scalar_one_or_none()
+        if created_at is None:
+            db.close()
+            raise ValueError(f"Message {after_id} not found")
+        after = (created_at, after_id)
     
-    stmt = (
-        select(
-            Message,
-            reply_count_subq.label('reply_count'),
-            reaction_count_subq.label('reaction_count')
-        )
-        .where(
-            and_(
-                Message.created_at >= start_date,
-                Message.created_at <= end_date
-            )
+    while True:
+        page = stmt if after is None else stmt.where(tuple_(Message.created_at, Message.id) > after)
+        messages = [row._asdict() for row in db.execute(page)]
+        if not messages:
+            db.close()
+            return
+        reactions = {}
+        reaction_rows = db.execute(
+            select(Reaction.message_id, Reaction.user_name, Reaction.emoji, Reaction.created_at)
+            .where(Reaction.message_id.in_([m['id'] for m in messages]))
+            .order_by(Reaction.message_id, Reaction.id)
         )
-        .order_by(Message.created_at.desc())
-        .limit(limit)
-    )
-    
-    results = db.execute(stmt).all()
-    
-    messages = []
-    for row in results:
-        msg = row[0]
-        messages.append({
-            'id': msg.id,
-            'name': msg.name,
-            'content': msg.content,
-            'channel': msg.channel,
-            'parent_id': msg.parent_id,
-            'created_at': msg.created_at.isoformat(),
-            'updated_at': msg.updated_at.isoformat(),
-            'reply_count': row[1] or 0,
-            'reaction_count': row[2] or 0
-        })
-    
-    return messages
+        for row in reaction_rows:
+            reactions.setdefault(row.message_id, []).append({
+                'user_name': row.user_name,
+                'emoji': row.emoji,
+                'created_at': row.created_at
+            })
+        # End the read transaction before handing the batch out
+        db.close()
+        for message in messages:
+            message['reactions'] = reactions.get(message['id'], [])
+        after = (messages[-1]['created_at'], messages[-1]['id'])
+        yield messages
+        if len(messages) < batch_size:
+            return
@@ -0,0 +1,184 @@
+"""Async CRUD operations for Python MCP Chat.
+
+Mirrors ``app.crud`` on top of ``AsyncSession``. Each operation runs the
+sync implementation through ``AsyncSession.run_sync``, which executes it on
+the event loop (via greenlet) against the async driver, so both layers
+share one set of queries and behave identically without a thread hop.
+"""
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import crud
+
+
+async def send_message(db: AsyncSession, name: str, content: str, channel: str = "general") -> int:
+    """Send a new message."""
+    return await db.run_sync(crud.send_message, name, content, channel)
+
+
+async def send_messages_batch(db: AsyncSession, items: list[dict]) -> list[dict]:
+    """Send many messages in one transaction."""
+    return await db.run_sync(crud.send_messages_batch, items)
+
+
+async def get_messages(
+    db: AsyncSession,
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> list[dict]:
+    """Get recent messages with reply and reaction counts."""
+    return await db.run_sync(crud.get_messages, limit, cursor)
+
+
+async def reply_to_message(db: AsyncSession, parent_id: int, name: str, content: str) -> int:
+    """Reply to a message (inherits channel from parent)."""
+    return await db.run_sync(crud.reply_to_message, parent_id, name, content)
+
+
+async def get_message_by_id(db: AsyncSession, message_id: int) -> Optional[dict]:
+    """Get a message by ID."""
+    return await db.run_sync(crud.get_message_by_id, message_id)
+
+
+async def message_feed(
+    db: AsyncSession,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    since_id: Optional[int] = None,
+    since_ts: Optional[datetime] = None,
+    channel: Optional[str] = None
+) -> dict:
+    """A page of top-level messages with its next cursor and watermark."""
+    return await db.run_sync(crud.message_feed, limit, cursor, since_id, since_ts, channel)
+
+
+async def get_watermark(db: AsyncSession) -> dict:
+    """Current high-water marks: newest message id and reaction change seq."""
+    return await db.run_sync(crud.get_watermark)
+
+
+async def get_message_thread(
+    db: AsyncSession,
+    message_id: int,
+    since_id: Optional[int] = None
+) -> Optional[dict]:
+    """Get a message thread with parent and replies."""
+    return await db.run_sync(crud.get_message_thread, message_id, since_id)
+
+
+async def get_thread_tree(
+    db: AsyncSession,
+    message_id: int,
+    direction: str = "descendants",
+    max_depth: int = 10,
+    max_nodes: int = 200,
+    order: str = "thread"
+) -> Optional[dict]:
+    """Get a message's reply tree or ancestor chain."""
+    return await db.run_sync(
+        crud.get_thread_tree, message_id, direction, max_depth, max_nodes, order
+    )
+
+
+async def get_messages_by_ids(
+    db: AsyncSession,
+    message_ids: list[int],
+    include_replies: bool = False
+) -> dict:
+    """Get many messages (optionally with replies) keyed by id."""
+    return await db.run_sync(crud.get_messages_by_ids, message_ids, include_replies)
+
+
+async def get_channels(db: AsyncSession) -> list[dict]:
+    """Get all channels with message count and last activity."""
+    return await db.run_sync(crud.get_channels)
+
+
+async def get_channel_messages(
+    db: AsyncSession,
+    channel: str,
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> list[dict]:
+    """Get messages from a specific channel."""
+    return await db.run_sync(crud.get_channel_messages, channel, limit, cursor)
+
+
+async def add_reaction(db: AsyncSession, message_id: int, user_name: str, emoji: str) -> None:
+    """Add a reaction to a message."""
+    await db.run_sync(crud.add_reaction, message_id, user_name, emoji)
+
+
+async def add_reactions_batch(db: AsyncSession, items: list[dict]) -> list[dict]:
+    """Add many reactions in one transaction."""
+    return await db.run_sync(crud.add_reactions_batch, items)
+
+
+async def remove_reaction(db: AsyncSession, message_id: int, user_name: str, emoji: str) -> None:
+    """Remove a reaction from a message."""
+    await db.run_sync(crud.remove_reaction, message_id, user_name, emoji)
+
+
+async def toggle_reaction(db: AsyncSession, message_id: int, user_name: str, emoji: str) -> bool:
+    """Add a reaction, or remove it if present. Returns True if added."""
+    return await db.run_sync(crud.toggle_reaction, message_id, user_name, emoji)
+
+
+async def get_message_reactions(db: AsyncSession, message_id: int) -> dict:
+    """Get reactions for a message, grouped by emoji."""
+    return await db.run_sync(crud.get_message_reactions, message_id)
+
+
+async def get_reactions_by_ids(db: AsyncSession, message_ids: list[int]) -> dict:
+    """Get the reactions of many messages keyed by id."""
+    return await db.run_sync(crud.get_reactions_by_ids, message_ids)
+
+
+async def reaction_feed(
+    db: AsyncSession,
+    since_seq: int = 0,
+    limit: int = 50,
+    channel: Optional[str] = None
+) -> dict:
+    """Messages whose reactions changed after ``since_seq``, in change order."""
+    return await db.run_sync(crud.reaction_feed, since_seq, limit, channel)
+
+
+async def get_users_list(db: AsyncSession, limit: int = 50, sort_by: str = "name") -> list[dict]:
+    """Get list of users with message count and last activity."""
+    return await db.run_sync(crud.get_users_list, limit, sort_by)
+
+
+async def search_messages(
+    db: AsyncSession,
+    query: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    channel: Optional[str] = None,
+    sort: str = "relevance"
+) -> list[dict]:
+    """Search messages by content or name."""
+    return await db.run_sync(crud.search_messages, query, limit, cursor, channel, sort)
+
+
+async def get_messages_by_user(
+    db: AsyncSession,
+    name: str,
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> list[dict]:
+    """Get messages by user (partial match on name)."""
+    return await db.run_sync(crud.get_messages_by_user, name, limit, cursor)
+
+
+async def get_messages_by_date_range(
+    db: AsyncSession,
+    start_date: datetime,
+    end_date: datetime,
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> list[dict]:
+    """Get messages within a date range."""
+    return await db.run_sync(
+        crud.get_messages_by_date_range, start_date, end_date, limit, cursor
+    )
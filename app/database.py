@@ -1,7 +1,35 @@
 """Database configuration and session management."""
-from sqlalchemy import create_engine
+import logging
+import threading
+import time
+from typing import AsyncIterator
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker, Session
-from app.config import DATABASE_URL
+from app.config import (
+    DATABASE_URL,
+    ASYNC_DATABASE_URL,
+    SQLITE_PRAGMAS,
+    SQLITE_OPTIMIZE_INTERVAL,
+)
+from app import metrics, profiling
+
+
+def configure_sqlite(engine: Engine, pragmas: dict) -> None:
+    """Apply PRAGMAs to every new connection of an SQLite engine."""
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
 
 # Create engine
 engine = create_engine(
@@ -9,10 +37,26 @@ engine = create_engine(
     connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
     echo=False
 )
+configure_sqlite(engine, SQLITE_PRAGMAS)
+
+metrics.instrument_engine(engine, "sync")
+profiling.instrument_engine(engine)
+profiling.configure_logging()
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine and session factory (used by app.crud_async)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False)
+configure_sqlite(async_engine.sync_engine, SQLITE_PRAGMAS)
+metrics.instrument_engine(async_engine.sync_engine, "async")
+profiling.instrument_engine(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Create base class for models
 Base = declarative_base()
 
@@ -26,7 +70,129 @@ def get_db() -> Session:
         db.close()
 
 
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency for FastAPI to get an async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def atomic_session() -> Session:
+    """Open a session whose writes all land in one outer transaction.
+
+    crud functions commit and roll back as usual, but on this session a
+    commit only releases a savepoint and a rollback only undoes the current
+    write; their cache invalidations and events are held (see
+    ``crud._after_commit``). Finish with ``end_atomic_session``.
+    """
+    connection = engine.connect()
+    connection.begin()
+    if engine.dialect.name == "sqlite":
+        # pysqlite defers BEGIN until the first write, which would make the
+        # first savepoint the transaction itself; IMMEDIATE also takes the
+        # write lock up front instead of failing to upgrade a read lock later
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+    db = SessionLocal(bind=connection, join_transaction_mode="create_savepoint")
+    db.info['held_effects'] = []
+    return db
+
+
+def end_atomic_session(db: Session, commit: bool) -> None:
+    """Commit (then run the held effects) or roll back an ``atomic_session``."""
+    connection = db.get_bind()
+    db.close()
+    try:
+        if commit:
+            connection.commit()
+        else:
+            connection.rollback()
+    finally:
+        connection.close()
+    if commit:
+        for effect, args in db.info.pop('held_effects'):
+            effect(*args)
+
+
+# Indexes of earlier versions now covered by a composite index (see models)
+OBSOLETE_INDEXES = ("ix_messages_parent_id", "ix_messages_channel")
+
+
 def init_db() -> None:
     """Initialize database tables."""
-    from app.models import Message, Reaction
+    import app.models  # noqa: F401  (register tables)
+    existing_tables = set(inspect(engine).get_table_names())
     Base.metadata.create_all(bind=engine)
+    added = _add_missing_columns()
+    # create_all() skips indexes on tables that already exist; this also
+    # restores indexes left dropped by an interrupted offline import
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        for name in OBSOLETE_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    
+    from app import search
+    # Also puts back missing FTS triggers (and then rebuilds the index)
+    search.create_fts(engine)
+    
+    from app import crud
+    if {"reply_count", "reaction_count", "last_reply_at"} & added.get("messages", set()):
+        with SessionLocal() as db:
+            crud.rebuild_counters(db)
+    if "messages" in existing_tables and not {"channel_stats", "user_stats"} <= existing_tables:
+        with SessionLocal() as db:
+            crud.rebuild_stats(db)
+
+
+def _add_missing_columns() -> dict[str, set[str]]:
+    """Add model columns missing from existing tables (ALTER TABLE ADD COLUMN).
+
+    Returns the added column names per table.
+    """
+    inspector = inspect(engine)
+    added = {}
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"
+                if column.server_default is not None:
+                    ddl += f" NOT NULL DEFAULT {column.server_default.arg}"
+                conn.execute(text(ddl))
+                added.setdefault(table.name, set()).add(column.name)
+    return added
+
+
+def optimize_db() -> None:
+    """Run "PRAGMA optimize" so SQLite refreshes stale query planner stats."""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA optimize"))
+
+
+_optimize_thread = None
+
+
+def start_periodic_optimize(interval: int = SQLITE_OPTIMIZE_INTERVAL) -> None:
+    """Start a daemon thread running optimize_db() every ``interval`` seconds.
+
+    Safe to call more than once; only one thread is started per process.
+    """
+    global _optimize_thread
+    if interval <= 0 or engine.dialect.name != "sqlite" or _optimize_thread is not None:
+        return
+
+    def _loop():
+        while True:
+            time.sleep(interval)
+            try:
+                optimize_db()
+            except Exception:
+                logging.getLogger(__name__).exception("PRAGMA optimize failed")
+
+    _optimize_thread = threading.Thread(target=_loop, name="sqlite-optimize", daemon=True)
+    _optimize_thread.start()
@@ -0,0 +1,104 @@
+"""Dispatch layer that runs blocking tool handlers off the event loop."""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional
+
+
+class ToolDispatcher:
+    """Run blocking tool handlers in a bounded worker pool.
+
+    Each tool gets its own semaphore so a burst of one slow tool (e.g. a
+    large search) cannot occupy every worker. Counters are kept per tool
+    and can be read with ``stats()``.
+    """
+
+    def __init__(self, max_workers: int, tool_limits: Optional[dict[str, int]] = None):
+        self.max_workers = max_workers
+        self.tool_limits = dict(tool_limits or {})
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="mcp-tool"
+        )
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict[str, int]] = {}
+
+    def _semaphore(self, tool: str) -> asyncio.Semaphore:
+        """Get (or lazily create) the semaphore for a tool."""
+        sem = self._semaphores.get(tool)
+        if sem is None:
+            limit = self.tool_limits.get(tool, self.max_workers)
+            sem = self._semaphores[tool] = asyncio.Semaphore(max(1, limit))
+        return sem
+
+    def _update(self, tool: str, **deltas: int) -> None:
+        """Apply counter deltas for a tool (called from any thread)."""
+        with self._lock:
+            counters = self._stats.setdefault(tool, {
+                'waiting': 0,
+                'queued': 0,
+                'running': 0,
+                'completed': 0,
+                'failed': 0
+            })
+            for key, delta in deltas.items():
+                counters[key] += delta
+
+    def _invoke(self, tool: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run ``fn`` inside a worker thread, tracking queue/run state."""
+        self._update(tool, queued=-1, running=1)
+        try:
+            return fn(*args)
+        finally:
+            self._update(tool, running=-1)
+
+    async def run(self, tool: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking callable for ``tool`` in the worker pool."""
+        self._update(tool, waiting=1)
+        async with self._semaphore(tool):
+            self._update(tool, waiting=-1, queued=1)
+            loop = asyncio.get_running_loop()
+            try:
+                result = await loop.run_in_executor(
+                    self._executor,
+                    functools.partial(self._invoke, tool, fn, *args)
+                )
+            except BaseException:
+                self._update(tool, failed=1)
+                raise
+            self._update(tool, completed=1)
+            return result
+
+    async def run_async(self, tool: str, fn: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        """Run a coroutine function for ``tool`` under the same per-tool limits."""
+        self._update(tool, waiting=1)
+        async with self._semaphore(tool):
+            self._update(tool, waiting=-1, running=1)
+            try:
+                result = await fn(*args)
+            except BaseException:
+                self._update(tool, failed=1)
+                raise
+            finally:
+                self._update(tool, running=-1)
+            self._update(tool, completed=1)
+            return result
+
+    def stats(self) -> dict:
+        """Return pool size and per-tool queue depth counters."""
+        with self._lock:
+            tools = {tool: dict(counters) for tool, counters in self._stats.items()}
+        return {
+            'max_workers': self.max_workers,
+            'tool_limits': dict(self.tool_limits),
+            'waiting': sum(c['waiting'] for c in tools.values()),
+            'queued': sum(c['queued'] for c in tools.values()),
+            'running': sum(c['running'] for c in tools.values()),
+            'tools': tools
+        }
+
+    def shutdown(self) -> None:
+        """Stop the worker pool."""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,140 @@
+"""In-process pub/sub bus for real-time chat events.
+
+``app.crud`` publishes after every committed write (new message, reply,
+reaction added/removed); ``app.api`` streams the events to SSE and
+WebSocket clients. Publishing never blocks the writer: events are handed
+to each subscriber's event loop and dropped when a subscriber's bounded
+queue is full. A subscriber that fell behind stops receiving events until
+it has drained its queue, then gets one ``lagged`` event with the number
+of dropped events so it can resync (e.g. with ``get-channel-messages``).
+Only writes made by this process are seen.
+"""
+import asyncio
+import threading
+from typing import Any, Iterable, Optional
+from app.config import EVENT_QUEUE_SIZE
+
+
+class Subscription:
+    """One subscriber: a channel filter and a bounded queue on its event loop."""
+
+    def __init__(self, channels: Optional[Iterable[str]], maxsize: int):
+        self.channels = set(channels) if channels else None  # None = all channels
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.loop = asyncio.get_running_loop()
+        self.dropped = 0
+
+    def wants(self, channel: str) -> bool:
+        return self.channels is None or channel in self.channels
+
+    def subscribe(self, channels: Iterable[str]) -> None:
+        """Add channels to a channel-filtered subscription."""
+        if self.channels is not None:
+            self.channels.update(channels)
+
+    def unsubscribe(self, channels: Iterable[str]) -> None:
+        """Stop receiving ``channels`` (turns an all-channels subscription into a filter)."""
+        if self.channels is None:
+            self.channels = set()
+        self.channels.difference_update(channels)
+
+    def _offer(self, event: dict) -> bool:
+        """Queue an event (event loop thread). Returns False if it was dropped."""
+        if self.dropped or self.queue.full():
+            self.dropped += 1
+            return False
+        self.queue.put_nowait(event)
+        return True
+
+    def _lagged(self) -> Optional[dict]:
+        """The ``lagged`` event, once a lagging subscriber has drained its queue."""
+        if self.dropped and self.queue.empty():
+            dropped, self.dropped = self.dropped, 0
+            return {'type': 'lagged', 'dropped': dropped}
+        return None
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next event, or None after ``timeout`` seconds without one."""
+        lagged = self._lagged()
+        if lagged:
+            return lagged
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def get_nowait(self) -> Optional[dict]:
+        """Next queued event, or None if there is none."""
+        lagged = self._lagged()
+        if lagged or self.queue.empty():
+            return lagged
+        return self.queue.get_nowait()
+
+
+class EventBus:
+    """Fan out published events to subscriptions, grouped by event loop."""
+
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscriptions: dict[asyncio.AbstractEventLoop, set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._stats = {'published': 0, 'delivered': 0, 'dropped': 0}
+
+    def subscribe(self, channels: Optional[Iterable[str]] = None) -> Subscription:
+        """Subscribe the running event loop to ``channels`` (None = all)."""
+        subscription = Subscription(channels, self.queue_size)
+        with self._lock:
+            self._subscriptions.setdefault(subscription.loop, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.loop)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.loop]
+
+    def publish(self, event_type: str, channel: str, data: dict[str, Any]) -> None:
+        """Publish an event (safe from any thread; no-op without subscribers)."""
+        if not self._subscriptions:
+            return
+        with self._lock:
+            self._seq += 1
+            self._stats['published'] += 1
+            event = {'seq': self._seq, 'type': event_type, 'channel': channel, 'data': data}
+            loops = list(self._subscriptions)
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._deliver, loop, event)
+            except RuntimeError:
+                # Loop already closed
+                pass
+
+    def _deliver(self, loop: asyncio.AbstractEventLoop, event: dict) -> None:
+        """Offer an event to the matching subscriptions of ``loop``."""
+        delivered = dropped = 0
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(loop, ()))
+        for subscription in subscriptions:
+            if subscription.wants(event['channel']):
+                if subscription._offer(event):
+                    delivered += 1
+                else:
+                    dropped += 1
+        with self._lock:
+            self._stats['delivered'] += delivered
+            self._stats['dropped'] += dropped
+
+    def stats(self) -> dict:
+        """Return publish/delivery counters and the number of subscribers."""
+        with self._lock:
+            return {
+                **self._stats,
+                'subscribers': sum(len(s) for s in self._subscriptions.values()),
+                'queue_size': self.queue_size
+            }
+
+
+bus = EventBus()
@@ -0,0 +1,310 @@
+"""Bulk import of chat archives (NDJSON or CSV).
+
+Each record is one message with the archive's own ``id``/``parent_id``
+and an optional ``reactions`` list, i.e. the format written by
+``GET /export/messages``. CSV files use the same column names, with
+``reactions`` (if present) holding a JSON list.
+
+Rows are inserted in chunks, one transaction per chunk, together with
+their ``import_ids`` mapping. Re-running an interrupted import skips
+every archive id that is already mapped, so nothing is duplicated.
+Parent links, counters and stats are rebuilt at the end. With
+``offline=True`` (only while nothing else uses the database) secondary
+indexes and the FTS triggers are also dropped for the load and rebuilt
+afterwards; if that import is interrupted, ``init_db()`` restores them on
+the next start.
+"""
+import csv
+import json
+import os
+import time
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, Optional
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, aliased
+from app import crud, schemas, search
+from app.database import Base
+from app.models import Message, Reaction, ImportedMessage
+
+# Tables whose secondary indexes are dropped during the load
+DEFERRED_INDEX_TABLES = ("messages", "reactions")
+
+
+def read_records(path: str, fmt: Optional[str] = None) -> Iterator[tuple[int, Any]]:
+    """Stream (line, record) pairs from an NDJSON or CSV archive.
+
+    The format defaults to the file extension. A line that cannot be
+    parsed yields a ValueError as its record, so the import reports it and
+    carries on.
+    """
+    fmt = fmt or ("csv" if path.endswith(".csv") else "ndjson")
+    with open(path, encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                record = {key: value for key, value in row.items() if value != ""}
+                if "reactions" in record:
+                    try:
+                        record["reactions"] = json.loads(record["reactions"])
+                    except ValueError:
+                        record = ValueError("reactions: invalid JSON")
+                yield reader.line_num, record
+        else:
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield number, json.loads(line)
+                except ValueError:
+                    yield number, ValueError("invalid JSON")
+
+
+def _chunks(records: Iterable, size: int) -> Iterator[list]:
+    """Split ``records`` into lists of at most ``size`` items."""
+    iterator = iter(records)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _error(report: dict, line: int, message: str) -> None:
+    """Count an error and keep the first few for the report."""
+    report['errors'] += 1
+    if len(report['error_samples']) < 10:
+        report['error_samples'].append({'line': line, 'error': message})
+
+
+def _validate(model, item: Any) -> tuple[Any, Optional[str]]:
+    """Validate one archive item, returning (model, None) or (None, error)."""
+    if not isinstance(item, dict):
+        return None, "expected an object"
+    try:
+        return model(**item), None
+    except ValidationError as e:
+        return None, "; ".join(
+            f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}"
+            for err in e.errors()
+        )
+
+
+def defer_indexes(engine: Engine) -> None:
+    """Drop secondary indexes on messages/reactions and the FTS triggers.
+
+    Only safe on an offline database: concurrent readers lose the indexes
+    and concurrent writes are missing from the search index.
+    """
+    with engine.begin() as conn:
+        for name in DEFERRED_INDEX_TABLES:
+            for index in Base.metadata.tables[name].indexes:
+                index.drop(bind=conn, checkfirst=True)
+        if engine.dialect.name == "sqlite":
+            search.drop_fts_triggers(conn)
+
+
+def restore_indexes(engine: Engine) -> bool:
+    """Recreate the indexes and FTS triggers dropped by defer_indexes().
+
+    The search index is rebuilt along with the triggers (see
+    ``search.create_fts``). Returns whether full-text search is available.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    return search.create_fts(engine)
+
+
+def _new_counts() -> dict:
+    """Per-chunk counters, added to the report once the chunk commits."""
+    return {'imported': 0, 'skipped': 0, 'reactions': 0, 'errors': 0, 'error_samples': []}
+
+
+def _add_counts(report: dict, counts: dict) -> None:
+    """Add a committed chunk's counters to the report."""
+    for key in ('imported', 'skipped', 'reactions', 'errors'):
+        report[key] += counts[key]
+    room = 10 - len(report['error_samples'])
+    report['error_samples'] += counts['error_samples'][:room]
+
+
+def _import_chunk(db: Session, source: str, chunk: list[tuple[int, Any]], report: dict) -> None:
+    """Insert one chunk of (line, record) pairs with their mapping and reactions.
+
+    ``report`` receives this chunk's counters (see ``_new_counts``).
+    """
+    messages = {}
+    for line, record in chunk:
+        if isinstance(record, ValueError):
+            _error(report, line, str(record))
+            continue
+        message, error = _validate(schemas.ImportMessage, record)
+        if error:
+            _error(report, line, error)
+            continue
+        if message.id in messages:
+            report['skipped'] += 1
+            continue
+        messages[message.id] = (line, message)
+
+    if messages:
+        existing = db.execute(
+            select(ImportedMessage.source_id).where(
+                ImportedMessage.source == source,
+                ImportedMessage.source_id.in_(list(messages))
+            )
+        ).scalars().all()
+        for source_id in existing:
+            del messages[source_id]
+            report['skipped'] += 1
+    if not messages:
+        return
+
+    pending = list(messages.values())
+    ids = db.execute(
+        insert(Message.__table__).returning(Message.id, sort_by_parameter_order=True),
+        [
+            {
+                'name': m.name,
+                'content': m.content,
+                'channel': m.channel,
+                'created_at': m.created_at,
+                'updated_at': m.updated_at or m.created_at
+            }
+            for _, m in pending
+        ]
+    ).scalars().all()
+    db.execute(
+        insert(ImportedMessage.__table__),
+        [
+            {
+                'source': source,
+                'source_id': m.id,
+                'message_id': message_id,
+                'source_parent_id': m.parent_id
+            }
+            for (_, m), message_id in zip(pending, ids)
+        ]
+    )
+
+    reactions = []
+    for (line, m), message_id in zip(pending, ids):
+        for item in m.reactions:
+            reaction, error = _validate(schemas.ImportReaction, item)
+            if error:
+                _error(report, line, f"reaction: {error}")
+                continue
+            created_at = reaction.created_at or m.created_at
+            reactions.append({
+                'message_id': message_id,
+                'user_name': reaction.user_name,
+                'emoji': reaction.emoji,
+                'created_at': created_at,
+                'updated_at': created_at
+            })
+    if reactions:
+        result = db.execute(
+            crud._dialect_insert(db)(Reaction.__table__).on_conflict_do_nothing(
+                index_elements=['message_id', 'user_name', 'emoji']
+            ),
+            reactions
+        )
+        # Duplicates are dropped by ON CONFLICT DO NOTHING
+        report['reactions'] += result.rowcount
+    report['imported'] += len(ids)
+
+
+def resolve_parents(db: Session, source: str) -> int:
+    """Point imported replies at their imported parents.
+
+    Returns the number of replies whose parent is not in the archive
+    (they are kept as top-level messages).
+    """
+    child = aliased(ImportedMessage)
+    parent = aliased(ImportedMessage)
+    db.execute(
+        update(Message)
+        .where(
+            Message.id == child.message_id,
+            Message.parent_id.is_(None),
+            child.source == source,
+            child.source_parent_id.is_not(None),
+            parent.source == source,
+            parent.source_id == child.source_parent_id
+        )
+        # Keep the archive's updated_at (the column has an onupdate default)
+        .values(parent_id=parent.message_id, updated_at=Message.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(
+        select(func.count())
+        .select_from(child)
+        .join(Message, Message.id == child.message_id)
+        .where(
+            child.source == source,
+            child.source_parent_id.is_not(None),
+            Message.parent_id.is_(None)
+        )
+    ).scalar_one()
+
+
+def import_archive(
+    engine: Engine,
+    path: str,
+    source: Optional[str] = None,
+    fmt: Optional[str] = None,
+    chunk_size: int = 5000,
+    offline: bool = False,
+    progress: Optional[Callable[[dict], None]] = None
+) -> dict:
+    """Import an archive and return a report (counts, rows/sec, errors).
+
+    ``source`` names the archive in ``import_ids`` (default: the file
+    name); use the same value when resuming an interrupted import.
+    ``progress`` is called with the report after every chunk.
+    ``offline`` drops the indexes and FTS triggers during the load; pass it
+    only when no server or other process is using the database.
+    """
+    source = source or os.path.basename(path)
+    report = {
+        'source': source,
+        'read': 0,
+        'imported': 0,
+        'skipped': 0,
+        'reactions': 0,
+        'errors': 0,
+        'orphans': 0,
+        'error_samples': []
+    }
+    start = time.perf_counter()
+
+    if offline:
+        defer_indexes(engine)
+    try:
+        for chunk in _chunks(read_records(path, fmt), chunk_size):
+            counts = _new_counts()
+            with Session(engine) as db, db.begin():
+                _import_chunk(db, source, chunk, counts)
+            # Only counted once committed
+            _add_counts(report, counts)
+            report['read'] += len(chunk)
+            elapsed = time.perf_counter() - start
+            report['rows_per_sec'] = round(report['read'] / elapsed) if elapsed else 0
+            if progress:
+                progress(report)
+
+        load_seconds = time.perf_counter() - start
+        with Session(engine) as db, db.begin():
+            report['orphans'] = resolve_parents(db, source)
+    finally:
+        if offline:
+            restore_indexes(engine)
+
+    # Derived data skipped during the load
+    with Session(engine) as db:
+        crud.rebuild_counters(db)
+        crud.rebuild_stats(db)
+
+    report['load_seconds'] = round(load_seconds, 2)
+    report['seconds'] = round(time.perf_counter() - start, 2)
+    report['rows_per_sec'] = round(report['read'] / load_seconds) if load_seconds else 0
+    return report
@@ -1,14 +1,26 @@
 """MCP Server for Python MCP Chat."""
 import asyncio
-import json
 import os
-from typing import Any
+from typing import Any, Optional
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
-from mcp.types import Tool, TextContent
-from app.database import SessionLocal, init_db
-from app import crud, schemas
-from app.config import ALLOWED_EMOJIS
+from mcp.server.lowlevel.helper_types import ReadResourceContents
+from mcp.types import Resource, ResourceTemplate, Tool, TextContent
+from pydantic import AnyUrl
+from sqlalchemy.orm import Session
+from app.database import (
+    SessionLocal,
+    AsyncSessionLocal,
+    atomic_session,
+    end_atomic_session,
+    init_db,
+    start_periodic_optimize,
+)
+from app import crud, metrics, profiling, resources, schemas
+from app.write_queue import writer
+from app.config import ALLOWED_EMOJIS, MCP_ASYNC_DB, MCP_WORKER_POOL_SIZE, MCP_TOOL_CONCURRENCY, WRITE_BEHIND
+from app.dispatch import ToolDispatcher
+from app.serialization import ToolResult, output_format, render
 
 # Optional: run the FastAPI app in background if MCP_HTTP_PORT is set
 try:
@@ -17,105 +29,466 @@ except Exception:
     UvicornServer = None
 
 
-app = Server("python-mcp-chat").instructions(
-    "You are an MCP server for a chat application called Python MCP Chat. "
-    "You have access to various tools to manage messages, threads, reactions, channels, and users. "
-    "Use the tools as needed to fulfill client requests."
+app = Server(
+    "python-mcp-chat",
+    instructions=(
+        "You are an MCP server for a chat application called Python MCP Chat. "
+        "You have access to various tools to manage messages, threads, reactions, channels, and users. "
+        "Use the tools as needed to fulfill client requests."
+    )
 )
 
+# Blocking database work runs here so the event loop (stdio + uvicorn) stays free
+dispatcher = ToolDispatcher(MCP_WORKER_POOL_SIZE, MCP_TOOL_CONCURRENCY)
 
-@app.list_tools()
-async def list_tools() -> list[Tool]:
-    """List all available MCP tools."""
-    return [
-        Tool(
-            name="send-message",
-            description="Send a message to a channel",
-            inputSchema=schemas.SendMessageInput.model_json_schema()
+# Tool definitions (also bound the "tool" label of the metrics)
+TOOLS = [
+    Tool(
+        name="send-message",
+        description="Send a message to a channel",
+        inputSchema=schemas.SendMessageInput.model_json_schema()
+    ),
+    Tool(
+        name="get-messages",
+        description=(
+            "Get recent messages with reply and reaction counts. "
+            "Pass since_id (the watermark of a previous call) or since_ts to get only newer messages"
         ),
-        Tool(
-            name="get-messages",
-            description="Get recent messages with reply and reaction counts",
-            inputSchema=schemas.GetMessagesInput.model_json_schema()
+        inputSchema=schemas.GetMessagesInput.model_json_schema()
+    ),
+    Tool(
+        name="reply-to-message",
+        description="Reply to a message (creates a thread)",
+        inputSchema=schemas.ReplyToMessageInput.model_json_schema()
+    ),
+    Tool(
+        name="get-message-thread",
+        description="Get a message thread with parent and all replies (or only replies after since_id)",
+        inputSchema=schemas.GetMessageThreadInput.model_json_schema()
+    ),
+    Tool(
+        name="get-thread-tree",
+        description=(
+            "Get a message's whole reply tree (replies of replies, direction=descendants) "
+            "or its ancestor chain up to the root (direction=ancestors) in one query. "
+            "Each node has depth, reply_count and reaction_count; limited by max_depth and "
+            "max_nodes, ordered by thread, depth or chronological"
         ),
-        Tool(
-            name="reply-to-message",
-            description="Reply to a message (creates a thread)",
-            inputSchema=schemas.ReplyToMessageInput.model_json_schema()
+        inputSchema=schemas.GetThreadTreeInput.model_json_schema()
+    ),
+    Tool(
+        name="get-messages-by-ids",
+        description=(
+            "Get many messages at once, keyed by id (missing ids listed apart). "
+            "With include_replies each message also has its direct replies, like get-message-thread"
         ),
-        Tool(
-            name="get-message-thread",
-            description="Get a message thread with parent and all replies",
-            inputSchema=schemas.GetMessageThreadInput.model_json_schema()
+        inputSchema=schemas.GetMessagesByIdsInput.model_json_schema()
+    ),
+    Tool(
+        name="get-channels",
+        description="Get all channels with message count and last activity",
+        inputSchema={}
+    ),
+    Tool(
+        name="get-channel-messages",
+        description=(
+            "Get messages from a specific channel. "
+            "Pass since_id (the watermark of a previous call) or since_ts to get only newer messages"
         ),
-        Tool(
-            name="get-channels",
-            description="Get all channels with message count and last activity",
-            inputSchema={}
+        inputSchema=schemas.GetChannelMessagesInput.model_json_schema()
+    ),
+    Tool(
+        name="add-reaction",
+        description=f"Add an emoji reaction to a message. Allowed emojis: {', '.join(ALLOWED_EMOJIS)}",
+        inputSchema=schemas.AddReactionInput.model_json_schema()
+    ),
+    Tool(
+        name="remove-reaction",
+        description="Remove an emoji reaction from a message",
+        inputSchema=schemas.RemoveReactionInput.model_json_schema()
+    ),
+    Tool(
+        name="toggle-reaction",
+        description="Add an emoji reaction to a message, or remove it if the user already reacted with it",
+        inputSchema=schemas.ToggleReactionInput.model_json_schema()
+    ),
+    Tool(
+        name="get-message-reactions",
+        description="Get all reactions for a message, grouped by emoji",
+        inputSchema=schemas.GetMessageReactionsInput.model_json_schema()
+    ),
+    Tool(
+        name="get-reactions-by-ids",
+        description="Get the reactions of many messages at once, grouped by emoji and keyed by message id",
+        inputSchema=schemas.GetReactionsByIdsInput.model_json_schema()
+    ),
+    Tool(
+        name="get-reaction-changes",
+        description=(
+            "Messages whose reaction counts changed after a watermark (since_seq), "
+            "oldest change first, with their current reaction_count"
         ),
-        Tool(
-            name="get-channel-messages",
-            description="Get messages from a specific channel",
-            inputSchema=schemas.GetChannelMessagesInput.model_json_schema()
+        inputSchema=schemas.GetReactionChangesInput.model_json_schema()
+    ),
+    Tool(
+        name="get-users-list",
+        description="Get list of users with message count and last activity",
+        inputSchema=schemas.GetUsersListInput.model_json_schema()
+    ),
+    Tool(
+        name="search-messages",
+        description=(
+            "Full-text search over message content and author name. "
+            "Words are ANDed, 'word*' matches a prefix and \"quoted text\" a phrase. "
+            "Results are ranked by relevance (or sort='recent') and include a highlighted snippet"
         ),
-        Tool(
-            name="add-reaction",
-            description=f"Add an emoji reaction to a message. Allowed emojis: {', '.join(ALLOWED_EMOJIS)}",
-            inputSchema=schemas.AddReactionInput.model_json_schema()
+        inputSchema=schemas.SearchMessagesInput.model_json_schema()
+    ),
+    Tool(
+        name="get-messages-by-user",
+        description="Get messages by a specific user (partial match)",
+        inputSchema=schemas.GetMessagesByUserInput.model_json_schema()
+    ),
+    Tool(
+        name="get-messages-by-date-range",
+        description="Get messages within a date range",
+        inputSchema=schemas.GetMessagesByDateRangeInput.model_json_schema()
+    ),
+    Tool(
+        name="send-messages-batch",
+        description=(
+            "Send many messages in one transaction. Each item takes the same fields as "
+            "send-message; returns an id or an error per item"
         ),
-        Tool(
-            name="remove-reaction",
-            description="Remove an emoji reaction from a message",
-            inputSchema=schemas.RemoveReactionInput.model_json_schema()
+        inputSchema=schemas.SendMessagesBatchInput.model_json_schema()
+    ),
+    Tool(
+        name="add-reactions-batch",
+        description=(
+            "Add many reactions in one transaction. Each item takes the same fields as "
+            "add-reaction; returns an id or an error per item"
         ),
-        Tool(
-            name="get-message-reactions",
-            description="Get all reactions for a message, grouped by emoji",
-            inputSchema=schemas.GetMessageReactionsInput.model_json_schema()
+        inputSchema=schemas.AddReactionsBatchInput.model_json_schema()
+    ),
+    Tool(
+        name="get-metrics",
+        description=(
+            "Server metrics: per-tool latency histograms, error counts, SQL statements per call "
+            "and connection pool state, in Prometheus text format (or format='json')"
         ),
-        Tool(
-            name="get-users-list",
-            description="Get list of users with message count and last activity",
-            inputSchema=schemas.GetUsersListInput.model_json_schema()
+        inputSchema=schemas.GetMetricsInput.model_json_schema()
+    ),
+    Tool(
+        name="batch",
+        description=(
+            "Run several tool calls ({name, arguments} items) in one request. Read-only items run "
+            "concurrently, writes in order; results come back in item order with per-item errors. "
+            "With atomic=true all write items run in one transaction: if any of them fails, none is applied"
         ),
-        Tool(
-            name="search-messages",
-            description="Search messages by content or name (case-insensitive)",
-            inputSchema=schemas.SearchMessagesInput.model_json_schema()
-        ),
-        Tool(
-            name="get-messages-by-user",
-            description="Get messages by a specific user (partial match)",
-            inputSchema=schemas.GetMessagesByUserInput.model_json_schema()
+        inputSchema=schemas.BatchInput.model_json_schema()
+    ),
+]
+
+TOOL_NAMES = {tool.name for tool in TOOLS}
+
+
+def _tool_label(name: str) -> str:
+    """Key for per-tool limits, stats and metrics.
+
+    Names come from the client, so unknown ones share one "unknown" entry
+    instead of growing the dispatcher's semaphore and counter dicts.
+    """
+    return name if name in TOOL_NAMES else "unknown"
+
+metrics.register_gauge(
+    "mcp_dispatcher_tasks",
+    "Tool calls in the worker pool by state (waiting, queued, running).",
+    ["tool", "state"],
+    lambda: [
+        ({'tool': tool, 'state': state}, counters[state])
+        for tool, counters in dispatcher.stats()['tools'].items()
+        if tool in TOOL_NAMES
+        for state in ('waiting', 'queued', 'running')
+    ]
+)
+
+
+@app.list_tools()
+async def list_tools() -> list[Tool]:
+    """List all available MCP tools."""
+    return TOOLS
+
+
+@app.list_resources()
+async def list_resources() -> list[Resource]:
+    """List one resource per channel."""
+    channels = await dispatcher.run("list-resources", _with_session, crud.get_channels)
+    return [
+        Resource(
+            uri=AnyUrl(resources.channel_uri(c['channel'])),
+            name=f"#{c['channel']}",
+            description=f"Newest messages in #{c['channel']}",
+            mimeType="application/json"
+        )
+        for c in channels
+    ]
+
+
+@app.list_resource_templates()
+async def list_resource_templates() -> list[ResourceTemplate]:
+    """Channel and thread resource templates."""
+    return [
+        ResourceTemplate(
+            uriTemplate=resources.CHANNEL_PREFIX + "{channel}",
+            name="channel",
+            description="Newest messages in a channel",
+            mimeType="application/json"
         ),
-        Tool(
-            name="get-messages-by-date-range",
-            description="Get messages within a date range",
-            inputSchema=schemas.GetMessagesByDateRangeInput.model_json_schema()
+        ResourceTemplate(
+            uriTemplate=resources.THREAD_PREFIX + "{message_id}",
+            name="thread",
+            description="A message with its parent and replies",
+            mimeType="application/json"
         ),
     ]
 
 
-@app.call_tool()
-async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
-    """Handle tool calls."""
+@app.read_resource()
+async def read_resource(uri: AnyUrl) -> list[ReadResourceContents]:
+    """Read a channel or thread resource."""
+    text = await dispatcher.run("read-resource", _with_session, resources.read_resource, str(uri))
+    return [ReadResourceContents(content=text, mime_type="application/json")]
+
+
+@app.subscribe_resource()
+async def subscribe_resource(uri: AnyUrl) -> None:
+    """Send notifications/resources/updated for ``uri`` to this session."""
+    resources.notifier.subscribe(app.request_context.session, str(uri))
+
+
+@app.unsubscribe_resource()
+async def unsubscribe_resource(uri: AnyUrl) -> None:
+    """Stop notifications for ``uri``."""
+    resources.notifier.unsubscribe(app.request_context.session, str(uri))
+
+
+def _with_session(fn, *args):
+    """Run ``fn(db, *args)`` with its own session (runs in a worker thread)."""
     db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+@app.call_tool()
+async def call_tool(name: str, arguments: dict[str, Any]) -> ToolResult:
+    """Handle tool calls off the event loop's critical path."""
+    with metrics.observe_tool(_tool_label(name)):
+        if name == "batch":
+            return await _call_tool_batch(arguments)
+        if WRITE_BEHIND and name in WRITE_BEHIND_TOOLS:
+            return await _call_tool_write_behind(name, arguments)
+        return await _dispatch_tool(name, arguments)
+
+
+async def _dispatch_tool(name: str, arguments: dict[str, Any], fmt: Optional[str] = None) -> ToolResult:
+    """Run a tool call with its own session in the worker pool (or async engine)."""
+    if MCP_ASYNC_DB:
+        return await dispatcher.run_async(_tool_label(name), _call_tool_async, name, arguments, fmt)
+    return await dispatcher.run(_tool_label(name), _call_tool_sync, name, arguments, fmt)
+
+
+def _call_tool_sync(name: str, arguments: dict[str, Any], fmt: Optional[str] = None) -> ToolResult:
+    """Handle a tool call with its own session (runs in a worker thread)."""
+    label = _tool_label(name)
+    with metrics.count_queries(label), profiling.request(label):
+        return _with_session(_handle_tool, name, arguments, fmt)
+
+
+async def _call_tool_async(name: str, arguments: dict[str, Any], fmt: Optional[str] = None) -> ToolResult:
+    """Handle a tool call on the async engine (runs on the event loop)."""
+    label = _tool_label(name)
+    with metrics.count_queries(label), profiling.request(label):
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(_handle_tool, name, arguments, fmt)
+
+
+# Tools whose writes go through the group-commit queue with WRITE_BEHIND=1
+WRITE_BEHIND_TOOLS = {"send-message", "reply-to-message", "add-reaction"}
+
+
+# Tools that write; every other tool only reads and may run concurrently in a batch
+WRITE_TOOLS = {
+    "send-message",
+    "reply-to-message",
+    "add-reaction",
+    "remove-reaction",
+    "toggle-reaction",
+    "send-messages-batch",
+    "add-reactions-batch",
+}
+
+
+def _call_tool_in_session(db: Session, name: str, arguments: dict[str, Any]) -> ToolResult:
+    """Handle a batch item on the batch's session (runs in a worker thread)."""
+    label = _tool_label(name)
+    with metrics.count_queries(label), profiling.request(label):
+        result = _handle_tool(db, name, arguments, "structured")
+    if not db.is_active:
+        # An unexpected error left the (savepoint) transaction failed
+        db.rollback()
+    return result
+
+
+def _batch_item(index: int, name: str, result: ToolResult) -> dict:
+    """Batch entry for one item: its structured payload, or its error."""
+    if isinstance(result, tuple):
+        payload = result[1]
+    else:
+        payload = {"summary": result[0].text}
+    if payload["summary"].startswith("❌"):
+        return {"index": index, "name": name, "error": payload["summary"]}
+    return {"index": index, "name": name, **payload}
+
+
+async def _call_tool_batch(arguments: dict[str, Any]) -> ToolResult:
+    """Run the items of a batch in order, consecutive reads concurrently.
+
+    Each read-only item runs in the worker pool with its own session, as a
+    separate call would, so a run of reads between two writes executes in
+    parallel. Write items run one after another on a single session. With
+    ``atomic`` that session is an ``atomic_session``: the first write opens
+    the transaction, later items (reads included) run inside it so they see
+    the batch's writes, and a failed write skips the remaining writes and
+    rolls back the ones already applied.
+    """
+    fmt = output_format("batch")
+    try:
+        data = schemas.BatchInput(**arguments)
+    except ValueError as e:
+        metrics.tool_error("batch", type(e).__name__)
+        return [TextContent(type="text", text=f"❌ Validation error: {str(e)}")]
+
+    results: list[Optional[dict]] = [None] * len(data.items)
+    reads: list[int] = []
+    db: Optional[Session] = None
+    failed: Optional[int] = None
+    finished = False
+
+    async def run_read(index: int) -> None:
+        item = data.items[index]
+        with metrics.observe_tool(_tool_label(item.name)):
+            result = await _dispatch_tool(item.name, item.arguments, "structured")
+        results[index] = _batch_item(index, item.name, result)
+
+    async def flush_reads() -> None:
+        await asyncio.gather(*(run_read(index) for index in reads))
+        reads.clear()
+
+    try:
+        for index, item in enumerate(data.items):
+            if item.name == "batch":
+                results[index] = {"index": index, "name": item.name, "error": "❌ batch cannot be nested"}
+                continue
+            write = item.name in WRITE_TOOLS
+            if not write and (db is None or not data.atomic):
+                reads.append(index)
+                continue
+            await flush_reads()
+            if write and failed is not None:
+                results[index] = {
+                    "index": index,
+                    "name": item.name,
+                    "error": f"❌ Skipped: item {failed} failed (atomic batch rolled back)"
+                }
+                continue
+            if db is None:
+                db = await dispatcher.run("batch", atomic_session if data.atomic else SessionLocal)
+            with metrics.observe_tool(_tool_label(item.name)):
+                result = await dispatcher.run(item.name, _call_tool_in_session, db, item.name, item.arguments)
+            results[index] = _batch_item(index, item.name, result)
+            if data.atomic and write and failed is None and "error" in results[index]:
+                failed = index
+        await flush_reads()
+        finished = True
+    finally:
+        if db is not None:
+            if data.atomic:
+                await dispatcher.run("batch", end_atomic_session, db, finished and failed is None)
+            else:
+                await dispatcher.run("batch", db.close)
+
+    if failed is not None:
+        for index, item in enumerate(data.items):
+            if item.name in WRITE_TOOLS and "error" not in results[index]:
+                results[index] = {
+                    "index": index,
+                    "name": item.name,
+                    "error": f"❌ Rolled back: item {failed} failed"
+                }
+    errors = sum(1 for result in results if "error" in result)
+    rolled_back = " (atomic batch rolled back)" if failed is not None else ""
+    return render(
+        fmt,
+        f"📦 Ran {len(results)} tool calls, {errors} failed{rolled_back}",
+        results,
+        rolled_back=failed is not None
+    )
+
+
+async def _call_tool_write_behind(name: str, arguments: dict[str, Any]) -> ToolResult:
+    """Handle a write tool through the group-commit queue (no worker thread held)."""
+    fmt = output_format(name)
+    try:
+        if name == "send-message":
+            data = schemas.SendMessageInput(**arguments)
+            msg_id = await writer.send_message(data.name, data.content, data.channel)
+            return render(fmt, f"✅ Message {msg_id} sent to #{data.channel} by {data.name}", id=msg_id)
+        
+        elif name == "reply-to-message":
+            data = schemas.ReplyToMessageInput(**arguments)
+            reply_id = await writer.reply_to_message(data.parent_message_id, data.name, data.content)
+            return render(
+                fmt,
+                f"✅ Reply {reply_id} added to message {data.parent_message_id} by {data.name}",
+                id=reply_id
+            )
+        
+        data = schemas.AddReactionInput(**arguments)
+        await writer.add_reaction(data.message_id, data.user_name, data.emoji)
+        return render(
+            fmt,
+            f"✅ Reaction {data.emoji} added to message {data.message_id} by {data.user_name}"
+        )
+    
+    except ValueError as e:
+        metrics.tool_error(name, type(e).__name__)
+        return [TextContent(type="text", text=f"❌ Validation error: {str(e)}")]
+    except Exception as e:
+        metrics.tool_error(name, type(e).__name__)
+        return [TextContent(type="text", text=f"❌ Error: {str(e)}")]
+
+
+def _handle_tool(db: Session, name: str, arguments: dict[str, Any], fmt: Optional[str] = None) -> ToolResult:
+    """Execute a tool against a (sync) session (in its configured format by default)."""
+    fmt = fmt or output_format(name)
     try:
         if name == "send-message":
             data = schemas.SendMessageInput(**arguments)
             msg_id = crud.send_message(db, data.name, data.content, data.channel)
-            return [TextContent(
-                type="text", 
-                text=f"✅ Message {msg_id} sent to #{data.channel} by {data.name}"
-            )]
+            return render(fmt, f"✅ Message {msg_id} sent to #{data.channel} by {data.name}", id=msg_id)
         
         elif name == "get-messages":
             data = schemas.GetMessagesInput(**arguments)
-            messages = crud.get_messages(db, data.limit)
-            return [TextContent(
-                type="text",
-                text=f"📨 Found {len(messages)} messages:\n\n{json.dumps(messages, indent=2)}"
-            )]
+            feed = crud.message_feed(db, data.limit, data.cursor, data.since_id, data.since_ts)
+            return render(
+                fmt,
+                f"📨 Found {len(feed['messages'])} messages",
+                feed['messages'],
+                feed['next_cursor'],
+                feed['watermark']
+            )
         
         elif name == "reply-to-message":
             data = schemas.ReplyToMessageInput(**arguments)
@@ -125,86 +498,156 @@ async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
                 data.name, 
                 data.content
             )
-            return [TextContent(
-                type="text",
-                text=f"✅ Reply {reply_id} added to message {data.parent_message_id} by {data.name}"
-            )]
+            return render(
+                fmt,
+                f"✅ Reply {reply_id} added to message {data.parent_message_id} by {data.name}",
+                id=reply_id
+            )
         
         elif name == "get-message-thread":
             data = schemas.GetMessageThreadInput(**arguments)
-            thread = crud.get_message_thread(db, data.message_id)
+            watermark = crud.get_watermark(db)
+            thread = crud.get_message_thread(db, data.message_id, data.since_id)
             if not thread:
-                return [TextContent(
-                    type="text",
-                    text=f"❌ Message {data.message_id} not found"
-                )]
-            return [TextContent(
-                type="text",
-                text=f"🧵 Thread for message {data.message_id}:\n\n{json.dumps(thread, indent=2)}"
-            )]
+                return render(fmt, f"❌ Message {data.message_id} not found")
+            return render(
+                fmt,
+                f"🧵 Thread for message {data.message_id}",
+                thread,
+                watermark=watermark
+            )
+        
+        elif name == "get-thread-tree":
+            data = schemas.GetThreadTreeInput(**arguments)
+            tree = crud.get_thread_tree(
+                db,
+                data.message_id,
+                data.direction,
+                data.max_depth,
+                data.max_nodes,
+                data.order
+            )
+            if not tree:
+                return render(fmt, f"❌ Message {data.message_id} not found")
+            truncated = " (truncated)" if tree['truncated'] else ""
+            return render(
+                fmt,
+                f"🌳 {len(tree['nodes'])} messages in the {data.direction} of message {data.message_id}{truncated}",
+                tree
+            )
+        
+        elif name == "get-messages-by-ids":
+            data = schemas.GetMessagesByIdsInput(**arguments)
+            result = crud.get_messages_by_ids(db, data.message_ids, data.include_replies)
+            return render(
+                fmt,
+                f"📨 Found {len(result['messages'])} messages ({len(result['missing'])} missing)",
+                result
+            )
         
         elif name == "get-channels":
             channels = crud.get_channels(db)
-            return [TextContent(
-                type="text",
-                text=f"📂 Found {len(channels)} channels:\n\n{json.dumps(channels, indent=2)}"
-            )]
+            return render(fmt, f"📂 Found {len(channels)} channels", channels)
         
         elif name == "get-channel-messages":
             data = schemas.GetChannelMessagesInput(**arguments)
-            messages = crud.get_channel_messages(db, data.channel, data.limit)
-            return [TextContent(
-                type="text",
-                text=f"📨 Found {len(messages)} messages in #{data.channel}:\n\n{json.dumps(messages, indent=2)}"
-            )]
+            feed = crud.message_feed(
+                db,
+                data.limit,
+                data.cursor,
+                data.since_id,
+                data.since_ts,
+                data.channel
+            )
+            return render(
+                fmt,
+                f"📨 Found {len(feed['messages'])} messages in #{data.channel}",
+                feed['messages'],
+                feed['next_cursor'],
+                feed['watermark']
+            )
         
         elif name == "add-reaction":
             data = schemas.AddReactionInput(**arguments)
             crud.add_reaction(db, data.message_id, data.user_name, data.emoji)
-            return [TextContent(
-                type="text",
-                text=f"✅ Reaction {data.emoji} added to message {data.message_id} by {data.user_name}"
-            )]
+            return render(
+                fmt,
+                f"✅ Reaction {data.emoji} added to message {data.message_id} by {data.user_name}"
+            )
         
         elif name == "remove-reaction":
             data = schemas.RemoveReactionInput(**arguments)
             crud.remove_reaction(db, data.message_id, data.user_name, data.emoji)
-            return [TextContent(
-                type="text",
-                text=f"✅ Reaction {data.emoji} removed from message {data.message_id} by {data.user_name}"
-            )]
+            return render(
+                fmt,
+                f"✅ Reaction {data.emoji} removed from message {data.message_id} by {data.user_name}"
+            )
+        
+        elif name == "toggle-reaction":
+            data = schemas.ToggleReactionInput(**arguments)
+            added = crud.toggle_reaction(db, data.message_id, data.user_name, data.emoji)
+            action = "added to" if added else "removed from"
+            return render(
+                fmt,
+                f"✅ Reaction {data.emoji} {action} message {data.message_id} by {data.user_name}",
+                added=added
+            )
         
         elif name == "get-message-reactions":
             data = schemas.GetMessageReactionsInput(**arguments)
             reactions = crud.get_message_reactions(db, data.message_id)
-            return [TextContent(
-                type="text",
-                text=f"😊 Reactions for message {data.message_id}:\n\n{json.dumps(reactions, indent=2)}"
-            )]
+            return render(fmt, f"😊 Reactions for message {data.message_id}", reactions)
+        
+        elif name == "get-reactions-by-ids":
+            data = schemas.GetReactionsByIdsInput(**arguments)
+            result = crud.get_reactions_by_ids(db, data.message_ids)
+            return render(
+                fmt,
+                f"😊 Reactions for {len(result['reactions'])} messages ({len(result['missing'])} missing)",
+                result
+            )
+        
+        elif name == "get-reaction-changes":
+            data = schemas.GetReactionChangesInput(**arguments)
+            feed = crud.reaction_feed(db, data.since_seq, data.limit, data.channel)
+            return render(
+                fmt,
+                f"🔄 Found {len(feed['changes'])} messages with changed reactions",
+                feed['changes'],
+                watermark=feed['watermark']
+            )
         
         elif name == "get-users-list":
             data = schemas.GetUsersListInput(**arguments)
             users = crud.get_users_list(db, data.limit, data.sort_by)
-            return [TextContent(
-                type="text",
-                text=f"👥 Found {len(users)} users (sorted by {data.sort_by}):\n\n{json.dumps(users, indent=2)}"
-            )]
+            return render(fmt, f"👥 Found {len(users)} users (sorted by {data.sort_by})", users)
         
         elif name == "search-messages":
             data = schemas.SearchMessagesInput(**arguments)
-            messages = crud.search_messages(db, data.query, data.limit)
-            return [TextContent(
-                type="text",
-                text=f"🔍 Found {len(messages)} messages matching '{data.query}':\n\n{json.dumps(messages, indent=2)}"
-            )]
+            messages = crud.search_messages(
+                db,
+                data.query,
+                data.limit,
+                data.cursor,
+                data.channel,
+                data.sort
+            )
+            return render(
+                fmt,
+                f"🔍 Found {len(messages)} messages matching '{data.query}'",
+                messages,
+                crud.next_cursor(messages, data.limit)
+            )
         
         elif name == "get-messages-by-user":
             data = schemas.GetMessagesByUserInput(**arguments)
-            messages = crud.get_messages_by_user(db, data.name, data.limit)
-            return [TextContent(
-                type="text",
-                text=f"👤 Found {len(messages)} messages by '{data.name}':\n\n{json.dumps(messages, indent=2)}"
-            )]
+            messages = crud.get_messages_by_user(db, data.name, data.limit, data.cursor)
+            return render(
+                fmt,
+                f"👤 Found {len(messages)} messages by '{data.name}'",
+                messages,
+                crud.next_cursor(messages, data.limit)
+            )
         
         elif name == "get-messages-by-date-range":
             data = schemas.GetMessagesByDateRangeInput(**arguments)
@@ -212,30 +655,53 @@ async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
                 db, 
                 data.start_date, 
                 data.end_date, 
-                data.limit
+                data.limit,
+                data.cursor
             )
-            return [TextContent(
-                type="text",
-                text=f"📅 Found {len(messages)} messages between {data.start_date} and {data.end_date}:\n\n{json.dumps(messages, indent=2)}"
-            )]
+            return render(
+                fmt,
+                f"📅 Found {len(messages)} messages between {data.start_date} and {data.end_date}",
+                messages,
+                crud.next_cursor(messages, data.limit)
+            )
+        
+        elif name == "send-messages-batch":
+            data = schemas.SendMessagesBatchInput(**arguments)
+            results = crud.send_messages_batch(db, data.messages)
+            sent = sum(1 for r in results if 'id' in r)
+            return render(fmt, f"✅ Sent {sent}/{len(results)} messages", results)
+        
+        elif name == "add-reactions-batch":
+            data = schemas.AddReactionsBatchInput(**arguments)
+            results = crud.add_reactions_batch(db, data.reactions)
+            added = sum(1 for r in results if 'id' in r)
+            return render(fmt, f"✅ Added {added}/{len(results)} reactions", results)
+        
+        elif name == "get-metrics":
+            data = schemas.GetMetricsInput(**arguments)
+            if data.format == "json":
+                return render(fmt, "📊 Metrics", metrics.REGISTRY.snapshot())
+            return [TextContent(type="text", text=metrics.REGISTRY.render())]
         
         else:
+            metrics.tool_error("unknown", "UnknownTool")
             return [TextContent(
                 type="text",
                 text=f"❌ Unknown tool: {name}"
             )]
     
     except ValueError as e:
+        metrics.tool_error(name, type(e).__name__)
         return [TextContent(type="text", text=f"❌ Validation error: {str(e)}")]
     except Exception as e:
+        metrics.tool_error(name, type(e).__name__)
         return [TextContent(type="text", text=f"❌ Error: {str(e)}")]
-    finally:
-        db.close()
 
 
 async def main():
     """Main entry point for the MCP server."""
     init_db()
+    start_periodic_optimize()
     # If MCP_HTTP_PORT is set, start the FastAPI (uvicorn) server in background
     # Default to port 8000 unless overridden by MCP_HTTP_PORT
     http_port = os.getenv("MCP_HTTP_PORT", "8000")
@@ -251,12 +717,20 @@ async def main():
             # Fall through to stdio server if uvicorn couldn't start
             pass
 
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream,
-            write_stream,
-            app.create_initialization_options()
-        )
+    options = app.create_initialization_options()
+    # The low-level server always advertises subscribe=False
+    options.capabilities.resources.subscribe = True
+    
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await app.run(
+                read_stream,
+                write_stream,
+                options
+            )
+    finally:
+        # Commit the writes still queued for group commit
+        await asyncio.to_thread(writer.close)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,431 @@
+"""Prometheus-style metrics for the MCP server and the REST API.
+
+A small, dependency-free implementation of counters, gauges and
+histograms rendered in the Prometheus text exposition format (served at
+``GET /metrics`` and by the ``get-metrics`` tool). Recorded:
+
+- per-tool and per-route latency histograms, in-flight gauges and error
+  counters by exception type (or HTTP status)
+- SQL statements: count and duration, in total and per request
+- connection pool usage, read when the metrics are rendered
+
+Per-request query counts use a context variable, so they follow a
+request into ``AsyncSession.run_sync`` and must be opened inside the
+worker thread for sync sessions (see ``app.main``).
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import METRICS_ENABLED
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class: a named metric family with fixed label names."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple, Any] = {}
+
+    def _key(self, labels: dict[str, Any]) -> tuple:
+        return tuple(labels[name] for name in self.labelnames)
+
+    def labels(self, **labels: Any) -> "BoundMetric":
+        """The metric with fixed label values (skips label handling on hot paths)."""
+        return BoundMetric(self, self._key(labels))
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [{'labels': dict(zip(self.labelnames, key)), 'value': value} for key, value in values]
+
+
+class BoundMetric:
+    """A metric with its label values already resolved."""
+
+    __slots__ = ("metric", "key")
+
+    def __init__(self, metric: Metric, key: tuple):
+        self.metric = metric
+        self.key = key
+
+    def inc(self, amount: float = 1) -> None:
+        self.metric._inc(self.key, amount)
+
+    def observe(self, value: float) -> None:
+        self.metric._observe(self.key, value)
+
+
+class Counter(Metric):
+    """Monotonic counter."""
+
+    kind = "counter"
+
+    def _inc(self, key: tuple, amount: float) -> None:
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        self._inc(self._key(labels), amount)
+
+
+class Gauge(Counter):
+    """Value that goes up and down."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class CallbackGauge(Gauge):
+    """Gauge whose samples are read from a callback at render time.
+
+    The callback returns ``(labels, value)`` pairs.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str],
+                 callback: Optional[Callable[[], Iterable[tuple[dict, float]]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.callbacks = [callback] if callback else []
+
+    def _collect(self) -> None:
+        values = {}
+        for callback in self.callbacks:
+            for labels, value in callback():
+                values[self._key(labels)] = value
+        with self._lock:
+            self._values = values
+
+    def samples(self) -> list[str]:
+        self._collect()
+        return super().samples()
+
+    def snapshot(self) -> list[dict]:
+        self._collect()
+        return super().snapshot()
+
+
+class Histogram(Metric):
+    """Cumulative histogram with fixed buckets, plus sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def _observe(self, key: tuple, value: float) -> None:
+        # First bucket whose upper bound is >= value
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def observe(self, value: float, **labels: Any) -> None:
+        self._observe(self._key(labels), value)
+
+    def _states(self) -> list[tuple[tuple, list[int], float, int]]:
+        with self._lock:
+            return [(key, list(s[0]), s[1], s[2]) for key, s in sorted(self._values.items())]
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, counts, total, count in self._states():
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+    def snapshot(self) -> list[dict]:
+        result = []
+        for key, counts, total, count in self._states():
+            result.append({
+                'labels': dict(zip(self.labelnames, key)),
+                'count': count,
+                'sum': total,
+                'p50': self._quantile(counts, count, 0.5),
+                'p95': self._quantile(counts, count, 0.95),
+                'p99': self._quantile(counts, count, 0.99)
+            })
+        return result
+
+    def _quantile(self, counts: list[int], count: int, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding quantile ``q`` (None if empty)."""
+        if not count:
+            return None
+        cumulative = 0
+        for bound, bucket in zip(self.buckets, counts):
+            cumulative += bucket
+            if cumulative >= q * count:
+                return bound if bound != float("inf") else None
+        return None
+
+
+class Registry:
+    """Ordered collection of metrics."""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for metric in self._metrics.values():
+            lines += metric.header()
+            lines += metric.samples()
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict[str, list[dict]]:
+        """All metrics as JSON-friendly dicts (histograms with bucket quantiles)."""
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+
+REGISTRY = Registry()
+
+TOOL_DURATION = REGISTRY.register(Histogram(
+    "mcp_tool_duration_seconds", "MCP tool call latency, including queueing.", ["tool"]
+))
+TOOL_ERRORS = REGISTRY.register(Counter(
+    "mcp_tool_errors_total", "MCP tool calls that failed, by exception type.", ["tool", "type"]
+))
+TOOL_IN_FLIGHT = REGISTRY.register(Gauge(
+    "mcp_tool_in_flight", "MCP tool calls in progress.", ["tool"]
+))
+HTTP_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "REST request latency (until the response starts).",
+    ["method", "route", "status"]
+))
+HTTP_ERRORS = REGISTRY.register(Counter(
+    "http_request_errors_total", "REST requests answered with an error, by status or exception type.",
+    ["method", "route", "type"]
+))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "REST requests in progress.", ["method"]
+))
+DB_QUERIES = REGISTRY.register(Counter(
+    "db_queries_total", "SQL statements executed.", ["engine"]
+))
+DB_QUERY_DURATION = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "SQL statement execution time.", ["engine"]
+))
+DB_QUERIES_PER_REQUEST = REGISTRY.register(Histogram(
+    "db_queries_per_request", "SQL statements per tool call or REST request.",
+    ["endpoint"], buckets=QUERY_COUNT_BUCKETS
+))
+DB_TIME_PER_REQUEST = REGISTRY.register(Histogram(
+    "db_time_per_request_seconds", "SQL execution time per tool call or REST request.", ["endpoint"]
+))
+POOL = REGISTRY.register(CallbackGauge(
+    "db_pool_connections", "Connection pool state (size, checked_in, checked_out, overflow).",
+    ["engine", "state"]
+))
+
+# Query counter of the current tool call / REST request: [count, seconds]
+_request_queries: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar(
+    "request_queries", default=None
+)
+
+
+def _observe_queries(endpoint: str, usage: list) -> None:
+    DB_QUERIES_PER_REQUEST.observe(usage[0], endpoint=endpoint)
+    DB_TIME_PER_REQUEST.observe(usage[1], endpoint=endpoint)
+
+
+@contextmanager
+def count_queries(endpoint: str) -> Iterator[None]:
+    """Record the SQL statements run inside the block as one request."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    usage = [0, 0.0]
+    token = _request_queries.set(usage)
+    try:
+        yield
+    finally:
+        _request_queries.reset(token)
+        _observe_queries(endpoint, usage)
+
+
+@contextmanager
+def observe_tool(tool: str) -> Iterator[None]:
+    """Time an MCP tool call and track it as in flight."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    TOOL_IN_FLIGHT.inc(tool=tool)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        TOOL_ERRORS.inc(tool=tool, type=type(e).__name__)
+        raise
+    finally:
+        TOOL_IN_FLIGHT.dec(tool=tool)
+        TOOL_DURATION.observe(time.perf_counter() - start, tool=tool)
+
+
+def tool_error(tool: str, error_type: str) -> None:
+    """Count a tool error that was turned into an error message."""
+    if METRICS_ENABLED:
+        TOOL_ERRORS.inc(tool=tool, type=error_type)
+
+
+def instrument_engine(engine: Engine, label: str) -> None:
+    """Time every statement of ``engine`` and expose its pool state."""
+    if not METRICS_ENABLED:
+        return
+
+    queries = DB_QUERIES.labels(engine=label)
+    duration = DB_QUERY_DURATION.labels(engine=label)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _end(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_metrics_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        queries.inc()
+        duration.observe(elapsed)
+        usage = _request_queries.get()
+        if usage is not None:
+            usage[0] += 1
+            usage[1] += elapsed
+
+    def pool_state():
+        pool = engine.pool
+        for state, method in (
+            ("size", "size"),
+            ("checked_in", "checkedin"),
+            ("checked_out", "checkedout"),
+            ("overflow", "overflow")
+        ):
+            if hasattr(pool, method):
+                # QueuePool.overflow() is negative until the pool is full
+                yield {'engine': label, 'state': state}, max(0, getattr(pool, method)())
+
+    POOL.callbacks.append(pool_state)
+
+
+def register_gauge(name: str, documentation: str, labelnames: Iterable[str],
+                   callback: Callable[[], Iterable[tuple[dict, float]]]) -> None:
+    """Expose a gauge computed from ``callback`` at render time."""
+    REGISTRY.register(CallbackGauge(name, documentation, labelnames, callback))
+
+
+class HTTPMetricsMiddleware:
+    """ASGI middleware recording latency, errors, in-flight requests and
+    SQL usage for every HTTP request.
+
+    Requests are labelled with the matched route template (e.g.
+    ``/messages/{message_id}``) to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        start = time.perf_counter()
+        timed = False
+
+        def route() -> str:
+            return getattr(scope.get("route"), "path", "unmatched")
+
+        def observe_latency() -> None:
+            nonlocal timed
+            if not timed:
+                timed = True
+                HTTP_DURATION.observe(
+                    time.perf_counter() - start, method=method, route=route(), status=str(status)
+                )
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                observe_latency()
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(method=method)
+        usage = [0, 0.0]
+        token = _request_queries.set(usage)
+        error_type = None
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            error_type = type(e).__name__
+            raise
+        finally:
+            _request_queries.reset(token)
+            HTTP_IN_FLIGHT.dec(method=method)
+            observe_latency()
+            if error_type is None and status >= 400:
+                error_type = str(status)
+            if error_type is not None:
+                HTTP_ERRORS.inc(method=method, route=route(), type=error_type)
+            _observe_queries(f"{method} {route()}", usage)
@@ -15,15 +15,20 @@ class Message(Base):
         ForeignKey("messages.id", ondelete="CASCADE"), 
         nullable=True
     )
-    name: Mapped[str] = mapped_column(String(50))
+    name: Mapped[str] = mapped_column(String(50), index=True)
     content: Mapped[str] = mapped_column(String(500))
-    channel: Mapped[str] = mapped_column(String(50), default="general", index=True)
+    channel: Mapped[str] = mapped_column(String(50), default="general")
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(
         default=datetime.utcnow, 
         onupdate=datetime.utcnow
     )
     
+    # Denormalized counters, maintained by crud writes (see crud.rebuild_counters)
+    reply_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    reaction_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    last_reply_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    
     # Relationships with cascade
     parent: Mapped[Optional["Message"]] = relationship(
         "Message",
@@ -44,8 +49,14 @@ class Message(Base):
     )
     
     __table_args__ = (
-        Index('ix_messages_parent_id', 'parent_id'),
         Index('ix_messages_created_at', 'created_at'),
+        # Also serves parent_id lookups (threads, reply counts)
+        Index('ix_messages_parent_id_created_at', 'parent_id', 'created_at'),
+        # Channel pages: channel = ? AND parent_id IS NULL, keyset on (created_at, id)
+        Index('ix_messages_channel_parent_id_created_at', 'channel', 'parent_id', 'created_at', 'id'),
+        # Everything in a channel (replies included) in (created_at, id) order:
+        # channel exports, channel-filtered feeds and recent-first search
+        Index('ix_messages_channel_created_at', 'channel', 'created_at', 'id'),
     )
 
 
@@ -71,3 +82,60 @@ class Reaction(Base):
         UniqueConstraint('message_id', 'user_name', 'emoji', name='uix_message_user_emoji'),
         Index('ix_reactions_message_id', 'message_id'),
     )
+
+
+class ReactionChange(Base):
+    """Latest reaction change per message, in change order.
+
+    Every reaction write moves the message to a new ``seq`` (AUTOINCREMENT,
+    never reused), so "seq > N" lists the messages whose reaction counts
+    changed since N.
+    """
+    __tablename__ = "reaction_changes"
+    
+    seq: Mapped[int] = mapped_column(primary_key=True)
+    message_id: Mapped[int] = mapped_column(
+        ForeignKey("messages.id", ondelete="CASCADE"),
+        unique=True
+    )
+    
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class ChannelStats(Base):
+    """Per-channel message count and last activity, maintained incrementally."""
+    __tablename__ = "channel_stats"
+    
+    channel: Mapped[str] = mapped_column(String(50), primary_key=True)
+    message_count: Mapped[int] = mapped_column(default=0)
+    last_activity: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+
+
+class UserStats(Base):
+    """Per-user message count and last activity, maintained incrementally."""
+    __tablename__ = "user_stats"
+    
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    message_count: Mapped[int] = mapped_column(default=0)
+    last_activity: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    
+    __table_args__ = (
+        Index('ix_user_stats_message_count', 'message_count'),
+        Index('ix_user_stats_last_activity', 'last_activity'),
+    )
+
+
+class ImportedMessage(Base):
+    """Archive id -> message id mapping written by app.importer.
+
+    Makes imports restartable (already mapped ids are skipped) and lets
+    replies reference parents that appear later in the archive.
+    """
+    __tablename__ = "import_ids"
+    
+    source: Mapped[str] = mapped_column(String(100), primary_key=True)
+    source_id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    message_id: Mapped[int] = mapped_column(
+        ForeignKey("messages.id", ondelete="CASCADE")
+    )
+    source_parent_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
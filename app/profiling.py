@@ -0,0 +1,206 @@
+"""Opt-in slow-query log (SLOW_QUERY_MS > 0).
+
+Statements are timed through SQLAlchemy engine events. Those slower than
+SLOW_QUERY_MS are logged (logger ``app.slow_query``, to stderr or
+SLOW_QUERY_LOG_FILE, never stdout since that is the MCP stdio channel) as
+one JSON object with:
+
+- the SQL and its parameters
+- ``EXPLAIN QUERY PLAN`` output (SQLite), run on a separate cursor
+- the calling crud function, found by walking the stack (slow queries only)
+- the MCP tool or REST request being served
+
+With SLOW_QUERY_SAMPLE_RATE < 1 only that fraction of statements is timed,
+which keeps the cost of leaving the log on in production negligible. The
+most recent entries are also kept in memory (``recent()``).
+"""
+import contextvars
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import (
+    SLOW_QUERY_MS,
+    SLOW_QUERY_SAMPLE_RATE,
+    SLOW_QUERY_EXPLAIN,
+    SLOW_QUERY_LOG_FILE,
+    SLOW_QUERY_KEEP,
+)
+
+ENABLED = SLOW_QUERY_MS > 0
+
+# Modules whose functions a slow statement is attributed to
+CALLER_MODULES = ("app.crud", "app.search", "app.importer", "app.resources")
+
+# Statements EXPLAIN QUERY PLAN is run for
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+MAX_PARAMETERS_LENGTH = 1000
+
+logger = logging.getLogger("app.slow_query")
+
+# Tool name or REST request being served (for attribution)
+_request: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("profiled_request", default=None)
+
+_recent: deque = deque(maxlen=SLOW_QUERY_KEEP)
+_lock = threading.Lock()
+_stats = {'timed': 0, 'slow': 0}
+
+
+@contextmanager
+def request(name: str) -> Iterator[None]:
+    """Attribute the statements run inside the block to ``name``."""
+    if not ENABLED:
+        yield
+        return
+    token = _request.set(name)
+    try:
+        yield
+    finally:
+        _request.reset(token)
+
+
+def _caller() -> Optional[str]:
+    """Outermost crud-level function on the stack, with the innermost one.
+
+    e.g. ``app.crud.get_messages`` or
+    ``app.crud.get_messages (via _message_page)``.
+    """
+    frames = []
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__")
+        if module in CALLER_MODULES:
+            frames.append(f"{module}.{frame.f_code.co_name}")
+        frame = frame.f_back
+    if not frames:
+        return None
+    outer, inner = frames[-1], frames[0]
+    if inner == outer:
+        return outer
+    return f"{outer} (via {inner.rsplit('.', 1)[1]})"
+
+
+def _parameters(parameters: Any, executemany: bool) -> str:
+    """Printable parameters (first set and count for executemany)."""
+    if executemany and parameters:
+        text = f"{parameters[0]!r} (+{len(parameters) - 1} more)"
+    else:
+        text = repr(parameters)
+    if len(text) > MAX_PARAMETERS_LENGTH:
+        text = text[:MAX_PARAMETERS_LENGTH] + "..."
+    return text
+
+
+def _explain(conn, statement: str, parameters: Any, executemany: bool) -> Optional[list[str]]:
+    """EXPLAIN QUERY PLAN rows for an SQLite statement (None if not applicable)."""
+    if not SLOW_QUERY_EXPLAIN or conn.dialect.name != "sqlite":
+        return None
+    if not statement.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    try:
+        # Raw DBAPI cursor: bypasses the engine events
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            return [row[-1] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    except Exception as e:
+        return [f"EXPLAIN failed: {e}"]
+
+
+def _record(conn, statement: str, parameters: Any, executemany: bool, elapsed: float) -> None:
+    entry = {
+        'ms': round(elapsed * 1000, 3),
+        'request': _request.get(),
+        'caller': _caller(),
+        'statement': " ".join(statement.split()),
+        'parameters': _parameters(parameters, executemany),
+        'executemany': executemany,
+        'plan': _explain(conn, statement, parameters, executemany),
+        'at': time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    with _lock:
+        _stats['slow'] += 1
+        _recent.append(entry)
+    logger.warning(json.dumps(entry, ensure_ascii=False))
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time the statements of ``engine`` (no-op unless SLOW_QUERY_MS > 0)."""
+    if not ENABLED:
+        return
+    threshold = SLOW_QUERY_MS / 1000
+    rate = SLOW_QUERY_SAMPLE_RATE
+    sample = random.random
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        if context is not None and (rate >= 1 or sample() < rate):
+            context._profile_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _end(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_profile_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        with _lock:
+            _stats['timed'] += 1
+        if elapsed >= threshold:
+            _record(conn, statement, parameters, executemany, elapsed)
+
+
+def configure_logging() -> None:
+    """Send the slow-query log to SLOW_QUERY_LOG_FILE or stderr."""
+    if not ENABLED or logger.handlers:
+        return
+    if SLOW_QUERY_LOG_FILE:
+        handler = logging.FileHandler(SLOW_QUERY_LOG_FILE)
+    else:
+        handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("%(asctime)s slow-query %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.WARNING)
+    logger.propagate = False
+
+
+def recent() -> list[dict]:
+    """The latest slow statements, newest first."""
+    with _lock:
+        return list(reversed(_recent))
+
+
+def stats() -> dict:
+    """Settings and counters of the slow-query log."""
+    with _lock:
+        return {
+            'enabled': ENABLED,
+            'threshold_ms': SLOW_QUERY_MS,
+            'sample_rate': SLOW_QUERY_SAMPLE_RATE,
+            **_stats
+        }
+
+
+class RequestNameMiddleware:
+    """ASGI middleware attributing statements to ``METHOD /path``."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with request(f"{scope['method']} {scope['path']}"):
+            await self.app(scope, receive, send)
@@ -0,0 +1,138 @@
+"""MCP resources for channels and threads, with change notifications.
+
+``chat://channel/<name>`` is the newest page of a channel (as returned by
+get-channel-messages) and ``chat://thread/<id>`` a message thread (as
+returned by get-message-thread). Clients can ``resources/subscribe`` to
+either; writes reach the notifier through ``app.events.bus`` and are
+coalesced so each subscribed URI gets at most one
+``notifications/resources/updated`` per RESOURCE_NOTIFY_INTERVAL.
+"""
+import asyncio
+from typing import Any, Optional
+from urllib.parse import quote, unquote
+from pydantic import AnyUrl
+from sqlalchemy.orm import Session
+from app import crud
+from app.config import RESOURCE_NOTIFY_INTERVAL
+from app.events import bus, Subscription
+from app.serialization import dumps
+
+CHANNEL_PREFIX = "chat://channel/"
+THREAD_PREFIX = "chat://thread/"
+
+
+def channel_uri(channel: str) -> str:
+    return CHANNEL_PREFIX + quote(channel, safe="")
+
+
+def thread_uri(message_id: int) -> str:
+    return f"{THREAD_PREFIX}{message_id}"
+
+
+def parse_uri(uri: str) -> tuple[str, Any]:
+    """Split a resource URI into ("channel", name) or ("thread", id)."""
+    if uri.startswith(CHANNEL_PREFIX) and len(uri) > len(CHANNEL_PREFIX):
+        return "channel", unquote(uri[len(CHANNEL_PREFIX):])
+    if uri.startswith(THREAD_PREFIX):
+        try:
+            return "thread", int(uri[len(THREAD_PREFIX):])
+        except ValueError:
+            pass
+    raise ValueError(f"Unknown resource: {uri}")
+
+
+def read_resource(db: Session, uri: str) -> str:
+    """JSON contents of a channel or thread resource."""
+    kind, key = parse_uri(uri)
+    if kind == "channel":
+        return dumps(crud.get_channel_messages(db, key))
+    thread = crud.get_message_thread(db, key)
+    if thread is None:
+        raise ValueError(f"Message {key} not found")
+    return dumps(thread)
+
+
+def event_uris(event: dict) -> set[str]:
+    """Resource URIs whose contents a bus event may have changed."""
+    data = event['data']
+    uris = {channel_uri(event['channel'])}
+    if event['type'] == 'reply':
+        uris.add(thread_uri(data['parent_id']))
+    elif event['type'] in ('reaction_added', 'reaction_removed'):
+        uris.add(thread_uri(data['message_id']))
+    return uris
+
+
+class ResourceNotifier:
+    """Track resource subscriptions per session and send coalesced updates.
+
+    The notifier only listens to the event bus while at least one URI is
+    subscribed.
+    """
+
+    def __init__(self, interval: float = RESOURCE_NOTIFY_INTERVAL):
+        self.interval = interval
+        self._sessions: dict[Any, set[str]] = {}
+        self._pending: set[str] = set()
+        self._subscription: Optional[Subscription] = None
+        self._task: Optional[asyncio.Task] = None
+        self.sent = 0
+
+    def _subscribed(self) -> set[str]:
+        return set().union(*self._sessions.values())
+
+    def subscribe(self, session: Any, uri: str) -> None:
+        parse_uri(uri)
+        self._sessions.setdefault(session, set()).add(uri)
+        if self._task is None:
+            self._subscription = bus.subscribe()
+            self._task = asyncio.create_task(self._run())
+
+    def unsubscribe(self, session: Any, uri: str) -> None:
+        uris = self._sessions.get(session)
+        if uris is not None:
+            uris.discard(uri)
+            if not uris:
+                del self._sessions[session]
+        if not self._sessions:
+            self._stop()
+
+    def _stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            bus.unsubscribe(self._subscription)
+            self._task = self._subscription = None
+            self._pending.clear()
+
+    def _mark(self, event: dict) -> None:
+        """Remember which subscribed URIs an event touches."""
+        if event['type'] == 'lagged':
+            self._pending |= self._subscribed()
+        else:
+            self._pending |= event_uris(event)
+
+    async def _run(self) -> None:
+        subscription = self._subscription
+        while True:
+            self._mark(await subscription.get())
+            # Let the rest of the burst arrive, then send one update per URI
+            await asyncio.sleep(self.interval)
+            while (event := subscription.get_nowait()) is not None:
+                self._mark(event)
+            await self._flush()
+
+    async def _flush(self) -> None:
+        pending, self._pending = self._pending, set()
+        for session, uris in list(self._sessions.items()):
+            try:
+                for uri in sorted(uris & pending):
+                    await session.send_resource_updated(AnyUrl(uri))
+                    self.sent += 1
+            except Exception:
+                # Session closed: forget its subscriptions
+                self._sessions.pop(session, None)
+        if not self._sessions:
+            self._stop()
+
+
+notifier = ResourceNotifier()
@@ -1,8 +1,8 @@
 """Pydantic schemas for validation."""
-from datetime import datetime
-from typing import Literal, Optional
-from pydantic import BaseModel, Field, field_validator
-from app.config import ALLOWED_EMOJIS
+from datetime import datetime, timezone
+from typing import Any, Literal, Optional
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from app.config import ALLOWED_EMOJIS, BATCH_MAX_ITEMS
 
 
 class SendMessageInput(BaseModel):
@@ -15,6 +15,9 @@ class SendMessageInput(BaseModel):
 class GetMessagesInput(BaseModel):
     """Schema for getting recent messages."""
     limit: int = Field(default=50, ge=1, le=100)
+    cursor: Optional[str] = Field(default=None, max_length=200)
+    since_id: Optional[int] = Field(default=None, ge=0)
+    since_ts: Optional[datetime] = None
 
 
 class ReplyToMessageInput(BaseModel):
@@ -27,12 +30,25 @@ class ReplyToMessageInput(BaseModel):
 class GetMessageThreadInput(BaseModel):
     """Schema for getting a message thread."""
     message_id: int = Field(..., gt=0)
+    since_id: Optional[int] = Field(default=None, ge=0)
+
+
+class GetThreadTreeInput(BaseModel):
+    """Schema for getting a message's whole subtree or its ancestor chain."""
+    message_id: int = Field(..., gt=0)
+    direction: Literal["descendants", "ancestors"] = "descendants"
+    max_depth: int = Field(default=10, ge=1, le=100)
+    max_nodes: int = Field(default=200, ge=1, le=1000)
+    order: Literal["thread", "depth", "chronological"] = "thread"
 
 
 class GetChannelMessagesInput(BaseModel):
     """Schema for getting messages from a channel."""
     channel: str = Field(..., max_length=50)
     limit: int = Field(default=50, ge=1, le=100)
+    cursor: Optional[str] = Field(default=None, max_length=200)
+    since_id: Optional[int] = Field(default=None, ge=0)
+    since_ts: Optional[datetime] = None
 
 
 class AddReactionInput(BaseModel):
@@ -56,11 +72,27 @@ class RemoveReactionInput(BaseModel):
     emoji: str = Field(..., max_length=10)
 
 
+class ToggleReactionInput(AddReactionInput):
+    """Schema for toggling a reaction (add it, or remove it if present)."""
+
+
 class GetMessageReactionsInput(BaseModel):
     """Schema for getting message reactions."""
     message_id: int = Field(..., gt=0)
 
 
+class GetReactionChangesInput(BaseModel):
+    """Schema for the changed-reaction feed."""
+    since_seq: int = Field(default=0, ge=0)
+    limit: int = Field(default=50, ge=1, le=100)
+    channel: Optional[str] = Field(default=None, max_length=50)
+
+
+class GetMetricsInput(BaseModel):
+    """Schema for reading the server metrics."""
+    format: Literal["prometheus", "json"] = Field(default="prometheus")
+
+
 class GetUsersListInput(BaseModel):
     """Schema for getting users list."""
     limit: int = Field(default=50, ge=1, le=100)
@@ -71,12 +103,16 @@ class SearchMessagesInput(BaseModel):
     """Schema for searching messages."""
     query: str = Field(..., min_length=1, max_length=200)
     limit: int = Field(default=50, ge=1, le=100)
+    cursor: Optional[str] = Field(default=None, max_length=200)
+    channel: Optional[str] = Field(default=None, max_length=50)
+    sort: Literal["relevance", "recent"] = Field(default="relevance")
 
 
 class GetMessagesByUserInput(BaseModel):
     """Schema for getting messages by user."""
     name: str = Field(..., min_length=1, max_length=50)
     limit: int = Field(default=50, ge=1, le=100)
+    cursor: Optional[str] = Field(default=None, max_length=200)
 
 
 class GetMessagesByDateRangeInput(BaseModel):
@@ -84,3 +120,109 @@ class GetMessagesByDateRangeInput(BaseModel):
     start_date: datetime
     end_date: datetime
     limit: int = Field(default=50, ge=1, le=100)
+    cursor: Optional[str] = Field(default=None, max_length=200)
+
+
+class SendMessagesBatchInput(BaseModel):
+    """Schema for sending many messages at once (items validated one by one)."""
+    messages: list[dict[str, Any]] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class AddReactionsBatchInput(BaseModel):
+    """Schema for adding many reactions at once (items validated one by one)."""
+    reactions: list[dict[str, Any]] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class GetMessagesByIdsInput(BaseModel):
+    """Schema for resolving many messages (optionally with replies) at once."""
+    message_ids: list[int] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+    include_replies: bool = Field(default=False)
+
+
+class GetReactionsByIdsInput(BaseModel):
+    """Schema for getting the reactions of many messages at once."""
+    message_ids: list[int] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class BatchCall(BaseModel):
+    """One tool invocation of a batch."""
+    name: str = Field(..., min_length=1)
+    arguments: dict[str, Any] = Field(default_factory=dict)
+
+
+class BatchInput(BaseModel):
+    """Schema for running many tool calls in one request."""
+    items: list[BatchCall] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+    atomic: bool = Field(default=False)
+
+
+class ImportMessage(BaseModel):
+    """Schema for one archived message (see app.importer)."""
+    id: str = Field(..., min_length=1, max_length=100)
+    parent_id: Optional[str] = Field(default=None, max_length=100)
+    name: str = Field(..., min_length=1, max_length=50)
+    content: str = Field(..., min_length=1, max_length=500)
+    channel: str = Field(default="general", max_length=50)
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    reactions: list[dict[str, Any]] = Field(default_factory=list)
+    
+    @field_validator('id', 'parent_id', mode='before')
+    @classmethod
+    def source_id_to_str(cls, v: Any) -> Any:
+        return str(v) if isinstance(v, int) else v
+    
+    @field_validator('created_at', 'updated_at')
+    @classmethod
+    def to_naive_utc(cls, v: Optional[datetime]) -> Optional[datetime]:
+        if v is not None and v.tzinfo is not None:
+            v = v.astimezone(timezone.utc).replace(tzinfo=None)
+        return v
+
+
+class ImportReaction(BaseModel):
+    """Schema for one reaction of an archived message."""
+    user_name: str = Field(..., min_length=1, max_length=50)
+    emoji: str = Field(..., max_length=10)
+    created_at: Optional[datetime] = None
+    
+    @field_validator('emoji')
+    @classmethod
+    def validate_emoji(cls, v: str) -> str:
+        if v not in ALLOWED_EMOJIS:
+            raise ValueError(f'Emoji must be one of: {", ".join(ALLOWED_EMOJIS)}')
+        return v
+    
+    @field_validator('created_at')
+    @classmethod
+    def to_naive_utc(cls, v: Optional[datetime]) -> Optional[datetime]:
+        if v is not None and v.tzinfo is not None:
+            v = v.astimezone(timezone.utc).replace(tzinfo=None)
+        return v
+
+
+def validate_batch(model: type[BaseModel], items: list[dict]) -> tuple[list, dict[int, str]]:
+    """Validate batch items against ``model``.
+
+    Returns the (index, item) pairs that passed and an error message per
+    failing index, so one bad item does not reject the whole batch.
+    """
+    valid = []
+    errors = {}
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, model(**item)))
+        except ValidationError as e:
+            errors[index] = "; ".join(
+                f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}"
+                for err in e.errors()
+            )
+    return valid, errors
+
+
+def merge_batch_results(errors: dict[int, str], results: list[tuple[int, dict]]) -> list[dict]:
+    """Combine validation errors and per-item results into one ordered list."""
+    merged = [{'index': index, 'error': error} for index, error in errors.items()]
+    merged += [{'index': index, **result} for index, result in results]
+    merged.sort(key=lambda item: item['index'])
+    return merged
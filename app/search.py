@@ -0,0 +1,127 @@
+"""SQLite FTS5 full-text index for message search."""
+import re
+from sqlalchemy import column, literal_column, table, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+# External-content FTS5 table over messages(name, content), kept in sync by triggers
+FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+        name, content,
+        content='messages', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, name, content) VALUES (new.id, new.name, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, name, content)
+        VALUES ('delete', old.id, old.name, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF name, content ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, name, content)
+        VALUES ('delete', old.id, old.name, old.content);
+        INSERT INTO messages_fts(rowid, name, content) VALUES (new.id, new.name, new.content);
+    END
+    """,
+]
+
+FTS_TRIGGERS = ("messages_fts_ai", "messages_fts_ad", "messages_fts_au")
+
+# Lightweight Core handle on the virtual table for query building
+messages_fts = table(
+    "messages_fts",
+    column("rowid"),
+    column("rank"),
+    column("name"),
+    column("content"),
+)
+match_target = literal_column("messages_fts")
+
+# Markers wrapped around matched terms in snippets
+SNIPPET_START = "["
+SNIPPET_END = "]"
+
+_fts_enabled: dict[str, bool] = {}
+
+
+def create_fts(engine: Engine) -> bool:
+    """Create the FTS table and triggers. Returns False if FTS5 is unavailable.
+
+    The index is rebuilt when the table is created on a database that
+    already has messages, and when any trigger was missing (e.g. an
+    interrupted offline import), since writes made without it are not
+    in the index.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.begin() as conn:
+        existing = set(conn.execute(
+            text("SELECT name FROM sqlite_master WHERE name = 'messages_fts' OR tbl_name = 'messages' AND type = 'trigger'")
+        ).scalars())
+        try:
+            for ddl in FTS_DDL:
+                conn.execute(text(ddl))
+        except Exception:
+            # SQLite built without FTS5
+            return False
+        if not {"messages_fts", *FTS_TRIGGERS} <= existing:
+            rebuild_fts(conn)
+    return True
+
+
+def rebuild_fts(conn: Connection) -> None:
+    """Rebuild the FTS index from the messages table."""
+    conn.execute(text("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')"))
+
+
+def drop_fts_triggers(conn: Connection) -> None:
+    """Drop the sync triggers (bulk loads rebuild the index afterwards).
+
+    ``create_fts()`` puts them back and rebuilds the index.
+    """
+    for trigger in FTS_TRIGGERS:
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+
+
+def fts_available(db: Session) -> bool:
+    """Whether the database behind ``db`` has the FTS index (cached per URL)."""
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _fts_enabled:
+        if bind.dialect.name != "sqlite":
+            _fts_enabled[key] = False
+        else:
+            _fts_enabled[key] = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'")
+            ).first() is not None
+    return _fts_enabled[key]
+
+
+_TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def build_match_query(query: str) -> str:
+    """Translate a user query into an FTS5 MATCH expression.
+
+    Words are ANDed, ``word*`` is a prefix query and ``"quoted text"`` is a
+    phrase query. Everything is quoted, so user input can never produce an
+    FTS5 syntax error.
+    """
+    terms = []
+    for phrase, word in _TOKEN_RE.findall(query):
+        if phrase.strip():
+            terms.append('"' + phrase.replace('"', '""') + '"')
+        elif word:
+            prefix = word.endswith("*")
+            word = word.rstrip("*").replace('"', "")
+            if word:
+                terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
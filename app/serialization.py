@@ -0,0 +1,97 @@
+"""Encoding of MCP tool results.
+
+Three output formats are supported (see MCP_OUTPUT_FORMAT):
+
+- ``text``: emoji summary followed by indented JSON (the original format)
+- ``compact``: the same summary followed by compact, non-ASCII-escaped JSON
+- ``structured``: MCP structured content (``{"summary", "result", ...}``)
+  plus a compact JSON copy in the text block for older clients
+
+orjson is used for the compact encodings when it is installed; crud rows
+keep their ``datetime`` values so they are encoded once, here, instead of
+being converted to strings row by row.
+"""
+import json
+from datetime import date, datetime
+from typing import Any, Optional, Union
+from mcp.types import TextContent
+from app.config import MCP_OUTPUT_FORMAT, MCP_TOOL_OUTPUT_FORMAT
+
+# Optional: faster JSON encoder (pip install orjson; listed in requirements.txt)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+OUTPUT_FORMATS = ("text", "compact", "structured")
+
+ToolResult = Union[list[TextContent], tuple[list[TextContent], dict[str, Any]]]
+
+
+def _default(obj: Any) -> Any:
+    """JSON fallback for values the encoders don't handle natively."""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> str:
+    """Encode ``obj`` as compact JSON."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default).decode()
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps_pretty(obj: Any) -> str:
+    """Encode ``obj`` as indented JSON (the ``text`` format)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, default=_default, indent=2)
+
+
+def ndjson(records: list[dict]) -> str:
+    """Encode records as newline-delimited JSON (one compact object per line)."""
+    return "".join(dumps(record) + "\n" for record in records)
+
+
+def output_format(tool: str) -> str:
+    """Output format for ``tool`` (per-tool override or the server default)."""
+    fmt = MCP_TOOL_OUTPUT_FORMAT.get(tool, MCP_OUTPUT_FORMAT)
+    return fmt if fmt in OUTPUT_FORMATS else "text"
+
+
+def render(
+    fmt: str,
+    summary: str,
+    data: Any = None,
+    next_cursor: Optional[str] = None,
+    watermark: Optional[dict] = None,
+    **fields: Any
+) -> ToolResult:
+    """Build a tool result in the given output format.
+
+    ``data`` is the JSON payload shown after the summary, ``next_cursor``
+    the pagination cursor of listing tools and ``watermark`` the values to
+    poll with next (see ``crud.get_watermark``). Extra ``fields`` (e.g. the
+    id of a new message) only appear in structured output; the text
+    formats already mention them in the summary.
+    """
+    if fmt == "structured":
+        payload = {"summary": summary, **fields}
+        if data is not None:
+            payload["result"] = data
+        if next_cursor is not None:
+            payload["next_cursor"] = next_cursor
+        if watermark is not None:
+            payload["watermark"] = watermark
+        return [TextContent(type="text", text=dumps(payload))], payload
+
+    text = summary
+    if data is not None:
+        encoded = dumps(data) if fmt == "compact" else dumps_pretty(data)
+        text = f"{summary}:\n\n{encoded}"
+    if next_cursor:
+        text += f"\n\n➡️ next_cursor: {next_cursor}"
+    if watermark:
+        text += "\n\n🔖 watermark: " + ", ".join(f"{key}={value}" for key, value in watermark.items())
+    return [TextContent(type="text", text=text)]
@@ -0,0 +1,177 @@
+"""Write-behind group commit for single message, reply and reaction writes.
+
+With WRITE_BEHIND=1, send-message, reply-to-message and add-reaction hand
+their (validated) write to an in-process queue instead of committing on
+their own. A single writer thread takes the first queued write, waits up
+to WRITE_BEHIND_WINDOW_MS for more (at most WRITE_BEHIND_MAX_BATCH), and
+applies the whole batch with ``crud.apply_writes`` in one transaction:
+one write lock acquisition and one fsync instead of one per write. Callers
+wait for the batch to commit and get their id (or ValueError) back.
+
+Writes queued while a batch commits form the next batch, so batches grow
+with load even with a zero window; the window only trades latency at low
+load for larger batches. If a batch fails as a whole (e.g. a constraint
+violated by another process), its writes are retried one per transaction
+so only the offending write fails. ``close()`` commits every queued write
+before the writer thread stops (on shutdown).
+"""
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Optional
+from app import crud
+from app.config import WRITE_BEHIND_WINDOW_MS, WRITE_BEHIND_MAX_BATCH
+from app.database import SessionLocal
+
+# Equivalent crud function per write kind (used when a batch fails)
+SINGLE_WRITES = {
+    'message': lambda db, args: crud.send_message(db, *args),
+    'reply': lambda db, args: crud.reply_to_message(db, *args),
+    'reaction': lambda db, args: crud.add_reaction(db, *args),
+}
+
+# Queued by close(): the writer commits what is ahead of it, then stops
+_STOP = None
+
+
+class GroupCommitWriter:
+    """Queue writes and commit them in batches from one writer thread."""
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        window: float = WRITE_BEHIND_WINDOW_MS / 1000,
+        max_batch: int = WRITE_BEHIND_MAX_BATCH
+    ):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        # Guards starting/stopping the thread together with queueing, so no
+        # write lands behind the stop marker without a thread to commit it
+        self._state_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stats = {'writes': 0, 'batches': 0, 'largest_batch': 0, 'retried_batches': 0}
+
+    def submit(self, kind: str, *args: Any) -> Future:
+        """Queue a write; the future resolves once its batch has committed."""
+        if kind not in SINGLE_WRITES:
+            raise ValueError(f"Unknown write: {kind}")
+        future: Future = Future()
+        with self._state_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+            self._queue.put((kind, args, future))
+        return future
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Commit every write queued so far, then stop the writer thread.
+
+        The batch window is cut short. A later ``submit`` starts a new thread.
+        """
+        with self._state_lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+            thread.join(timeout)
+            self._thread = None
+
+    async def send_message(self, name: str, content: str, channel: str = "general") -> int:
+        return await asyncio.wrap_future(self.submit('message', name, content, channel))
+
+    async def reply_to_message(self, parent_id: int, name: str, content: str) -> int:
+        return await asyncio.wrap_future(self.submit('reply', parent_id, name, content))
+
+    async def add_reaction(self, message_id: int, user_name: str, emoji: str) -> None:
+        await asyncio.wrap_future(self.submit('reaction', message_id, user_name, emoji))
+
+    def _next_batch(self) -> tuple[list[tuple], bool]:
+        """Block for one write, then collect more until the window or size closes.
+
+        Returns the batch and whether close() asked the writer to stop.
+        """
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    # Window closed: still take what is already queued
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        while True:
+            batch, stop = self._next_batch()
+            if batch:
+                try:
+                    self._commit(batch)
+                except Exception as e:
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+            if stop:
+                return
+
+    def _commit(self, batch: list[tuple]) -> None:
+        with self.session_factory() as db:
+            try:
+                results = crud.apply_writes(db, [(kind, args) for kind, args, _ in batch])
+            except Exception:
+                db.rollback()
+                results = None
+        retried = results is None
+        if retried:
+            results = self._retry(batch)
+        for (_, _, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+        with self._lock:
+            self._stats['writes'] += len(batch)
+            self._stats['batches'] += 1
+            self._stats['largest_batch'] = max(self._stats['largest_batch'], len(batch))
+            self._stats['retried_batches'] += retried
+
+    def _retry(self, batch: list[tuple]) -> list:
+        """Apply each write of a failed batch in its own transaction."""
+        results = []
+        for kind, args, _ in batch:
+            with self.session_factory() as db:
+                try:
+                    results.append(SINGLE_WRITES[kind](db, args))
+                except Exception as e:
+                    db.rollback()
+                    results.append(e)
+        return results
+
+    def stats(self) -> dict:
+        """Write/batch counters, the average batch size and the settings."""
+        with self._lock:
+            return {
+                **self._stats,
+                'average_batch': round(self._stats['writes'] / self._stats['batches'], 2)
+                if self._stats['batches'] else 0,
+                'queued': self._queue.qsize(),
+                'window_ms': self.window * 1000,
+                'max_batch': self.max_batch
+            }
+
+
+writer = GroupCommitWriter()
@@ -0,0 +1 @@
+"""Benchmarks for Python MCP Chat."""
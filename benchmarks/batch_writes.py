@@ -0,0 +1,87 @@
+"""Write throughput: per-call crud writes vs the batch write path.
+
+Usage:
+    python -m benchmarks.batch_writes --rows 5000 --batch-size 500
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import crud, search
+from app.config import SQLITE_PRAGMAS
+from app.database import Base, configure_sqlite
+
+
+def fresh_session():
+    """Session on a new, empty database with the configured PRAGMAs and FTS."""
+    path = os.path.join(tempfile.mkdtemp(prefix="mcp-bench-"), "chat.db")
+    engine = create_engine(f"sqlite:///{path}")
+    configure_sqlite(engine, SQLITE_PRAGMAS)
+    Base.metadata.create_all(bind=engine)
+    search.create_fts(engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def message_items(rows: int) -> list[dict]:
+    return [
+        {"name": f"user{i % 50}", "content": f"imported message {i}", "channel": f"ch{i % 5}"}
+        for i in range(rows)
+    ]
+
+
+def reaction_items(message_ids: list[int]) -> list[dict]:
+    return [
+        {"message_id": message_id, "user_name": "bench", "emoji": "👍"}
+        for message_id in message_ids
+    ]
+
+
+def chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--json", action="store_true", help="print machine-readable output")
+    args = parser.parse_args()
+
+    items = message_items(args.rows)
+    results = {"rows": args.rows, "batch_size": args.batch_size}
+
+    db = fresh_session()
+    start = time.perf_counter()
+    ids = [crud.send_message(db, **item) for item in items]
+    results["send_message_rows_per_sec"] = round(args.rows / (time.perf_counter() - start), 1)
+    start = time.perf_counter()
+    for item in reaction_items(ids):
+        crud.add_reaction(db, **item)
+    results["add_reaction_rows_per_sec"] = round(args.rows / (time.perf_counter() - start), 1)
+    db.close()
+
+    db = fresh_session()
+    start = time.perf_counter()
+    ids = []
+    for chunk in chunks(items, args.batch_size):
+        ids += [r['id'] for r in crud.send_messages_batch(db, chunk)]
+    results["send_messages_batch_rows_per_sec"] = round(args.rows / (time.perf_counter() - start), 1)
+    start = time.perf_counter()
+    for chunk in chunks(reaction_items(ids), args.batch_size):
+        crud.add_reactions_batch(db, chunk)
+    results["add_reactions_batch_rows_per_sec"] = round(args.rows / (time.perf_counter() - start), 1)
+    db.close()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for key, value in results.items():
+        print(f"{key:<34} {value}")
+
+
+if __name__ == "__main__":
+    main()
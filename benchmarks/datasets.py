@@ -0,0 +1,105 @@
+"""Synthetic dataset generation for benchmarks."""
+import random
+import sqlite3
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from app import crud, search
+from app.config import ALLOWED_EMOJIS
+from app.database import Base
+
+CHANNELS = ["general", "python", "jobs", "random", "help"]
+USERS = [f"user{i}" for i in range(500)]
+START = datetime(2024, 1, 1)
+# SQLAlchemy's SQLite DateTime storage format: always with microseconds, so
+# raw rows compare correctly with the ones the app writes
+TS_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def pick_channel(rng: random.Random) -> str:
+    """A channel, skewed towards the first ones (most traffic in #general)."""
+    return CHANNELS[min(int(rng.expovariate(1.0)), len(CHANNELS) - 1)]
+
+
+def pick_user(rng: random.Random) -> str:
+    """A user, skewed so a few dozen users write most messages."""
+    return USERS[min(int(rng.expovariate(1 / 40)), len(USERS) - 1)]
+
+
+def pick_message(rng: random.Random, messages: int) -> int:
+    """A message id: half uniform, half heavy-tailed towards the newest."""
+    if rng.random() < 0.5:
+        return rng.randint(1, messages)
+    offset = int((rng.paretovariate(1.0) - 1) * max(1, messages // 1000))
+    return max(1, messages - offset)
+
+
+def build_dataset(path: str, messages: int, reply_ratio: float = 0.3,
+                  reactions_per_message: float = 0.5, seed: int = 42) -> None:
+    """Create an SQLite database at ``path`` with synthetic chat traffic.
+
+    Inserts go through the raw sqlite3 driver in one transaction so that
+    millions of rows can be generated in seconds.
+    """
+    import app.models  # noqa: F401  (register tables)
+
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    rng = random.Random(seed)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+
+    # Channel of every message by id (as a CHANNELS index): replies inherit
+    # their parent's, like reply_to_message
+    channel_of = bytearray(messages + 1)
+
+    def message_rows():
+        for i in range(1, messages + 1):
+            ts = (START + timedelta(seconds=i)).strftime(TS_FORMAT)
+            parent_id = None
+            if i > 10 and rng.random() < reply_ratio:
+                # Skew replies towards recent messages
+                parent_id = max(1, i - int(rng.expovariate(1 / 50)) - 1)
+                channel_of[i] = channel_of[parent_id]
+            else:
+                channel_of[i] = CHANNELS.index(pick_channel(rng))
+            channel = CHANNELS[channel_of[i]]
+            name = pick_user(rng)
+            yield (i, parent_id, name, f"message {i} about {channel}", channel, ts, ts)
+
+    conn.executemany(
+        "INSERT INTO messages (id, parent_id, name, content, channel, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        message_rows()
+    )
+
+    seen = set()
+
+    def reaction_rows():
+        for _ in range(int(messages * reactions_per_message)):
+            key = (pick_message(rng, messages), pick_user(rng), rng.choice(ALLOWED_EMOJIS))
+            if key in seen:
+                continue
+            seen.add(key)
+            ts = START.strftime(TS_FORMAT)
+            yield (*key, ts, ts)
+
+    conn.executemany(
+        "INSERT INTO reactions (message_id, user_name, emoji, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?)",
+        reaction_rows()
+    )
+    conn.commit()
+    conn.close()
+
+    # Fill in the derived data the raw inserts skipped
+    with Session(engine) as db:
+        crud.rebuild_counters(db)
+        crud.rebuild_stats(db)
+    search.create_fts(engine)
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+    engine.dispose()
@@ -0,0 +1,146 @@
+"""Concurrent single writes: one commit per write vs the group-commit queue.
+
+``--concurrency`` clients each send ``--writes`` writes (60% messages, 20%
+replies, 20% reactions). In "direct" mode every client runs the crud write
+in its own thread and session, as the MCP worker pool does; in the
+write-behind modes they queue on ``app.write_queue.GroupCommitWriter``
+with each of the ``--windows``.
+
+Usage:
+    python -m benchmarks.group_commit --concurrency 32 --writes 100 --windows 0,2,10
+    python -m benchmarks.group_commit --synchronous FULL   # one fsync per commit
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from app import crud
+from app.config import ALLOWED_EMOJIS
+from app.write_queue import GroupCommitWriter, SINGLE_WRITES
+from benchmarks.batch_writes import fresh_session
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def workload(seed: int, writes: int, seed_ids: list[int]) -> list[tuple]:
+    """One client's writes as (kind, args); replies/reactions target seeded messages."""
+    rng = random.Random(seed)
+    ops = []
+    for i in range(writes):
+        roll = rng.random()
+        if roll < 0.6:
+            ops.append(('message', (f"user{seed}", f"client {seed} message {i}", f"ch{seed % 5}")))
+        elif roll < 0.8:
+            ops.append(('reply', (rng.choice(seed_ids), f"user{seed}", f"client {seed} reply {i}")))
+        else:
+            # Unique per client and write, so no duplicate-reaction errors
+            ops.append(('reaction', (rng.choice(seed_ids), f"user{seed}-{i}", rng.choice(ALLOWED_EMOJIS))))
+    return ops
+
+
+def prepare(synchronous: str):
+    """Fresh database with 100 messages to reply/react to."""
+    db = fresh_session()
+    engine = db.get_bind()
+    ids = crud._insert_messages(db, [
+        {"name": "seed", "content": f"seed {i}", "channel": "general"} for i in range(100)
+    ])
+    db.close()
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    @event.listens_for(engine, "connect")
+    def _synchronous(dbapi_connection, connection_record):
+        dbapi_connection.execute(f"PRAGMA synchronous={synchronous}")
+
+    engine.dispose()
+    return Session, ids
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict:
+    return {
+        "writes_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def run_direct(Session, clients: list[list[tuple]]) -> dict:
+    """Each client commits its own writes from its own thread."""
+    def client(ops):
+        latencies = []
+        for kind, args in ops:
+            start = time.perf_counter()
+            with Session() as db:
+                SINGLE_WRITES[kind](db, args)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(len(clients)) as pool:
+        latencies = [l for result in pool.map(client, clients) for l in result]
+    return summarize(latencies, time.perf_counter() - start)
+
+
+async def run_write_behind(Session, clients: list[list[tuple]], window_ms: float, max_batch: int) -> dict:
+    """All clients queue on one group-commit writer."""
+    writer = GroupCommitWriter(Session, window_ms / 1000, max_batch)
+    latencies = []
+
+    async def client(ops):
+        for kind, args in ops:
+            start = time.perf_counter()
+            await asyncio.wrap_future(writer.submit(kind, *args))
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(ops) for ops in clients))
+    result = summarize(latencies, time.perf_counter() - start)
+    result["average_batch"] = writer.stats()["average_batch"]
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--writes", type=int, default=100, help="writes per client")
+    parser.add_argument("--windows", default="0,2,10", help="write-behind windows (ms)")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--synchronous", default="NORMAL", help="PRAGMA synchronous (NORMAL, FULL)")
+    parser.add_argument("--json", action="store_true", help="print machine-readable output")
+    args = parser.parse_args()
+
+    results = {
+        "concurrency": args.concurrency,
+        "writes": args.concurrency * args.writes,
+        "synchronous": args.synchronous,
+        "modes": {}
+    }
+    Session, ids = prepare(args.synchronous)
+    clients = [workload(seed, args.writes, ids) for seed in range(args.concurrency)]
+    results["modes"]["direct"] = run_direct(Session, clients)
+    for window in (float(w) for w in args.windows.split(",")):
+        Session, ids = prepare(args.synchronous)
+        clients = [workload(seed, args.writes, ids) for seed in range(args.concurrency)]
+        results["modes"][f"write-behind {window:g}ms"] = asyncio.run(
+            run_write_behind(Session, clients, window, args.max_batch)
+        )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{results['writes']} writes, {args.concurrency} clients, synchronous={args.synchronous}")
+    print(f"{'mode':<22} {'writes/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'batch':>6}")
+    for mode, row in results["modes"].items():
+        print(f"{mode:<22} {row['writes_per_sec']:>9} {row['p50_ms']:>8} {row['p99_ms']:>8} "
+              f"{row.get('average_batch', 1):>6}")
+
+
+if __name__ == "__main__":
+    main()
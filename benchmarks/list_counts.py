@@ -0,0 +1,97 @@
+"""Per-page cost of reply/reaction counts: correlated subqueries vs counter columns.
+
+Usage:
+    python -m benchmarks.list_counts --messages 1000000 --pages 50
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.orm import aliased, sessionmaker
+from app import crud
+from app.models import Message, Reaction
+from benchmarks.datasets import build_dataset
+
+COUNTER_COLUMNS = {'reply_count', 'reaction_count', 'last_reply_at'}
+
+
+def correlated_page(db, limit: int) -> list[dict]:
+    """Two correlated scalar subqueries per row (with the reply alias fixed)."""
+    replies = aliased(Message)
+    reply_count = (
+        select(func.count(replies.id))
+        .where(replies.parent_id == Message.id)
+        .correlate(Message)
+        .scalar_subquery()
+    )
+    reaction_count = (
+        select(func.count(Reaction.id))
+        .where(Reaction.message_id == Message.id)
+        .correlate(Message)
+        .scalar_subquery()
+    )
+    last_reply_at = (
+        select(func.max(replies.created_at))
+        .where(replies.parent_id == Message.id)
+        .correlate(Message)
+        .scalar_subquery()
+    )
+    columns = [c for c in Message.__table__.c if c.name not in COUNTER_COLUMNS]
+    stmt = (
+        select(
+            *columns,
+            reply_count.label('reply_count'),
+            reaction_count.label('reaction_count'),
+            last_reply_at.label('last_reply_at')
+        )
+        .where(Message.parent_id.is_(None))
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(limit)
+    )
+    return crud._project(db.execute(stmt))
+
+
+def time_pages(fn, pages: int) -> float:
+    """Average milliseconds per call."""
+    start = time.perf_counter()
+    for _ in range(pages):
+        fn()
+    return (time.perf_counter() - start) / pages * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--json", action="store_true", help="print machine-readable output")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="mcp-bench-"), "chat.db")
+    build_dataset(path, args.messages)
+    engine = create_engine(f"sqlite:///{path}")
+    Session = sessionmaker(bind=engine)
+
+    with Session() as db:
+        new = crud.get_messages(db, args.limit)
+        old = correlated_page(db, args.limit)
+        assert new == old
+
+        results = {
+            "messages": args.messages,
+            "limit": args.limit,
+            "correlated_ms_per_page": round(time_pages(lambda: correlated_page(db, args.limit), args.pages), 3),
+            "counters_ms_per_page": round(time_pages(lambda: crud.get_messages(db, args.limit), args.pages), 3),
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for key, value in results.items():
+        print(f"{key:<24} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,452 @@
+"""Latency and throughput of every MCP tool (stdio) and REST route under load.
+
+Each tool is called ``--requests`` times at each ``--concurrency`` level
+against a synthetic dataset (built once and kept in ``--data-dir``), and
+p50/p95/p99 latency and ops/sec are reported. The MCP server and the REST
+API run as real subprocesses (``python -m app.main`` over stdio and
+uvicorn over HTTP), so transport and serialization costs are included.
+
+Usage:
+    python -m benchmarks.load --messages 10k --concurrency 1,8,32
+    python -m benchmarks.load --messages 1M --transport rest --tools get-messages,search-messages
+    python -m benchmarks.load --messages 10M --json --output run.json
+    python -m benchmarks.load --compare before.json after.json
+
+Write tools add a few hundred rows per run to the cached dataset; use
+``--rebuild`` for a pristine copy.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from urllib.parse import quote
+from app.config import ALLOWED_EMOJIS
+from benchmarks.datasets import START, build_dataset, pick_channel, pick_message, pick_user
+
+SIZES = {"10k": 10_000, "1M": 1_000_000, "10M": 10_000_000}
+
+SEARCH_QUERIES = ["python", "about jobs", "messag*", '"about help"', "random general"]
+
+BATCH_SIZE = 20
+
+# (method, path, query params, JSON body) of one REST request
+Request = tuple[str, str, Optional[dict], Optional[dict]]
+
+# Sends one call; returns False when the server reported an error
+Call = Callable[[str, dict], Awaitable[bool]]
+
+
+def parse_size(value: str) -> int:
+    """Dataset size: a preset (10k, 1M, 10M) or a number of messages."""
+    if value in SIZES:
+        return SIZES[value]
+    return int(value.replace("_", ""))
+
+
+class Workload:
+    """Random, dataset-aware arguments for each tool.
+
+    Reads follow the dataset's skew (busy channels and users, recent
+    messages); writes use unique bench users so they never collide, and
+    remove-reaction removes reactions added earlier by add-reaction.
+    """
+
+    def __init__(self, messages: int, seed: int):
+        self.messages = messages
+        self.rng = random.Random(seed)
+        self.counter = 0
+        self.added: deque = deque()
+
+    def _bench_user(self) -> str:
+        self.counter += 1
+        return f"bench{self.counter}"
+
+    def _reaction(self) -> dict:
+        reaction = {
+            "message_id": pick_message(self.rng, self.messages),
+            "user_name": self._bench_user(),
+            "emoji": self.rng.choice(ALLOWED_EMOJIS)
+        }
+        self.added.append(reaction)
+        return reaction
+
+    def arguments(self, tool: str) -> dict:
+        rng = self.rng
+        if tool == "send-message":
+            return {"name": pick_user(rng), "content": "load test message", "channel": pick_channel(rng)}
+        if tool == "get-messages":
+            return {"limit": 50}
+        if tool == "reply-to-message":
+            return {
+                "parent_message_id": pick_message(rng, self.messages),
+                "name": pick_user(rng),
+                "content": "load test reply"
+            }
+        if tool in ("get-message-thread", "get-message-reactions"):
+            return {"message_id": pick_message(rng, self.messages)}
+        if tool == "get-channels":
+            return {}
+        if tool == "get-channel-messages":
+            return {"channel": pick_channel(rng), "limit": 50}
+        if tool == "add-reaction":
+            return self._reaction()
+        if tool == "remove-reaction":
+            if self.added:
+                return self.added.popleft()
+            return {"message_id": 1, "user_name": "nobody", "emoji": ALLOWED_EMOJIS[0]}
+        if tool == "get-users-list":
+            return {"limit": 50, "sort_by": rng.choice(["name", "messages", "last_activity"])}
+        if tool == "search-messages":
+            return {"query": rng.choice(SEARCH_QUERIES), "limit": 20}
+        if tool == "get-messages-by-user":
+            return {"name": pick_user(rng), "limit": 50}
+        if tool == "get-messages-by-date-range":
+            start = START + timedelta(seconds=rng.randint(0, self.messages))
+            return {
+                "start_date": start.isoformat(),
+                "end_date": (start + timedelta(hours=1)).isoformat(),
+                "limit": 50
+            }
+        if tool == "send-messages-batch":
+            return {"messages": [self.arguments("send-message") for _ in range(BATCH_SIZE)]}
+        if tool == "add-reactions-batch":
+            return {"reactions": [self._reaction() for _ in range(BATCH_SIZE)]}
+        if tool == "get-reaction-changes":
+            return {"since_seq": 0, "limit": 50}
+        raise ValueError(f"No workload for tool {tool}")
+
+
+# Run order: add-reaction before remove-reaction so there is something to remove
+TOOLS = (
+    "get-messages",
+    "get-message-thread",
+    "get-channels",
+    "get-channel-messages",
+    "get-message-reactions",
+    "get-users-list",
+    "search-messages",
+    "get-messages-by-user",
+    "get-messages-by-date-range",
+    "get-reaction-changes",
+    "send-message",
+    "reply-to-message",
+    "add-reaction",
+    "remove-reaction",
+    "send-messages-batch",
+    "add-reactions-batch",
+)
+
+
+# REST equivalent of each tool: method and path template (filled from the arguments)
+ROUTES = {
+    "send-message": ("POST", "/messages"),
+    "get-messages": ("GET", "/messages"),
+    "reply-to-message": ("POST", "/messages/{parent_message_id}/replies"),
+    "get-message-thread": ("GET", "/messages/{message_id}/thread"),
+    "get-channels": ("GET", "/channels"),
+    "get-channel-messages": ("GET", "/channels/{channel}/messages"),
+    "add-reaction": ("POST", "/messages/{message_id}/reactions"),
+    "remove-reaction": ("DELETE", "/messages/{message_id}/reactions"),
+    "get-message-reactions": ("GET", "/messages/{message_id}/reactions"),
+    "get-users-list": ("GET", "/users"),
+    "search-messages": ("GET", "/search"),
+    "get-messages-by-user": ("GET", "/users/{name}/messages"),
+    "get-messages-by-date-range": ("GET", "/messages/date-range"),
+    "send-messages-batch": ("POST", "/messages/batch"),
+    "add-reactions-batch": ("POST", "/reactions/batch"),
+    "get-reaction-changes": ("GET", "/reactions/changes"),
+}
+
+
+def rest_request(tool: str, args: dict) -> Request:
+    """The REST request equivalent to a tool call.
+
+    Path parameters come from the arguments; the rest become the query
+    string (GET) or the JSON body.
+    """
+    method, template = ROUTES[tool]
+    path = template.format(**{key: quote(str(value), safe="") for key, value in args.items()})
+    if method != "GET":
+        return method, path, None, args
+    params = {key: value for key, value in args.items() if "{" + key + "}" not in template}
+    return method, path, params, None
+
+
+def server_env(path: str) -> dict:
+    return {**os.environ, "DATABASE_URL": f"sqlite:///{path}", "PYTHONPATH": os.getcwd()}
+
+
+def server_log(path: str):
+    """Append-mode log file for server stderr, next to the dataset."""
+    return open(os.path.join(os.path.dirname(path), "server.log"), "a")
+
+
+@asynccontextmanager
+async def stdio_transport(path: str) -> AsyncIterator[Call]:
+    """Call tools on a ``python -m app.main`` subprocess over stdio."""
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    params = StdioServerParameters(command=sys.executable, args=["-m", "app.main"], env=server_env(path))
+    with server_log(path) as log:
+        async with stdio_client(params, errlog=log) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+
+                async def call(tool: str, args: dict) -> bool:
+                    result = await session.call_tool(tool, args)
+                    return not result.isError and not result.content[0].text.startswith("❌")
+
+                yield call
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def rest_transport(path: str, concurrency: int) -> AsyncIterator[Call]:
+    """Call REST routes on a uvicorn subprocess."""
+    import httpx
+
+    port = _free_port()
+    with server_log(path) as log:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.api:api", "--port", str(port), "--log-level", "warning"],
+            env=server_env(path),
+            stdout=log,
+            stderr=log
+        )
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            deadline = time.monotonic() + 120
+            while True:
+                try:
+                    await client.get("/")
+                    break
+                except httpx.TransportError:
+                    if server.poll() is not None or time.monotonic() > deadline:
+                        raise RuntimeError("REST API did not start")
+                    await asyncio.sleep(0.2)
+
+            async def call(tool: str, args: dict) -> bool:
+                method, url, params, body = rest_request(tool, args)
+                response = await client.request(method, url, params=params, json=body)
+                return response.status_code < 400
+
+            yield call
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def percentile(values: list[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of sorted ``values``."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+async def run(call: Call, workload: Workload, tool: str, requests: int, concurrency: int) -> dict:
+    """Send ``requests`` calls of ``tool`` from ``concurrency`` workers."""
+    calls = [workload.arguments(tool) for _ in range(requests)]
+    latencies = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        while calls:
+            args = calls.pop()
+            start = time.perf_counter()
+            try:
+                ok = await call(tool, args)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+        "tool": tool,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "ops_per_sec": round(requests / elapsed, 1),
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1] if latencies else None)
+    }
+
+
+def dataset(data_dir: str, messages: int, seed: int, rebuild: bool) -> str:
+    """Path of the cached synthetic dataset, building it if needed."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"chat-{messages}-{seed}.db")
+    if rebuild or not os.path.exists(path):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        print(f"⏳ Building dataset with {messages} messages...", file=sys.stderr)
+        start = time.perf_counter()
+        build_dataset(path, messages, seed=seed)
+        print(f"✅ Dataset built in {time.perf_counter() - start:.1f}s: {path}", file=sys.stderr)
+    return path
+
+
+def dataset_meta(path: str) -> dict:
+    conn = sqlite3.connect(path)
+    try:
+        messages, reactions = conn.execute(
+            "SELECT (SELECT count(*) FROM messages), (SELECT count(*) FROM reactions)"
+        ).fetchone()
+    finally:
+        conn.close()
+    return {"messages": messages, "reactions": reactions}
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def benchmark(args, path: str, messages: int) -> list[dict]:
+    tools = [tool for tool in TOOLS if not args.tools or tool in args.tools]
+    results = []
+    for transport in args.transport:
+        for concurrency in args.concurrency:
+            if transport == "stdio":
+                connection = stdio_transport(path)
+            else:
+                connection = rest_transport(path, concurrency)
+            async with connection as call:
+                workload = Workload(messages, args.seed)
+                for tool in tools:
+                    if args.warmup:
+                        await run(call, workload, tool, args.warmup, concurrency)
+                    result = {"transport": transport, **await run(
+                        call, workload, tool, args.requests, concurrency
+                    )}
+                    if transport == "rest":
+                        result["route"] = " ".join(ROUTES[tool])
+                    results.append(result)
+                    print(
+                        f"{transport:<6} c={concurrency:<4} {tool:<28} "
+                        f"{result['ops_per_sec']:>9} ops/s  p50 {result['p50_ms']:>8} ms  "
+                        f"p95 {result['p95_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  "
+                        f"errors {result['errors']}",
+                        file=sys.stderr
+                    )
+    return results
+
+
+def compare(before_path: str, after_path: str) -> None:
+    """Print p50/p99/ops-per-second changes between two JSON runs."""
+    with open(before_path) as f:
+        before = {(r["transport"], r["tool"], r["concurrency"]): r for r in json.load(f)["results"]}
+    with open(after_path) as f:
+        after = json.load(f)["results"]
+
+    def change(old, new) -> str:
+        if not old or new is None:
+            return "n/a"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    print(f"{'transport':<9} {'c':>4} {'tool':<28} {'p50':>9} {'p99':>9} {'ops/s':>9}")
+    for r in after:
+        old = before.get((r["transport"], r["tool"], r["concurrency"]))
+        if old is None:
+            continue
+        print(
+            f"{r['transport']:<9} {r['concurrency']:>4} {r['tool']:<28} "
+            f"{change(old['p50_ms'], r['p50_ms']):>9} {change(old['p99_ms'], r['p99_ms']):>9} "
+            f"{change(old['ops_per_sec'], r['ops_per_sec']):>9}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", default="10k", help="dataset size: 10k, 1M, 10M or a number")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "mcp-bench-data"))
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the cached dataset")
+    parser.add_argument("--transport", default="stdio,rest", help="stdio, rest or both (comma-separated)")
+    parser.add_argument("--concurrency", default="1,8", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="measured calls per tool and level")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured calls per tool and level")
+    parser.add_argument("--tools", help="comma-separated subset of tools (default: all)")
+    parser.add_argument("--json", action="store_true", help="print machine-readable output")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two JSON runs")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    args.transport = [t for t in args.transport.split(",") if t]
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    args.tools = set(args.tools.split(",")) if args.tools else None
+    for transport in args.transport:
+        if transport not in ("stdio", "rest"):
+            parser.error(f"unknown transport: {transport}")
+    if args.tools and args.tools - set(TOOLS):
+        parser.error(f"unknown tools: {', '.join(sorted(args.tools - set(TOOLS)))}")
+
+    messages = parse_size(args.messages)
+    path = dataset(args.data_dir, messages, args.seed, args.rebuild)
+    started_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    results = asyncio.run(benchmark(args, path, messages))
+
+    report = {
+        "meta": {
+            "started_at": started_at,
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            **dataset_meta(path)
+        },
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
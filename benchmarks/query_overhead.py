@@ -0,0 +1,107 @@
+"""Python overhead per call of the message listing queries.
+
+Each crud listing is timed end to end and compared with running the very
+same SQL (captured from the engine) straight through the sqlite3 driver;
+the difference is the time spent building, compiling and executing the
+statement in SQLAlchemy and projecting the rows.
+
+Usage:
+    python -m benchmarks.query_overhead --messages 5000 --calls 2000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app import crud
+from benchmarks.datasets import START, build_dataset
+
+
+def uncached(fn):
+    """The crud function without its read-cache wrapper."""
+    return getattr(fn, "__wrapped__", fn)
+
+
+def cases(db, limit: int) -> dict:
+    """Listing calls to time, by name."""
+    get_messages = uncached(crud.get_messages)
+    get_channel_messages = uncached(crud.get_channel_messages)
+    cursor = crud.next_cursor(get_messages(db, limit), limit)
+    start, end = START, START + timedelta(days=30)
+    return {
+        "get_messages": lambda: get_messages(db, limit),
+        "get_messages_cursor": lambda: get_messages(db, limit, cursor),
+        "get_channel_messages": lambda: get_channel_messages(db, "python", limit),
+        "search_messages": lambda: crud.search_messages(db, "42*", limit),
+        "search_messages_recent": lambda: crud.search_messages(db, "42*", limit, None, "general", "recent"),
+        "get_messages_by_user": lambda: crud.get_messages_by_user(db, "user1", limit),
+        "get_messages_by_date_range": lambda: crud.get_messages_by_date_range(db, start, end, limit),
+    }
+
+
+def best_of(fn, calls: int, repeats: int) -> float:
+    """Fastest average seconds per call over ``repeats`` runs."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print machine-readable output")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="mcp-bench-"), "chat.db")
+    build_dataset(path, args.messages)
+    engine = create_engine(f"sqlite:///{path}")
+    captured = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    results = {"messages": args.messages, "limit": args.limit, "calls": {}}
+    with sessionmaker(bind=engine)() as db:
+        raw = db.connection().connection.dbapi_connection
+        for name, call in cases(db, args.limit).items():
+            call()
+            captured.clear()
+            call()
+            statements = list(captured)
+            event.remove(engine, "before_cursor_execute", _capture)
+
+            def run_raw():
+                for statement, parameters in statements:
+                    raw.execute(statement, parameters).fetchall()
+
+            total = best_of(call, args.calls, args.repeats)
+            sql = best_of(run_raw, args.calls, args.repeats)
+            event.listen(engine, "before_cursor_execute", _capture)
+            results["calls"][name] = {
+                "statements": len(statements),
+                "total_us": round(total * 1e6, 1),
+                "sql_us": round(sql * 1e6, 1),
+                "python_us": round((total - sql) * 1e6, 1),
+            }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'call':<28} {'stmts':>5} {'total µs':>9} {'sql µs':>8} {'python µs':>10}")
+    for name, row in results["calls"].items():
+        print(f"{name:<28} {row['statements']:>5} {row['total_us']:>9} {row['sql_us']:>8} {row['python_us']:>10}")
+
+
+if __name__ == "__main__":
+    main()
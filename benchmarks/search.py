@@ -0,0 +1,97 @@
+"""Full-text search latency, including a term that matches every message.
+
+Every synthetic message reads "message <n> about <channel>", so "message"
+matches all rows: the worst case for picking a page out of the FTS index.
+Each case is timed for the first page and for the page after it, and
+compared with the LIKE scan used when FTS5 is unavailable.
+
+``--max-ms`` turns the run into a regression check: the process exits with
+status 1 if any FTS case is slower than that (best of ``--repeats``).
+
+Usage:
+    python -m benchmarks.search --messages 300000
+    python -m benchmarks.search --messages 300000 --max-ms 500
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import crud
+from benchmarks.datasets import build_dataset
+
+# (name, query, channel, sort)
+CASES = [
+    ("every row, relevance", "message", None, "relevance"),
+    ("every row, recent", "message", None, "recent"),
+    ("every row, channel, relevance", "message", "help", "relevance"),
+    ("every row, channel, recent", "message", "help", "recent"),
+    ("prefix, relevance", "42*", None, "relevance"),
+    ("prefix, recent", "42*", None, "recent"),
+    ("one row, recent", "12345", None, "recent"),
+]
+
+
+def best_of(fn, repeats: int) -> float:
+    """Fastest run in milliseconds."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=300000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None, help="fail if any FTS case is slower")
+    parser.add_argument("--json", action="store_true", help="print machine-readable output")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="mcp-bench-"), "chat.db")
+    build_dataset(path, args.messages)
+    engine = create_engine(f"sqlite:///{path}")
+    results = {"messages": args.messages, "limit": args.limit, "cases": {}}
+
+    with sessionmaker(bind=engine)() as db:
+        for name, query, channel, sort in CASES:
+            first = crud.search_messages(db, query, args.limit, None, channel, sort)
+            cursor = crud.next_cursor(first, args.limit)
+            results["cases"][name] = {
+                "first_ms": round(best_of(
+                    lambda: crud.search_messages(db, query, args.limit, None, channel, sort),
+                    args.repeats
+                ), 2),
+                "next_ms": round(best_of(
+                    lambda: crud.search_messages(db, query, args.limit, cursor, channel, sort),
+                    args.repeats
+                ), 2) if cursor else None,
+            }
+        like = lambda: crud._message_page(db, args.limit, None, 'search', pattern="%message%")
+        results["like_ms"] = round(best_of(like, args.repeats), 2)
+
+    slow = [
+        name for name, row in results["cases"].items()
+        if args.max_ms is not None and max(row["first_ms"], row["next_ms"] or 0) > args.max_ms
+    ]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{args.messages} messages, limit {args.limit}")
+        print(f"{'case':<32} {'first ms':>9} {'next ms':>9}")
+        for name, row in results["cases"].items():
+            print(f"{name:<32} {row['first_ms']:>9} {str(row['next_ms'] or '-'):>9}")
+        print(f"{'LIKE scan (no FTS)':<32} {results['like_ms']:>9}")
+    if slow:
+        print(f"slower than {args.max_ms} ms: {', '.join(slow)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
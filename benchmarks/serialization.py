@@ -0,0 +1,92 @@
+"""Bytes per call and encode time of MCP tool results in each output format.
+
+Usage:
+    python -m benchmarks.serialization --limit 100 --rounds 500
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from mcp.types import CallToolResult, TextContent
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import crud, serialization
+from benchmarks.datasets import build_dataset
+
+
+def legacy_render(messages: list[dict]) -> list:
+    """The original path: per-row isoformat() dicts dumped with indent=2."""
+    rows = [
+        {
+            key: value.isoformat() if hasattr(value, "isoformat") else value
+            for key, value in message.items()
+        }
+        for message in messages
+    ]
+    return [TextContent(type="text", text=f"📨 Found {len(rows)} messages:\n\n{json.dumps(rows, indent=2)}")]
+
+
+def to_wire(result) -> bytes:
+    """Encode a tool result the way the MCP server sends it."""
+    if isinstance(result, tuple):
+        content, structured = result
+    else:
+        content, structured = result, None
+    return CallToolResult(content=content, structuredContent=structured).model_dump_json(
+        by_alias=True, exclude_none=True
+    ).encode()
+
+
+def measure(render, rounds: int) -> dict:
+    """Average encode time (render + wire encoding) and bytes per call."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        wire = to_wire(render())
+    elapsed = (time.perf_counter() - start) / rounds * 1000
+    return {"bytes_per_call": len(wire), "encode_ms": round(elapsed, 4)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=500)
+    parser.add_argument("--json", action="store_true", help="print machine-readable output")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="mcp-bench-"), "chat.db")
+    build_dataset(path, args.messages)
+    engine = create_engine(f"sqlite:///{path}")
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        messages = crud.get_messages(db, args.limit)
+    cursor = crud.next_cursor(messages, args.limit)
+    summary = f"📨 Found {len(messages)} messages"
+
+    def run(fmt: str):
+        return lambda: serialization.render(fmt, summary, messages, cursor)
+
+    results = {"limit": args.limit, "orjson": serialization.orjson is not None}
+    results["legacy"] = measure(lambda: legacy_render(messages), args.rounds)
+    for fmt in serialization.OUTPUT_FORMATS:
+        results[fmt] = measure(run(fmt), args.rounds)
+    if serialization.orjson is not None:
+        # Same formats with the stdlib encoder, as when orjson is not installed
+        orjson, serialization.orjson = serialization.orjson, None
+        try:
+            for fmt in serialization.OUTPUT_FORMATS:
+                results[f"{fmt}_stdlib"] = measure(run(fmt), args.rounds)
+        finally:
+            serialization.orjson = orjson
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"limit={results.pop('limit')} orjson={results.pop('orjson')}")
+    for name, value in results.items():
+        print(f"{name:<20} {value['bytes_per_call']:>8} bytes {value['encode_ms']:>9} ms")
+
+
+if __name__ == "__main__":
+    main()
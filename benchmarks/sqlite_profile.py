@@ -0,0 +1,98 @@
+"""Mixed read/write throughput for each SQLite connection profile.
+
+Usage:
+    python -m benchmarks.sqlite_profile --seconds 5 --readers 4 --writers 2
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import crud
+from app.config import SQLITE_PROFILES
+from app.database import Base, configure_sqlite
+
+CHANNELS = ["general", "python", "jobs", "random"]
+
+
+def run_profile(profile: str, seconds: float, readers: int, writers: int, seed_rows: int) -> dict:
+    """Run the mixed workload against a fresh database using ``profile``."""
+    path = os.path.join(tempfile.mkdtemp(prefix="mcp-bench-"), "chat.db")
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        pool_size=readers + writers
+    )
+    configure_sqlite(engine, SQLITE_PROFILES[profile])
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with Session() as db:
+        for i in range(seed_rows):
+            crud.send_message(db, f"user{i % 50}", f"seed message {i}", CHANNELS[i % len(CHANNELS)])
+
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(kind: str) -> None:
+        local = {"reads": 0, "writes": 0, "errors": 0}
+        with Session() as db:
+            while time.perf_counter() < deadline:
+                try:
+                    if kind == "writes":
+                        crud.send_message(db, "bench", "write load", random.choice(CHANNELS))
+                    else:
+                        crud.get_channel_messages(db, random.choice(CHANNELS), 50)
+                    local[kind] += 1
+                except Exception:
+                    db.rollback()
+                    local["errors"] += 1
+        with lock:
+            for key, value in local.items():
+                counts[key] += value
+
+    threads = [threading.Thread(target=worker, args=("reads",)) for _ in range(readers)]
+    threads += [threading.Thread(target=worker, args=("writes",)) for _ in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    return {
+        "profile": profile,
+        "reads_per_sec": round(counts["reads"] / seconds, 1),
+        "writes_per_sec": round(counts["writes"] / seconds, 1),
+        "errors": counts["errors"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seed-rows", type=int, default=2000)
+    parser.add_argument("--json", action="store_true", help="print machine-readable output")
+    args = parser.parse_args()
+
+    results = [
+        run_profile(profile, args.seconds, args.readers, args.writers, args.seed_rows)
+        for profile in SQLITE_PROFILES
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'profile':<12} {'reads/s':>10} {'writes/s':>10} {'errors':>8}")
+    for r in results:
+        print(f"{r['profile']:<12} {r['reads_per_sec']:>10} {r['writes_per_sec']:>10} {r['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -98,6 +98,59 @@ async def run_automated_tests():
             })
             print(f"   {result.content[0].text}\n")
             
+            # Test 11: Send messages in one batch
+            print("📦 Test 11: Sending a batch of messages")
+            result = await session.call_tool("send-messages-batch", {
+                "messages": [
+                    {"name": "TestBot", "content": "Batch message 1"},
+                    {"name": "TestBot", "content": "Batch message 2", "channel": "random"}
+                ]
+            })
+            print(f"   {result.content[0].text}\n")
+            
+            # Test 12: Toggle a reaction on and off
+            print("🔁 Test 12: Toggling a reaction on message 1 twice")
+            for _ in range(2):
+                result = await session.call_tool("toggle-reaction", {
+                    "message_id": 1,
+                    "user_name": "TestBot",
+                    "emoji": "🎉"
+                })
+                print(f"   {result.content[0].text}")
+            print()
+            
+            # Test 13: Reply tree and ancestor chain
+            print("🌳 Test 13: Getting the reply tree of message 1")
+            result = await session.call_tool("get-thread-tree", {
+                "message_id": 1,
+                "max_depth": 3
+            })
+            print(f"   {result.content[0].text}\n")
+            
+            # Test 14: Fetch several messages and their reactions by id
+            print("🗂️  Test 14: Getting messages 1-3 and their reactions by id")
+            result = await session.call_tool("get-messages-by-ids", {
+                "message_ids": [1, 2, 3],
+                "include_replies": True
+            })
+            print(f"   {result.content[0].text}\n")
+            result = await session.call_tool("get-reactions-by-ids", {
+                "message_ids": [1, 2, 3]
+            })
+            print(f"   {result.content[0].text}\n")
+            
+            # Test 15: Several tool calls in one atomic batch
+            print("📦 Test 15: Running an atomic batch (send, react, read)")
+            result = await session.call_tool("batch", {
+                "atomic": True,
+                "items": [
+                    {"name": "send-message", "arguments": {"name": "TestBot", "content": "From a batch"}},
+                    {"name": "toggle-reaction", "arguments": {"message_id": 1, "user_name": "TestBot", "emoji": "👏"}},
+                    {"name": "get-messages", "arguments": {"limit": 2}}
+                ]
+            })
+            print(f"   {result.content[0].text}\n")
+            
             print("=" * 70)
             print("✅ All tests completed successfully!")
 
@@ -6,7 +6,7 @@ from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
 
-async def test_mcp_server():
+async def run_client():
     """Test the MCP server interactively."""
     # Connect to the MCP server
     server_params = StdioServerParameters(
@@ -127,7 +127,7 @@ if __name__ == "__main__":
     print("🚀 Starting MCP Client Test...")
     print("=" * 60)
     try:
-        asyncio.run(test_mcp_server())
+        asyncio.run(run_client())
     except KeyboardInterrupt:
         print("\n\n👋 Interrupted by user")
     except Exception as e:
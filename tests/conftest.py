@@ -0,0 +1,70 @@
+"""Shared fixtures: a throwaway SQLite database and the sync/async crud layers."""
+import os
+import tempfile
+
+# Must be set before app.config is imported
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='mcp-chat-tests-')}/chat.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+# Tool results as structured payloads (see the ``tool`` fixture)
+os.environ["MCP_OUTPUT_FORMAT"] = "structured"
+os.environ["MCP_TOOL_OUTPUT_FORMAT"] = ""
+
+import pytest
+from app import crud, crud_async, main
+from app.cache import read_cache
+from app.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine, init_db
+
+init_db()
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def empty_db() -> None:
+    """Delete every row and clear the read cache."""
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    read_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clean_db():
+    """Start every test with empty tables and an empty read cache."""
+    empty_db()
+    yield
+
+
+@pytest.fixture(params=["sync", "async"])
+async def call(request):
+    """Call a crud function by name on the sync (crud) or async (crud_async) layer.
+
+    Each call gets its own session, like a tool call or REST request.
+    """
+    if request.param == "sync":
+        async def run(fn: str, *args):
+            with SessionLocal() as db:
+                return getattr(crud, fn)(db, *args)
+    else:
+        async def run(fn: str, *args):
+            async with AsyncSessionLocal() as db:
+                return await getattr(crud_async, fn)(db, *args)
+    yield run
+    # aiosqlite connections are tied to the test's event loop
+    await async_engine.dispose()
+
+
+@pytest.fixture
+async def tool():
+    """Call an MCP tool in-process; returns its structured payload.
+
+    Errors come back as plain text, so they are returned as ``{"summary": text}``.
+    """
+    async def run(name: str, arguments: dict):
+        result = await main.call_tool(name, arguments)
+        if isinstance(result, tuple):
+            return result[1]
+        return {"summary": result[0].text}
+    yield run
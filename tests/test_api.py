@@ -0,0 +1,32 @@
+"""REST API (app.api) through FastAPI's TestClient."""
+from fastapi.testclient import TestClient
+from app import crud
+from app.api import api
+from app.database import SessionLocal
+
+
+def watermark(response) -> tuple[int, int]:
+    return int(response.headers["X-Watermark-Message-Id"]), int(response.headers["X-Watermark-Reaction-Seq"])
+
+
+def test_feeds_return_watermark_headers():
+    with SessionLocal() as db:
+        first = crud.send_message(db, "ana", "hola", "general")
+        second = crud.send_message(db, "luis", "adiós", "random")
+        crud.add_reaction(db, first, "eva", "👍")
+        reaction_seq = crud.get_watermark(db)['reaction_seq']
+
+    with TestClient(api) as client:
+        response = client.get("/messages", params={"since_id": first})
+        assert [m['id'] for m in response.json()] == [second]
+        assert watermark(response) == (second, reaction_seq)
+
+        response = client.get("/channels/general/messages", params={"since_id": 0})
+        assert [m['id'] for m in response.json()] == [first]
+
+        response = client.get(f"/messages/{first}/thread", params={"since_id": first})
+        assert watermark(response) == (second, reaction_seq)
+
+        response = client.get("/reactions/changes", params={"since_seq": 0})
+        assert [c['message_id'] for c in response.json()] == [first]
+        assert watermark(response) == (second, reaction_seq)
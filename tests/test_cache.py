@@ -0,0 +1,62 @@
+"""Read cache (app.cache): tag invalidation, racing loads and atomic batches."""
+from app import crud
+from app.cache import QueryCache, read_cache
+from app.database import SessionLocal, atomic_session, end_atomic_session
+
+
+def test_writes_invalidate_only_their_tags():
+    with SessionLocal() as db:
+        first = crud.send_message(db, "ana", "hola", "general")
+        crud.send_message(db, "luis", "adiós", "random")
+        crud.get_channel_messages(db, "general", 10)
+        crud.get_channel_messages(db, "random", 10)
+        crud.get_users_list(db)
+        assert read_cache.stats()['size'] == 3
+
+        # A reaction touches its message's tag: the #general page, not #random
+        crud.add_reaction(db, first, "eva", "👍")
+        assert read_cache.stats()['size'] == 2
+        assert crud.get_channel_messages(db, "general", 10)[0]['reaction_count'] == 1
+
+        # A new #random message: its feed and the users list, not #general
+        hits = read_cache.stats()['hits']
+        crud.send_message(db, "eva", "otra", "random")
+        crud.get_channel_messages(db, "general", 10)
+        assert read_cache.stats()['hits'] == hits + 1
+        assert len(crud.get_channel_messages(db, "random", 10)) == 2
+        assert read_cache.stats()['hits'] == hits + 1
+
+
+def test_load_racing_a_write_is_not_stored():
+    cache = QueryCache(maxsize=10, ttl=60)
+    cache.get_or_load("other", lambda: "kept", lambda value: {"b"})
+
+    def load():
+        # A write commits (and invalidates) while the query is running
+        cache.invalidate("a")
+        return "stale"
+
+    assert cache.get_or_load("key", load, lambda value: {"a"}) == "stale"
+    assert cache.stats()['size'] == 1
+    assert cache.get_or_load("key", lambda: "fresh", lambda value: {"a"}) == "fresh"
+    assert cache.get_or_load("other", lambda: "reloaded", lambda value: {"b"}) == "kept"
+
+
+def test_reads_inside_an_atomic_batch_bypass_the_cache():
+    with SessionLocal() as db:
+        crud.send_message(db, "ana", "hola", "general")
+        assert len(crud.get_messages(db, 10)) == 1
+    size = read_cache.stats()['size']
+
+    db = atomic_session()
+    try:
+        crud.send_message(db, "luis", "quizá", "general")
+        # Sees its own uncommitted write instead of the cached page...
+        assert len(crud.get_messages(db, 10)) == 2
+        # ...and does not store it
+        assert read_cache.stats()['size'] == size
+    finally:
+        end_atomic_session(db, commit=False)
+
+    with SessionLocal() as db:
+        assert [m['content'] for m in crud.get_messages(db, 10)] == ["hola"]
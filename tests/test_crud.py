@@ -0,0 +1,192 @@
+"""crud behaviour, run against both the sync and the async layer."""
+from datetime import datetime, timezone
+import pytest
+from app import crud
+
+pytestmark = pytest.mark.anyio
+
+
+async def pages(call, fn: str, *args, limit: int, options: tuple = ()):
+    """Follow cursors until the last page; returns the pages' id lists.
+
+    ``fn`` is called as ``fn(*args, limit, cursor, *options)``.
+    """
+    result, cursor = [], None
+    while True:
+        page = await call(fn, *args, limit, cursor, *options)
+        result.append([m['id'] for m in page])
+        cursor = crud.next_cursor(page, limit)
+        if cursor is None:
+            return result
+
+
+async def test_send_and_get_messages(call):
+    first = await call("send_message", "ana", "hola", "general")
+    second = await call("send_message", "luis", "adiós", "random")
+    reply = await call("reply_to_message", first, "luis", "respuesta")
+
+    messages = await call("get_messages", 10, None)
+    # Newest first, top-level only, with denormalized counters
+    assert [m['id'] for m in messages] == [second, first]
+    assert messages[1]['reply_count'] == 1
+    assert (await call("get_message_by_id", reply))['parent_id'] == first
+    assert await call("get_message_by_id", 999999) is None
+
+
+async def test_cursor_pages_cover_every_message_once(call):
+    ids = [await call("send_message", "ana", f"mensaje {i}", "general") for i in range(7)]
+
+    assert await pages(call, "get_messages", limit=3) == [ids[:3:-1], ids[3:0:-1], ids[:1]]
+    assert await pages(call, "get_channel_messages", "general", limit=10) == [ids[::-1]]
+    assert await pages(call, "get_channel_messages", "random", limit=3) == [[]]
+
+
+async def test_invalid_cursor(call):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        await call("get_messages", 10, "not-a-cursor")
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        await call("search_messages", "hola", 10, "not-a-cursor")
+
+
+async def test_channels_and_users(call):
+    await call("send_message", "ana", "uno", "general")
+    await call("send_message", "ana", "dos", "general")
+    await call("send_message", "luis", "tres", "random")
+
+    channels = {c['channel']: c['message_count'] for c in await call("get_channels")}
+    assert channels == {"general": 2, "random": 1}
+    users = await call("get_users_list", 10, "messages")
+    assert [(u['name'], u['message_count']) for u in users] == [("ana", 2), ("luis", 1)]
+    assert [m['content'] for m in await call("get_messages_by_user", "lu", 10, None)] == ["tres"]
+
+
+async def test_thread(call):
+    parent = await call("send_message", "ana", "pregunta", "help")
+    replies = [await call("reply_to_message", parent, "luis", f"respuesta {i}") for i in range(3)]
+
+    thread = await call("get_message_thread", parent, None)
+    assert thread['reply_count'] == 3
+    assert [r['id'] for r in thread['replies']] == replies
+    # Replies inherit the channel and point back at their parent
+    reply = await call("get_message_thread", replies[0], None)
+    assert reply['channel'] == "help"
+    assert reply['parent']['id'] == parent
+    assert [r['id'] for r in (await call("get_message_thread", parent, replies[0]))['replies']] == replies[1:]
+
+
+async def test_thread_errors(call):
+    assert await call("get_message_thread", 999999, None) is None
+    with pytest.raises(ValueError, match="not found"):
+        await call("reply_to_message", 999999, "ana", "hola")
+
+
+async def test_reactions(call):
+    message = await call("send_message", "ana", "hola", "general")
+    await call("add_reaction", message, "luis", "👍")
+    await call("add_reaction", message, "eva", "👍")
+    await call("add_reaction", message, "eva", "🎉")
+
+    reactions = await call("get_message_reactions", message)
+    assert reactions['total_count'] == 3
+    assert [r['user_name'] for r in reactions['reactions']["👍"]] == ["luis", "eva"]
+
+    await call("remove_reaction", message, "eva", "👍")
+    assert (await call("get_message_reactions", message))['total_count'] == 2
+    assert (await call("get_messages", 10, None))[0]['reaction_count'] == 2
+
+
+async def test_reaction_errors(call):
+    message = await call("send_message", "ana", "hola", "general")
+    await call("add_reaction", message, "luis", "👍")
+
+    with pytest.raises(ValueError, match="already exists"):
+        await call("add_reaction", message, "luis", "👍")
+    with pytest.raises(ValueError, match="not found"):
+        await call("remove_reaction", message, "luis", "🎉")
+    with pytest.raises(ValueError, match="not found"):
+        await call("add_reaction", 999999, "luis", "👍")
+    assert (await call("get_message_reactions", message))['total_count'] == 1
+
+
+async def test_search(call):
+    deploy = await call("send_message", "ana", "el deploy de hoy falló", "ops")
+    await call("send_message", "luis", "deploy deploy deploy", "general")
+    await call("send_message", "eva", "nada que ver", "general")
+
+    results = await call("search_messages", "deploy", 10, None, None, "relevance")
+    assert len(results) == 2
+    assert all("[deploy]" in m['snippet'] for m in results)
+    recent = await call("search_messages", "deploy", 10, None, None, "recent")
+    assert [m['id'] for m in recent] == sorted((m['id'] for m in results), reverse=True)
+    assert [m['id'] for m in await call("search_messages", "deploy", 10, None, "ops", "relevance")] == [deploy]
+    assert [m['id'] for m in await call("search_messages", "depl*", 10, None, None, "recent")] == [m['id'] for m in recent]
+    assert await call("search_messages", "inexistente", 10, None, None, "relevance") == []
+
+
+@pytest.mark.parametrize("sort", ["relevance", "recent"])
+async def test_search_pages(call, sort):
+    ids = {await call("send_message", "ana", f"mensaje {i}", "general") for i in range(5)}
+
+    seen = sum(await pages(call, "search_messages", "mensaje", limit=2, options=(None, sort)), [])
+    assert sorted(seen) == sorted(ids)
+
+
+async def test_feed_rejects_cursor_with_since(call):
+    await call("send_message", "ana", "hola", "general")
+    page = await call("message_feed", 1, None, None, None, None)
+    with pytest.raises(ValueError, match="cannot be combined"):
+        await call("message_feed", 1, page['next_cursor'], 1, None, None)
+
+
+async def test_feed_since_id_pages_oldest_first(call):
+    ids = [await call("send_message", "ana", f"mensaje {i}", "general") for i in range(5)]
+    await call("reply_to_message", ids[0], "luis", "respuesta")
+    other = await call("send_message", "eva", "otro canal", "random")
+
+    feed = await call("message_feed", 2, None, ids[0], None, None)
+    # A full page: the watermark is its last row
+    assert [m['id'] for m in feed['messages']] == ids[1:3]
+    assert feed['watermark']['message_id'] == ids[2]
+
+    feed = await call("message_feed", 10, None, feed['watermark']['message_id'], None, None)
+    assert [m['id'] for m in feed['messages']] == [*ids[3:], other]
+    # A short page: the watermark is the newest message, replies included
+    newest = await call("reply_to_message", other, "ana", "otra respuesta")
+    feed = await call("message_feed", 10, None, newest, None, None)
+    assert feed['messages'] == [] and feed['watermark']['message_id'] == newest
+
+    feed = await call("message_feed", 10, None, ids[0], None, "general")
+    assert [m['id'] for m in feed['messages']] == ids[1:]
+
+
+async def test_feed_since_ts(call):
+    ids = [await call("send_message", "ana", f"mensaje {i}", "general") for i in range(3)]
+    since = (await call("get_message_by_id", ids[0]))['created_at']
+
+    feed = await call("message_feed", 10, None, None, since, None)
+    assert [m['id'] for m in feed['messages']] == ids[1:]
+    assert feed['watermark']['message_id'] == ids[-1]
+    # Combined with since_id, the later bound wins
+    feed = await call("message_feed", 10, None, ids[1], since, "general")
+    assert [m['id'] for m in feed['messages']] == ids[2:]
+    feed = await call("message_feed", 10, None, None, datetime(2100, 1, 1, tzinfo=timezone.utc), None)
+    assert feed['messages'] == []
+
+
+async def test_reaction_feed(call):
+    first = await call("send_message", "ana", "hola", "general")
+    second = await call("send_message", "luis", "adiós", "random")
+    start = (await call("get_watermark"))['reaction_seq']
+    await call("add_reaction", first, "eva", "👍")
+    await call("add_reaction", second, "eva", "👍")
+    await call("add_reaction", first, "luis", "🎉")
+
+    feed = await call("reaction_feed", start, 10, None)
+    # One entry per message, at its latest change, with the current count
+    assert [(c['message_id'], c['reaction_count']) for c in feed['changes']] == [(second, 1), (first, 2)]
+    assert feed['watermark']['reaction_seq'] == feed['changes'][-1]['seq']
+
+    feed = await call("reaction_feed", start, 1, None)
+    assert [c['message_id'] for c in feed['changes']] == [second]
+    assert feed['watermark']['reaction_seq'] == feed['changes'][0]['seq']
+    assert [c['message_id'] for c in (await call("reaction_feed", start, 10, "general"))['changes']] == [first]
@@ -0,0 +1,161 @@
+"""Event bus (app.events), its SSE/WebSocket endpoints and resource notifications."""
+import asyncio
+import json
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from app import api as api_module, crud, resources
+from app.api import api
+from app.database import SessionLocal
+from app.events import EventBus, bus
+
+pytestmark = pytest.mark.anyio
+
+
+def send(name: str, content: str, channel: str) -> int:
+    with SessionLocal() as db:
+        return crud.send_message(db, name, content, channel)
+
+
+async def test_bus_filters_by_channel_and_accepts_any_thread():
+    events = EventBus(queue_size=10)
+    python = events.subscribe(["python"])
+    everything = events.subscribe()
+
+    thread = threading.Thread(target=events.publish, args=("message", "python", {'id': 1}))
+    thread.start()
+    thread.join()
+    events.publish("message", "jobs", {'id': 2})
+
+    assert (await python.get(timeout=1))['data'] == {'id': 1}
+    assert await python.get(timeout=0.05) is None
+    assert [(await everything.get(timeout=1))['data']['id'] for _ in range(2)] == [1, 2]
+
+    python.subscribe(["jobs"])
+    # Unsubscribing turns an all-channels subscription into a filter
+    everything.unsubscribe(["python"])
+    assert everything.channels == set()
+    events.publish("message", "python", {'id': 3})
+    events.publish("message", "jobs", {'id': 4})
+    assert [(await python.get(timeout=1))['data']['id'] for _ in range(2)] == [3, 4]
+    assert everything.get_nowait() is None
+
+    events.unsubscribe(python)
+    events.unsubscribe(everything)
+    assert events.stats()['subscribers'] == 0
+
+
+async def test_slow_subscriber_gets_one_lagged_event():
+    events = EventBus(queue_size=2)
+    subscription = events.subscribe()
+    for i in range(5):
+        events.publish("message", "general", {'id': i})
+    await asyncio.sleep(0)
+
+    assert [(await subscription.get())['data']['id'] for _ in range(2)] == [0, 1]
+    assert await subscription.get() == {'type': 'lagged', 'dropped': 3}
+    # Delivery resumes once the subscriber has caught up
+    events.publish("message", "general", {'id': 5})
+    assert (await subscription.get(timeout=1))['data']['id'] == 5
+    assert events.stats()['dropped'] == 3
+
+
+async def test_writes_publish_events_after_commit():
+    subscription = bus.subscribe(["general"])
+    try:
+        first = send("ana", "hola", "general")
+        send("luis", "otro canal", "random")
+        with SessionLocal() as db:
+            reply = crud.reply_to_message(db, first, "eva", "respuesta")
+            crud.add_reaction(db, first, "luis", "👍")
+            crud.remove_reaction(db, first, "luis", "👍")
+
+        events = [await subscription.get(timeout=1) for _ in range(4)]
+        assert [e['type'] for e in events] == ["message", "reply", "reaction_added", "reaction_removed"]
+        assert events[0]['data']['id'] == first
+        assert (events[1]['data']['id'], events[1]['data']['parent_id']) == (reply, first)
+        assert events[2]['data'] == {'message_id': first, 'user_name': "luis", 'emoji': "👍"}
+        assert [e['seq'] for e in events] == sorted(e['seq'] for e in events)
+    finally:
+        bus.unsubscribe(subscription)
+
+
+async def test_sse_stream_frames_events_and_heartbeats(monkeypatch):
+    monkeypatch.setattr(api_module, "EVENT_HEARTBEAT", 0.05)
+    response = await api_module.stream_events(["general"])
+    frames = response.body_iterator
+    try:
+        assert await anext(frames) == ": keep-alive\n\n"
+        message_id = send("ana", "hola", "general")
+        frame = await anext(frames)
+        event_id, event_type, data = frame.rstrip("\n").split("\n")
+        event = json.loads(data.removeprefix("data: "))
+        assert event_type == "event: message"
+        assert event_id == f"id: {event['seq']}"
+        assert event['data']['id'] == message_id
+    finally:
+        await frames.aclose()
+    assert bus.stats()['subscribers'] == 0
+
+
+def test_websocket_events_and_commands():
+    with TestClient(api) as client, client.websocket_connect("/ws?channel=general") as ws:
+        ws.send_json({"subscribe": ["python"]})
+        assert ws.receive_json() == {'type': 'subscribed', 'channels': ["general", "python"]}
+
+        send("ana", "fuera", "jobs")
+        message_id = send("ana", "hola", "python")
+        event = ws.receive_json()
+        assert (event['type'], event['channel'], event['data']['id']) == ("message", "python", message_id)
+
+        ws.send_text("not json")
+        assert ws.receive_json() == {'type': 'error', 'error': "Expected a JSON object"}
+        # A string would otherwise be subscribed one character at a time
+        ws.send_json({"subscribe": "jobs"})
+        assert ws.receive_json() == {'type': 'error', 'error': "'subscribe' must be a list of channel names"}
+        ws.send_json({"unsubscribe": [1]})
+        assert ws.receive_json()['type'] == "error"
+
+        ws.send_json({"unsubscribe": ["python"]})
+        assert ws.receive_json() == {'type': 'subscribed', 'channels': ["general"]}
+
+
+class FakeSession:
+    """Records notifications/resources/updated sent to an MCP session."""
+
+    def __init__(self, fail: bool = False):
+        self.updated = []
+        self.fail = fail
+
+    async def send_resource_updated(self, uri) -> None:
+        if self.fail:
+            raise ConnectionError("session closed")
+        self.updated.append(str(uri))
+
+
+async def test_resource_updates_are_coalesced_per_uri():
+    notifier = resources.ResourceNotifier(interval=0.05)
+    session, closed = FakeSession(), FakeSession(fail=True)
+    first = send("ana", "hola", "general")
+    channel, thread = resources.channel_uri("general"), resources.thread_uri(first)
+    notifier.subscribe(session, channel)
+    notifier.subscribe(session, thread)
+    notifier.subscribe(closed, channel)
+    with pytest.raises(ValueError):
+        notifier.subscribe(session, "chat://other/1")
+
+    # A burst: one update per touched URI
+    send("luis", "otro", "general")
+    with SessionLocal() as db:
+        crud.reply_to_message(db, first, "eva", "respuesta")
+        crud.add_reaction(db, first, "luis", "👍")
+    send("luis", "otro canal", "random")
+    await asyncio.sleep(0.2)
+
+    assert sorted(session.updated) == sorted([channel, thread])
+    assert notifier.sent == 2
+    # The failing session was dropped; the last unsubscribe stops listening
+    notifier.unsubscribe(session, channel)
+    notifier.unsubscribe(session, thread)
+    assert notifier._task is None
+    assert bus.stats()['subscribers'] == 0
@@ -0,0 +1,54 @@
+"""NDJSON export: keyset batches, filters, resume, and writers running alongside."""
+import pytest
+from app import crud
+from app.database import SessionLocal
+
+
+def send(count: int, channel: str = "general") -> list[int]:
+    with SessionLocal() as db:
+        return [crud.send_message(db, "ana", f"mensaje {i}", channel) for i in range(count)]
+
+
+def export(**filters) -> list[list[dict]]:
+    with SessionLocal() as db:
+        return list(crud.export_messages(db, **filters))
+
+
+def test_export_batches_in_order_with_reactions():
+    ids = send(25)
+    with SessionLocal() as db:
+        reply = crud.reply_to_message(db, ids[0], "luis", "respuesta")
+        crud.add_reaction(db, ids[3], "luis", "👍")
+
+    batches = export(batch_size=10)
+    assert [len(batch) for batch in batches] == [10, 10, 6]
+    messages = [m for batch in batches for m in batch]
+    assert [m['id'] for m in messages] == ids + [reply]
+    assert [r['emoji'] for r in messages[3]['reactions']] == ["👍"]
+    assert messages[-1]['parent_id'] == ids[0]
+
+
+def test_export_filters_and_resume():
+    general = send(5)
+    random = send(5, "random")
+
+    assert [m['id'] for batch in export(channel="random", batch_size=2) for m in batch] == random
+    resumed = export(channel="general", after_id=general[1], batch_size=2)
+    assert [m['id'] for batch in resumed for m in batch] == general[2:]
+    with pytest.raises(ValueError, match="not found"):
+        export(after_id=999999)
+
+
+def test_writers_are_not_blocked_between_batches():
+    ids = send(30)
+    with SessionLocal() as db:
+        batches = crud.export_messages(db, batch_size=10)
+        first = next(batches)
+        # Would fail with "database is locked" if the export kept its read open
+        with SessionLocal() as writer:
+            new = crud.send_message(writer, "luis", "durante la exportación", "general")
+        rest = list(batches)
+
+    exported = [m['id'] for batch in [first, *rest] for m in batch]
+    # Later batches resume after the last row sent and pick up the new message
+    assert exported == ids + [new]
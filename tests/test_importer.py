@@ -0,0 +1,186 @@
+"""Archive import (app.importer): round trips, resume, parents and offline mode."""
+import csv
+import json
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from app import crud, importer
+from app.api import api
+from app.database import SessionLocal, engine
+from conftest import empty_db
+
+
+def seed() -> dict:
+    """A few messages across two channels, a reply and reactions."""
+    with SessionLocal() as db:
+        first = crud.send_message(db, "ana", "hola a todos", "general")
+        second = crud.send_message(db, "luis", "despliegue listo", "ops")
+        reply = crud.reply_to_message(db, first, "eva", "bienvenida")
+        crud.add_reaction(db, first, "luis", "👍")
+        crud.add_reaction(db, first, "eva", "🎉")
+        crud.add_reaction(db, reply, "ana", "❤️")
+    return {'first': first, 'second': second, 'reply': reply}
+
+
+def export_records() -> list[dict]:
+    response = TestClient(api).get("/export/messages")
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def comparable(records: list[dict]) -> list[tuple]:
+    """Records without their ids (parents by content, reactions without ids)."""
+    content = {r['id']: r['content'] for r in records}
+    return [
+        (
+            r['name'], r['content'], r['channel'], r['created_at'], r['updated_at'],
+            content.get(r['parent_id']),
+            [(x['user_name'], x['emoji'], x['created_at']) for x in r['reactions']]
+        )
+        for r in records
+    ]
+
+
+def write_ndjson(path, records: list[dict]) -> str:
+    path.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records), encoding="utf-8")
+    return str(path)
+
+
+def write_csv(path, records: list[dict]) -> str:
+    columns = ["id", "parent_id", "name", "content", "channel", "created_at", "updated_at", "reactions"]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, columns)
+        writer.writeheader()
+        for r in records:
+            writer.writerow({
+                **{key: r[key] for key in columns[:-1]},
+                'parent_id': r['parent_id'] or "",
+                'reactions': json.dumps(r['reactions'], ensure_ascii=False)
+            })
+    return str(path)
+
+
+@pytest.mark.parametrize("write", [write_ndjson, write_csv])
+def test_round_trip_from_export(tmp_path, write):
+    seed()
+    exported = export_records()
+    path = write(tmp_path / ("archive.csv" if write is write_csv else "archive.ndjson"), exported)
+    empty_db()
+
+    report = importer.import_archive(engine, path, chunk_size=2)
+
+    assert (report['imported'], report['reactions'], report['errors'], report['orphans']) == (3, 3, 0, 0)
+    assert comparable(export_records()) == comparable(exported)
+    with SessionLocal() as db:
+        top = crud.get_messages(db, 10)
+        assert [(m['content'], m['reply_count'], m['reaction_count']) for m in top] == [
+            ("despliegue listo", 0, 0), ("hola a todos", 1, 2)
+        ]
+        assert crud.check_stats(db) == {'channels': [], 'users': []}
+
+
+def test_bad_lines_are_reported_and_skipped(tmp_path):
+    seed()
+    exported = export_records()
+    path = write_csv(tmp_path / "archive.csv", exported)
+    lines = open(path, encoding="utf-8").read().splitlines()
+    # Row 2 (line 3): broken reactions JSON
+    lines[2] = lines[2].rsplit(",", 1)[0] + ',"[{oops"'
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    empty_db()
+
+    report = importer.import_archive(engine, path)
+    assert (report['imported'], report['errors']) == (2, 1)
+    assert report['error_samples'] == [{'line': 3, 'error': "reactions: invalid JSON"}]
+
+    ndjson = tmp_path / "archive.ndjson"
+    ndjson.write_text('{"id": 1, "name": "ana", "content": "ok", "created_at": "2024-01-01T00:00:00"}\n'
+                      '{not json\n'
+                      '{"id": 2, "name": "ana"}\n', encoding="utf-8")
+    report = importer.import_archive(engine, str(ndjson))
+    assert (report['imported'], report['errors']) == (1, 2)
+    assert [sample['line'] for sample in report['error_samples']] == [2, 3]
+
+
+def test_resume_does_not_duplicate(tmp_path):
+    records = [
+        {'id': i, 'name': "ana", 'content': f"mensaje {i}", 'created_at': f"2024-01-01T00:00:{i:02d}"}
+        for i in range(10)
+    ]
+    # An interrupted run: only the first half made it
+    importer.import_archive(engine, write_ndjson(tmp_path / "part.ndjson", records[:5]), source="archive")
+    report = importer.import_archive(
+        engine, write_ndjson(tmp_path / "archive.ndjson", records), source="archive", chunk_size=3
+    )
+
+    assert (report['imported'], report['skipped']) == (5, 5)
+    with SessionLocal() as db:
+        contents = [m['content'] for m in crud.get_messages(db, 50)]
+    assert sorted(contents) == sorted(r['content'] for r in records)
+
+
+def test_parents_resolved_and_orphans_counted(tmp_path):
+    records = [
+        # A reply before its parent, and one whose parent is not in the archive
+        {'id': "b", 'parent_id': "a", 'name': "luis", 'content': "respuesta", 'created_at': "2024-01-01T00:00:02"},
+        {'id': "a", 'name': "ana", 'content': "pregunta", 'created_at': "2024-01-01T00:00:01"},
+        {'id': "c", 'parent_id': "zzz", 'name': "eva", 'content': "huérfana", 'created_at': "2024-01-01T00:00:03"},
+    ]
+    report = importer.import_archive(engine, write_ndjson(tmp_path / "archive.ndjson", records), chunk_size=1)
+
+    assert report['orphans'] == 1
+    with SessionLocal() as db:
+        top = {m['content']: m for m in crud.get_messages(db, 10)}
+        assert set(top) == {"pregunta", "huérfana"}
+        thread = crud.get_message_thread(db, top["pregunta"]['id'])
+        assert [r['content'] for r in thread['replies']] == ["respuesta"]
+        assert thread['reply_count'] == 1
+
+
+def test_counts_only_include_committed_chunks(tmp_path, monkeypatch):
+    records = [
+        {'id': i, 'name': "ana", 'content': f"mensaje {i}", 'created_at': f"2024-01-01T00:00:{i:02d}"}
+        for i in range(4)
+    ]
+    reports = []
+    import_chunk = importer._import_chunk
+
+    def fail_second_chunk(db, source, chunk, report):
+        import_chunk(db, source, chunk, report)
+        if reports:
+            raise RuntimeError("commit failed")
+
+    monkeypatch.setattr(importer, "_import_chunk", fail_second_chunk)
+    with pytest.raises(RuntimeError):
+        importer.import_archive(
+            engine, write_ndjson(tmp_path / "archive.ndjson", records), chunk_size=2, progress=reports.append
+        )
+
+    assert reports[-1]['imported'] == 2
+    with SessionLocal() as db:
+        assert len(crud.get_messages(db, 10)) == 2
+
+
+def index_names() -> set[str]:
+    with engine.connect() as conn:
+        return set(conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type IN ('index', 'trigger') AND name NOT LIKE 'sqlite_%'"
+        )).scalars())
+
+
+def test_offline_import_restores_indexes_and_search(tmp_path):
+    before = index_names()
+    records = [
+        {'id': 1, 'name': "ana", 'content': "kubernetes en producción", 'created_at': "2024-01-01T00:00:00"},
+        {'id': 2, 'parent_id': 1, 'name': "luis", 'content': "¿qué versión?", 'created_at': "2024-01-01T00:00:01"},
+    ]
+    report = importer.import_archive(engine, write_ndjson(tmp_path / "archive.ndjson", records), offline=True)
+
+    assert report['imported'] == 2
+    assert index_names() == before
+    with SessionLocal() as db:
+        assert [m['content'] for m in crud.search_messages(db, "kubernetes")] == ["kubernetes en producción"]
+        # The FTS triggers are back: new messages are indexed again
+        crud.send_message(db, "eva", "kubernetes otra vez", "general")
+        assert len(crud.search_messages(db, "kubernetes")) == 2
@@ -0,0 +1,259 @@
+"""MCP tools called in-process through main.call_tool."""
+import pytest
+from app.config import BATCH_MAX_ITEMS
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_batch_write_tools_reject_oversized_batches(tool):
+    messages = [{"name": "ana", "content": f"mensaje {i}"} for i in range(BATCH_MAX_ITEMS + 1)]
+    result = await tool("send-messages-batch", {"messages": messages})
+    assert result["summary"].startswith("❌ Validation error")
+    assert (await tool("get-messages", {}))["result"] == []
+
+    reactions = [{"message_id": 1, "user_name": f"u{i}", "emoji": "👍"} for i in range(BATCH_MAX_ITEMS + 1)]
+    result = await tool("add-reactions-batch", {"reactions": reactions})
+    assert result["summary"].startswith("❌ Validation error")
+
+
+async def test_batch_write_tools_accept_the_maximum(tool):
+    messages = [{"name": "ana", "content": f"mensaje {i}"} for i in range(BATCH_MAX_ITEMS)]
+    result = await tool("send-messages-batch", {"messages": messages})
+    assert result["summary"] == f"✅ Sent {BATCH_MAX_ITEMS}/{BATCH_MAX_ITEMS} messages"
+
+
+async def test_batch_write_tools_report_errors_per_item(tool):
+    result = await tool("send-messages-batch", {"messages": [
+        {"name": "ana", "content": "hola"},
+        {"name": "ana"},
+        {"name": "luis", "content": "adiós", "channel": "random"},
+    ]})
+    assert result["summary"] == "✅ Sent 2/3 messages"
+    first, invalid, last = result["result"]
+    assert "error" in invalid and "id" in first and "id" in last
+
+    result = await tool("add-reactions-batch", {"reactions": [
+        {"message_id": first["id"], "user_name": "eva", "emoji": "👍"},
+        {"message_id": first["id"], "user_name": "eva", "emoji": "👍"},
+        {"message_id": 999999, "user_name": "eva", "emoji": "👍"},
+    ]})
+    assert result["summary"] == "✅ Added 1/3 reactions"
+    assert ["id" in r for r in result["result"]] == [True, False, False]
+
+
+async def test_toggle_reaction_keeps_reaction_count(tool):
+    message = (await tool("send-message", {"name": "ana", "content": "hola"}))["id"]
+
+    async def reaction_count():
+        return (await tool("get-messages", {}))["result"][0]["reaction_count"]
+
+    toggle = {"message_id": message, "user_name": "luis", "emoji": "🎉"}
+    assert (await tool("toggle-reaction", toggle))["added"] is True
+    assert await reaction_count() == 1
+    assert (await tool("toggle-reaction", toggle))["added"] is False
+    assert await reaction_count() == 0
+    assert (await tool("toggle-reaction", toggle))["added"] is True
+    await tool("toggle-reaction", {**toggle, "user_name": "eva"})
+    assert await reaction_count() == 2
+
+    reactions = (await tool("get-message-reactions", {"message_id": message}))["result"]
+    assert reactions["total_count"] == 2
+    assert [r["user_name"] for r in reactions["reactions"]["🎉"]] == ["luis", "eva"]
+
+
+async def test_reaction_writes_on_missing_messages_leave_no_rows(tool):
+    for name in ("add-reaction", "toggle-reaction"):
+        result = await tool(name, {"message_id": 999999, "user_name": "luis", "emoji": "👍"})
+        assert result["summary"] == "❌ Validation error: Message 999999 not found"
+    result = await tool("get-message-reactions", {"message_id": 999999})
+    assert result["result"]["total_count"] == 0
+
+
+async def reply_chain(tool, length: int) -> list[int]:
+    """A root message and ``length`` replies, each replying to the previous one."""
+    ids = [(await tool("send-message", {"name": "ana", "content": "raíz"}))["id"]]
+    for i in range(length):
+        reply = await tool("reply-to-message", {
+            "parent_message_id": ids[-1],
+            "name": "luis",
+            "content": f"nivel {i + 1}"
+        })
+        ids.append(reply["id"])
+    return ids
+
+
+async def test_thread_tree_depth_limit(tool):
+    chain = await reply_chain(tool, 4)
+    sibling = (await tool("reply-to-message", {"parent_message_id": chain[0], "name": "eva", "content": "otra"}))["id"]
+
+    tree = (await tool("get-thread-tree", {"message_id": chain[0], "max_depth": 2}))["result"]
+    # Thread order: every message followed by its replies
+    assert [(n["id"], n["depth"]) for n in tree["nodes"]] == [
+        (chain[0], 0), (chain[1], 1), (chain[2], 2), (sibling, 1)
+    ]
+    assert not tree["truncated"]
+    # Replies below max_depth are announced by reply_count
+    assert tree["nodes"][2]["reply_count"] == 1
+
+    tree = (await tool("get-thread-tree", {"message_id": chain[0], "order": "depth"}))["result"]
+    assert [n["depth"] for n in tree["nodes"]] == [0, 1, 1, 2, 3, 4]
+
+    tree = (await tool("get-thread-tree", {"message_id": chain[0], "max_nodes": 3}))["result"]
+    assert tree["truncated"]
+    assert {n["id"] for n in tree["nodes"]} == {chain[0], chain[1], sibling}
+
+
+async def test_thread_tree_ancestor_order(tool):
+    chain = await reply_chain(tool, 4)
+
+    tree = (await tool("get-thread-tree", {"message_id": chain[-1], "direction": "ancestors"}))["result"]
+    # From the root down to the message
+    assert [n["id"] for n in tree["nodes"]] == chain
+    assert [n["depth"] for n in tree["nodes"]] == [4, 3, 2, 1, 0]
+
+    tree = (await tool("get-thread-tree", {"message_id": chain[-1], "direction": "ancestors", "max_depth": 2}))["result"]
+    assert [n["id"] for n in tree["nodes"]] == chain[2:]
+
+    tree = (await tool("get-thread-tree", {"message_id": chain[-1], "direction": "ancestors", "order": "depth"}))["result"]
+    assert [n["id"] for n in tree["nodes"]] == chain[::-1]
+
+
+async def test_thread_tree_errors(tool):
+    result = await tool("get-thread-tree", {"message_id": 999999})
+    assert result["summary"] == "❌ Message 999999 not found"
+    for limits in ({"max_depth": 0}, {"max_depth": 101}, {"max_nodes": 1001}):
+        result = await tool("get-thread-tree", {"message_id": 1, **limits})
+        assert result["summary"].startswith("❌ Validation error")
+
+
+async def test_messages_by_ids_keep_request_order(tool):
+    ids = [(await tool("send-message", {"name": "ana", "content": f"mensaje {i}"}))["id"] for i in range(3)]
+    reply = (await tool("reply-to-message", {"parent_message_id": ids[0], "name": "luis", "content": "sí"}))["id"]
+
+    requested = [ids[2], 999999, ids[0], ids[2], 888888, ids[1], 999999]
+    result = (await tool("get-messages-by-ids", {"message_ids": requested}))["result"]
+    # Duplicates collapse to their first position; missing ids keep theirs
+    assert list(result["messages"]) == [str(ids[2]), str(ids[0]), str(ids[1])]
+    assert result["missing"] == [999999, 888888]
+    assert result["messages"][str(ids[1])]["content"] == "mensaje 1"
+
+    result = (await tool("get-messages-by-ids", {"message_ids": ids, "include_replies": True}))["result"]
+    assert [[r["id"] for r in m["replies"]] for m in result["messages"].values()] == [[reply], [], []]
+
+
+async def test_reactions_by_ids_keep_request_order(tool):
+    ids = [(await tool("send-message", {"name": "ana", "content": f"mensaje {i}"}))["id"] for i in range(2)]
+    await tool("add-reaction", {"message_id": ids[1], "user_name": "luis", "emoji": "👍"})
+    await tool("add-reaction", {"message_id": ids[1], "user_name": "eva", "emoji": "👍"})
+
+    result = (await tool("get-reactions-by-ids", {"message_ids": [ids[1], 999999, ids[0], ids[1]]}))["result"]
+    assert list(result["reactions"]) == [str(ids[1]), str(ids[0])]
+    assert result["missing"] == [999999]
+    assert result["reactions"][str(ids[1])]["total_count"] == 2
+    # Messages without reactions get an empty entry
+    assert result["reactions"][str(ids[0])] == {"message_id": ids[0], "reactions": {}, "total_count": 0}
+
+
+async def test_by_ids_limits(tool):
+    for name in ("get-messages-by-ids", "get-reactions-by-ids"):
+        for message_ids in ([], list(range(1, BATCH_MAX_ITEMS + 2))):
+            result = await tool(name, {"message_ids": message_ids})
+            assert result["summary"].startswith("❌ Validation error")
+
+
+def batch_items(message_id: int) -> list[dict]:
+    """Two writes around one that fails (reaction to a missing message), then a read."""
+    return [
+        {"name": "send-message", "arguments": {"name": "ana", "content": "primero"}},
+        {"name": "add-reaction", "arguments": {"message_id": message_id, "user_name": "luis", "emoji": "👍"}},
+        {"name": "send-message", "arguments": {"name": "ana", "content": "segundo"}},
+        {"name": "get-messages", "arguments": {}},
+    ]
+
+
+async def test_atomic_batch_rolls_back_after_a_failing_item(tool):
+    result = await tool("batch", {"items": batch_items(999999), "atomic": True})
+
+    assert result["rolled_back"] is True
+    first, failed, skipped, read = result["result"]
+    assert first["error"] == "❌ Rolled back: item 1 failed"
+    assert failed["error"].startswith("❌ Validation error")
+    assert skipped["error"] == "❌ Skipped: item 1 failed (atomic batch rolled back)"
+    # Reads inside the transaction see its writes, but nothing is committed
+    assert [m["content"] for m in read["result"]] == ["primero"]
+    assert (await tool("get-messages", {}))["result"] == []
+    assert (await tool("get-channels", {}))["result"] == []
+
+
+async def test_atomic_batch_commits_when_every_item_succeeds(tool):
+    message = (await tool("send-message", {"name": "eva", "content": "hola"}))["id"]
+    result = await tool("batch", {"items": batch_items(message), "atomic": True})
+
+    assert result["rolled_back"] is False
+    assert [item["index"] for item in result["result"]] == [0, 1, 2, 3]
+    assert not any("error" in item for item in result["result"])
+    messages = (await tool("get-messages", {}))["result"]
+    assert [m["content"] for m in messages] == ["segundo", "primero", "hola"]
+    assert messages[2]["reaction_count"] == 1
+
+
+async def test_batch_returns_partial_results(tool):
+    result = await tool("batch", {"items": batch_items(999999)})
+
+    assert result["rolled_back"] is False
+    assert result["summary"] == "📦 Ran 4 tool calls, 1 failed"
+    first, failed, second, read = result["result"]
+    assert "error" in failed
+    assert [m["id"] for m in read["result"]] == [second["id"], first["id"]]
+    assert len((await tool("get-messages", {}))["result"]) == 2
+
+
+async def test_batch_item_errors(tool):
+    result = await tool("batch", {"items": [
+        {"name": "batch", "arguments": {"items": []}},
+        {"name": "no-such-tool"},
+        {"name": "get-channels"},
+    ]})
+    nested, unknown, channels = result["result"]
+    assert nested["error"] == "❌ batch cannot be nested"
+    assert unknown["error"] == "❌ Unknown tool: no-such-tool"
+    assert channels["result"] == []
+
+    items = [{"name": "get-channels"}] * (BATCH_MAX_ITEMS + 1)
+    assert (await tool("batch", {"items": items}))["summary"].startswith("❌ Validation error")
+
+
+async def test_thread_tree_truncates_wide_trees(tool):
+    root = (await tool("send-message", {"name": "ana", "content": "raíz"}))["id"]
+    replies = []
+    for i in range(30):
+        reply = await tool("reply-to-message", {"parent_message_id": root, "name": "luis", "content": f"r{i}"})
+        replies.append(reply["id"])
+        await tool("reply-to-message", {"parent_message_id": reply["id"], "name": "eva", "content": "más"})
+
+    tree = (await tool("get-thread-tree", {"message_id": root, "max_nodes": 10}))["result"]
+    assert tree["truncated"]
+    # The walk stops after the nearest nodes: the root and the oldest replies
+    assert sorted(n["id"] for n in tree["nodes"]) == [root] + replies[:9]
+
+    tree = (await tool("get-thread-tree", {"message_id": root, "max_nodes": 61}))["result"]
+    assert not tree["truncated"]
+    assert len(tree["nodes"]) == 61
+    tree = (await tool("get-thread-tree", {"message_id": root, "max_nodes": 60}))["result"]
+    assert tree["truncated"] and len(tree["nodes"]) == 60
+
+
+async def test_delta_tools_return_watermarks(tool):
+    first = (await tool("send-message", {"name": "ana", "content": "hola"}))["id"]
+    start = (await tool("get-messages", {}))["watermark"]
+    second = (await tool("send-message", {"name": "luis", "content": "adiós"}))["id"]
+    await tool("add-reaction", {"message_id": first, "user_name": "eva", "emoji": "👍"})
+
+    result = await tool("get-messages", {"since_id": start["message_id"]})
+    assert [m["id"] for m in result["result"]] == [second]
+    assert result["watermark"]["message_id"] == second
+
+    result = await tool("get-reaction-changes", {"since_seq": start["reaction_seq"]})
+    assert result["summary"] == "🔄 Found 1 messages with changed reactions"
+    assert [(c["message_id"], c["reaction_count"]) for c in result["result"]] == [(first, 1)]
+    assert result["watermark"]["reaction_seq"] > start["reaction_seq"]
@@ -0,0 +1,104 @@
+"""Write-behind group commit (app.write_queue) and crud.apply_writes."""
+import time
+from concurrent.futures import wait
+import pytest
+from app import crud
+from app.database import SessionLocal
+from app.write_queue import GroupCommitWriter
+
+
+@pytest.fixture
+def writer():
+    writer = GroupCommitWriter(window=0.05, max_batch=100)
+    yield writer
+    writer.close(timeout=5)
+
+
+def test_concurrent_writes_get_their_own_ids(writer):
+    futures = [writer.submit('message', f"user{i}", f"mensaje {i}", "general") for i in range(20)]
+    ids = [future.result(timeout=5) for future in futures]
+
+    assert len(set(ids)) == 20
+    with SessionLocal() as db:
+        for i, message_id in enumerate(ids):
+            assert crud.get_message_by_id(db, message_id)['content'] == f"mensaje {i}"
+    stats = writer.stats()
+    assert stats['writes'] == 20
+    assert stats['batches'] < 20
+
+
+def test_invalid_write_fails_alone(writer):
+    with SessionLocal() as db:
+        parent = crud.send_message(db, "ana", "pregunta", "help")
+    futures = [
+        writer.submit('message', "ana", "uno", "general"),
+        writer.submit('reply', 999999, "luis", "sin padre"),
+        writer.submit('reply', parent, "luis", "respuesta"),
+        writer.submit('reaction', parent, "eva", "👍"),
+        writer.submit('reaction', 999999, "eva", "👍"),
+    ]
+    wait(futures, timeout=5)
+
+    message, orphan, reply, reaction, dangling = futures
+    assert isinstance(orphan.exception(), ValueError)
+    assert isinstance(dangling.exception(), ValueError)
+    assert reaction.result() is None
+    with SessionLocal() as db:
+        assert crud.get_message_by_id(db, message.result())['content'] == "uno"
+        assert crud.get_message_by_id(db, reply.result())['parent_id'] == parent
+        assert crud.get_message_reactions(db, parent)['total_count'] == 1
+    # Per-write errors do not fail the batch
+    assert writer.stats()['retried_batches'] == 0
+
+
+def test_failed_batch_is_retried_one_write_at_a_time(writer, monkeypatch):
+    def fail(db, writes):
+        raise RuntimeError("batch failed")
+
+    monkeypatch.setattr(crud, "apply_writes", fail)
+    futures = [
+        writer.submit('message', "ana", "uno", "general"),
+        writer.submit('reply', 999999, "luis", "sin padre"),
+    ]
+    wait(futures, timeout=5)
+
+    assert isinstance(futures[0].result(), int)
+    assert isinstance(futures[1].exception(), ValueError)
+    assert writer.stats()['retried_batches'] == 1
+
+
+def test_apply_writes_orders_kinds_and_reports_per_write():
+    with SessionLocal() as db:
+        parent = crud.send_message(db, "ana", "pregunta", "help")
+        results = crud.apply_writes(db, [
+            ('reaction', (parent, "eva", "👍")),
+            ('reply', (parent, "luis", "respuesta")),
+            ('reaction', (parent, "eva", "👍")),
+            ('message', ("ana", "nuevo", "general")),
+        ])
+        added, reply, duplicate, message = results
+        assert added is None
+        assert isinstance(duplicate, ValueError)
+        assert crud.get_message_by_id(db, reply)['channel'] == "help"
+        assert crud.get_message_by_id(db, message)['content'] == "nuevo"
+
+
+def test_close_commits_queued_writes():
+    # A long window: without close() the batch would wait 10 s
+    writer = GroupCommitWriter(window=10, max_batch=100)
+    futures = [writer.submit('message', "ana", f"mensaje {i}", "general") for i in range(5)]
+
+    start = time.monotonic()
+    writer.close(timeout=5)
+    assert time.monotonic() - start < 5
+    assert all(future.done() and future.exception() is None for future in futures)
+    assert writer.stats()['queued'] == 0
+
+    # A write after close() starts a new writer thread
+    future = writer.submit('message', "ana", "después", "general")
+    writer.close(timeout=5)
+    assert isinstance(future.result(timeout=0), int)
+
+
+def test_close_without_writes_is_a_no_op():
+    GroupCommitWriter().close(timeout=1)